@@ -1,7 +1,7 @@
 import logging
 import os
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 import yaml
 from dotenv import load_dotenv
@@ -70,16 +70,20 @@ class EmbeddingConfig(BaseModel):
     provider: str = "openai"
     model_name: str = "text-embedding-3-small"
     device: str = os.getenv("DEVICE")
+    query_cache_size: int = Field(
+        default=1024, description="Max number of cached query embeddings"
+    )
+    query_cache_ttl: Optional[float] = Field(
+        default=None, description="Seconds a cached query embedding stays valid"
+    )
+    document_cache: bool = Field(
+        default=True,
+        description="Reuse chunk embeddings stored in the embedding_cache table",
+    )
 
     additional_params: Dict[str, Any] = Field(default_factory=dict)
 
 
-class VectorStoreConfig(BaseModel):
-    provider: str = "faiss"
-    collection_name: str = "migi_collection"
-    additional_params: Dict[str, Any] = Field(default_factory=dict)
-
-
 class ChunkingConfig(BaseModel):
     chunk_size: int = 50
     chunk_overlap: int = 50
@@ -171,9 +175,33 @@ class FrontEndConfig(BaseModel):
         super().__init__(**env_values)
 
 
+class AdaptiveCutoffConfig(BaseModel):
+    """Per-query number of retrieved chunks, cut where relevance scores fall off"""
+    enabled: bool = False
+    min_k: int = Field(default=2, description="Chunks always kept")
+    max_k: int = Field(default=10, description="Chunks retrieved and kept at most")
+    methods: List[str] = Field(
+        default_factory=lambda: ["relative", "gap", "elbow"],
+        description="Cut rules applied, the earliest cut wins: relative | gap | elbow",
+    )
+    min_relative_score: float = Field(
+        default=0.5,
+        description="relative: min score as a share of the best one",
+    )
+    gap_ratio: float = Field(
+        default=0.25,
+        description="gap: min drop between consecutive scores, as a share of the best one",
+    )
+    min_spread: float = Field(
+        default=0.05,
+        description="No cut when all scores are within this share of the best one",
+    )
+
+
 class RetrievalConfig(BaseModel):
     k: int = 5
     method: str = "default"
+    cutoff: AdaptiveCutoffConfig = Field(default_factory=AdaptiveCutoffConfig)
     params: Dict[str, Any] = Field(
         default_factory=lambda: {
             # Semantic retrieval parameters
@@ -182,16 +210,191 @@ class RetrievalConfig(BaseModel):
             "prioritize_semantic": True,
             # Ensemble retrieval parameters
             "weights": [0.5, 0.5],  # Default weights for default + semantic
-            # Reranking parameters (future implementation)
-            "reranker_model": "colbert",
-            "reranker_threshold": 0.7,
+            # Reranking parameters (RetrievalMethod.RERANKED)
+            "reranker_model": "cross-encoder/ms-marco-MiniLM-L-6-v2",
+            "reranker_threshold": None,  # Min sigmoid of the cross-encoder logit, in [0, 1]
+            "reranker_backend": "torch",  # torch | onnx | openvino
+            "reranker_model_file": None,  # e.g. onnx/model_qint8_avx512.onnx
+            "reranker_candidates": 50,
+            "reranker_batch_size": 32,
+            "reranker_cache_size": 4096,
         }
     )
 
 
+class CompressionConfig(BaseModel):
+    """Extractive compression of retrieved chunks before generation"""
+    enabled: bool = False
+    threshold: float = Field(
+        default=0.35, description="Min cosine similarity of a sentence to the question"
+    )
+    window: int = Field(default=1, description="Neighbouring sentences kept on each side")
+    min_sentence_chars: int = Field(
+        default=20, description="Shorter fragments are joined to the next sentence"
+    )
+    cache_size: int = Field(default=8192, description="Max number of cached sentence embeddings")
+
+
+class ContextConfig(BaseModel):
+    """Assembly of retrieved chunks into the generation prompt"""
+    max_tokens: int = Field(
+        default=3000, description="Token budget of the retrieved context in the prompt"
+    )
+    separator: str = Field(default="\n\n", description="Text placed between chunks")
+    merge_adjacent: bool = Field(
+        default=True, description="Merge overlapping or adjacent chunks of a document"
+    )
+    min_overlap: int = Field(
+        default=50,
+        description="Min repeated characters to merge chunks that have no start_index",
+    )
+    dedup_threshold: Optional[float] = Field(
+        default=0.9,
+        description="Shingle similarity from which a passage is a duplicate; null disables",
+    )
+    shingle_size: int = Field(default=5, description="Words per shingle for deduplication")
+    compression: CompressionConfig = Field(default_factory=CompressionConfig)
+
+
+class VectorIndexConfig(BaseModel):
+    """ANN index settings for the chunks_embeddings.embedding column"""
+    type: str = Field(
+        default="hnsw", description="ANN index type: 'hnsw', 'ivfflat' or 'none'"
+    )
+    # HNSW build / search parameters
+    m: int = 16
+    ef_construction: int = 64
+    ef_search: int = 40
+    # IVFFlat build / search parameters
+    lists: int = 100
+    probes: int = 10
+    maintenance_work_mem: Optional[str] = Field(
+        default=None, description="maintenance_work_mem used for index builds, e.g. '1GB'"
+    )
+    quantization: str = Field(
+        default="none",
+        description="Build the index over a compact copy of the embeddings: "
+        "'none', 'halfvec' or 'binary'",
+    )
+    iterative_scan: Optional[str] = Field(
+        default=None,
+        description="pgvector iterative index scans for tenant-filtered queries: "
+        "'relaxed_order' (HNSW or IVFFlat) or 'strict_order' (HNSW only)",
+    )
+    rescore_factor: int = Field(
+        default=4,
+        description="With quantization, candidates per result re-scored on full vectors "
+        "(binary codes usually need 10 or more)",
+    )
+
+
+class BM25Config(BaseModel):
+    """In-process BM25 first pass used by PGVectorStore"""
+    k1: float = 1.2
+    b: float = 0.75
+    cache_size: int = Field(
+        default=32, description="Max number of per-tenant BM25 indexes kept in memory"
+    )
+    index_dir: Optional[str] = Field(
+        default=None,
+        description="Directory for memory-mapped BM25 index files shared by workers",
+    )
+    max_segments: int = Field(
+        default=8, description="Compact an index once it has more incremental segments"
+    )
+    max_deleted_ratio: float = Field(
+        default=0.2, description="Compact an index once this share of chunks is deleted"
+    )
+    revalidate_interval: float = Field(
+        default=30.0,
+        description="Seconds between checks that a cached index still matches the database",
+    )
+
+
+class HotCacheConfig(BaseModel):
+    """In-process mirrors of the busiest courses' embeddings in PGVectorStore"""
+    enabled: bool = False
+    max_courses: int = Field(default=8, description="Max number of courses mirrored")
+    min_queries: int = Field(
+        default=3, description="Dense queries missing the cache before a course is mirrored"
+    )
+    max_tracked: int = Field(
+        default=1024, description="Max number of courses whose cache misses are counted"
+    )
+    max_rows: int = Field(default=50000, description="Larger courses are never mirrored")
+    revalidate_interval: float = Field(
+        default=30.0,
+        description="Seconds between checks that a mirror still matches the database",
+    )
+
+
+class FaissConfig(BaseModel):
+    """Local FAISS vector store settings"""
+    index_dir: str = Field(
+        default="vector_stores/faiss_index",
+        description="Directory holding one index and docstore per course or user",
+    )
+    index_type: str = Field(
+        default="flat", description="FAISS index type: 'flat', 'ivf' or 'hnsw'"
+    )
+    # IVF build / search parameters
+    nlist: int = 100
+    nprobe: int = 10
+    # HNSW build / search parameters
+    hnsw_m: int = 32
+    ef_construction: int = 40
+    ef_search: int = 64
+    mmap: bool = Field(
+        default=True, description="Memory-map index files so workers share pages"
+    )
+    max_deleted_ratio: float = Field(
+        default=0.2, description="Rebuild an HNSW index once this share of it is deleted"
+    )
+
+
 class VectorStoreConfig(BaseModel):
     provider: str = "faiss"
     collection_name: str = "migi_collection"
+    index: VectorIndexConfig = Field(default_factory=VectorIndexConfig)
+    text_search_language: str = Field(
+        default="french", description="Postgres text search configuration for chunks"
+    )
+    bm25: BM25Config = Field(default_factory=BM25Config)
+    faiss: FaissConfig = Field(default_factory=FaissConfig)
+    hot_cache: HotCacheConfig = Field(default_factory=HotCacheConfig)
+    search_mode: str = Field(
+        default="sequential",
+        description="Hybrid search execution: 'sequential', 'sql' or 'concurrent'",
+    )
+    search_workers: int = Field(
+        default=8, description="Threads running retrieval legs in concurrent mode"
+    )
+    leg_timeout: Optional[float] = Field(
+        default=None,
+        description="Seconds to wait for the slower leg in concurrent mode before fusing without it",
+    )
+    rrf_k: int = Field(default=60, description="Reciprocal rank fusion constant")
+    copy_threshold: int = Field(
+        default=256,
+        description="Chunk count from which ingestion uses COPY instead of row inserts",
+    )
+    ingest_batch_size: int = Field(
+        default=64, description="Chunks embedded and written per batch in streaming ingestion"
+    )
+    ingest_queue_size: int = Field(
+        default=2, description="Embedded batches waiting for the writer in streaming ingestion"
+    )
+    lazy_hydration: bool = Field(
+        default=False,
+        description="Legs fetch only chunk ids; content is loaded for the fused top_k",
+    )
+    partition_by_course: bool = Field(
+        default=False,
+        description=(
+            "chunks_embeddings is LIST-partitioned by course_id; convert it first with "
+            "python -m services.vector_store.admin partition-by-course"
+        ),
+    )
     additional_params: Dict[str, Any] = Field(default_factory=dict)
 
 
@@ -203,6 +406,7 @@ class Settings(BaseSettings):
     database: DatabaseConfig = Field(default_factory=DatabaseConfig)
     llm: LLMConfig = Field(default_factory=LLMConfig)
     retrieval: RetrievalConfig = Field(default_factory=RetrievalConfig)
+    context: ContextConfig = Field(default_factory=ContextConfig)
     vector_store: VectorStoreConfig = Field(default_factory=VectorStoreConfig)
 
     @classmethod
@@ -8,6 +8,7 @@ from langchain_ollama import OllamaEmbeddings
 from langchain_openai import OpenAIEmbeddings
 
 from core.config import settings
+from services.embedding.query_cache import QueryEmbeddingCache
 
 logger = logging.getLogger(__name__)
 
@@ -60,3 +61,11 @@ def get_embeddings(**kwargs) -> Embeddings:
             f"Error creating embeddings for provider {settings.embedding.provider}: {e}"
         )
         raise
+
+
+@lru_cache()
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    return QueryEmbeddingCache(
+        max_size=settings.embedding.query_cache_size,
+        ttl=settings.embedding.query_cache_ttl,
+    )
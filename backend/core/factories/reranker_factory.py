@@ -0,0 +1,52 @@
+import logging
+from functools import lru_cache
+from typing import Optional
+
+import torch
+from sentence_transformers import CrossEncoder
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_BACKENDS = ("torch", "onnx", "openvino")
+
+
+@lru_cache()
+def get_cross_encoder(
+    model_name: str,
+    backend: str = "torch",
+    model_file: Optional[str] = None,
+    max_length: int = 512,
+) -> CrossEncoder:
+    """
+    Load a cross-encoder on CPU, once per process.
+
+    predict() returns raw logits whatever activation the model's config
+    names; CrossEncoderReranker applies the sigmoid itself.
+
+    Args:
+        model_name: Hugging Face model id or local path
+        backend: "torch", or "onnx"/"openvino" for exported models
+        model_file: File of an exported model inside the repository, e.g.
+            "onnx/model_qint8_avx512.onnx" for an int8 quantized ONNX model
+        max_length: Token limit of a (query, chunk) pair
+    """
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(
+            f"Unsupported reranker backend: {backend}. "
+            f"Supported backends: {list(SUPPORTED_BACKENDS)}"
+        )
+    model_kwargs = {"file_name": model_file} if model_file else {}
+    try:
+        model = CrossEncoder(
+            model_name,
+            device="cpu",
+            backend=backend,
+            max_length=max_length,
+            activation_fn=torch.nn.Identity(),
+            model_kwargs=model_kwargs,
+        )
+    except Exception as e:
+        logger.error(f"Error loading cross-encoder {model_name} ({backend}): {e}")
+        raise
+    logger.info(f"Loaded cross-encoder {model_name} ({backend})")
+    return model
@@ -1,6 +1,7 @@
 from core.config import settings
 from core.factories.embedding_factory import get_embeddings
-from services.vector_store import PGVectorStore, VectorStoreService
+from services.vector_store import (FAISSVectorStore, PGVectorStore,
+                                   VectorStoreService)
 from services.vector_store.vector_store_service import VectorStoreService
 
 
@@ -30,6 +31,9 @@ class VectorStoreFactory:
                 f"Unsupported vector store provider: {settings.vector_store.provider}"
             )
 
+    def _initialize_faiss(self, embeddings):
+        return FAISSVectorStore(embeddings=embeddings)
+
     def _initialize_pgvector(self, embeddings):
         return PGVectorStore()
 
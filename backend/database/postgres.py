@@ -1,9 +1,13 @@
+import asyncio
 import json
 import logging
 from contextlib import contextmanager
 from typing import Any, Dict, List, Optional
 
+import asyncpg
 from fastapi import HTTPException, status
+from pgvector.asyncpg import register_vector as register_vector_async
+from pgvector.psycopg2 import register_vector
 from psycopg2.extras import RealDictCursor
 from psycopg2.pool import ThreadedConnectionPool
 from sqlalchemy import create_engine
@@ -24,6 +28,8 @@ class PostgresDB(DatabaseService):
     _pool = None
     _engine = None
     _Session = None
+    _async_pool = None
+    _async_pool_lock = None
 
     def __init__(self):
         self._get_pool()
@@ -53,6 +59,67 @@ class PostgresDB(DatabaseService):
                 )
         return cls._pool
 
+    @classmethod
+    async def get_async_pool(cls) -> asyncpg.Pool:
+        """
+        Get the shared asyncpg pool, creating it on first use.
+
+        The pool belongs to the event loop that created it, so it must only
+        be used from the application's loop.
+        """
+        if cls._async_pool is None:
+            if cls._async_pool_lock is None:
+                cls._async_pool_lock = asyncio.Lock()
+            async with cls._async_pool_lock:
+                if cls._async_pool is None:
+                    try:
+                        cls._async_pool = await asyncpg.create_pool(
+                            user=settings.postgres.user,
+                            password=settings.postgres.password,
+                            host=settings.postgres.host,
+                            port=int(settings.postgres.port),
+                            database=settings.postgres.db,
+                            min_size=2,
+                            max_size=10,
+                            init=cls._init_async_connection,
+                            # Prepared statements must not settle on a generic
+                            # plan: partial per-course indexes only match when
+                            # the planner sees the actual course_id
+                            server_settings={"plan_cache_mode": "force_custom_plan"},
+                        )
+                        logger.info("Created asyncpg connection pool")
+                    except Exception as e:
+                        logger.error(
+                            f"Failed to create asyncpg pool: {str(e)}")
+                        raise HTTPException(
+                            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            detail="Failed to connect to database",
+                        )
+        return cls._async_pool
+
+    @staticmethod
+    async def _init_async_connection(conn: asyncpg.Connection):
+        # Decode JSONB columns to Python objects, like psycopg2 does; encode
+        # with DateTimeEncoder like the ORM writes, so datetimes in metadata
+        # are accepted
+        await conn.set_type_codec(
+            "jsonb",
+            encoder=lambda value: json.dumps(value, cls=DateTimeEncoder),
+            decoder=json.loads,
+            schema="pg_catalog",
+        )
+        # Binary codec: vectors go over the wire as packed float4, with no
+        # float <-> text formatting on either side
+        await register_vector_async(conn)
+
+    @classmethod
+    async def close_async_pool(cls):
+        """Close all connections in the asyncpg pool."""
+        if cls._async_pool:
+            await cls._async_pool.close()
+            cls._async_pool = None
+            logger.info("Closed asyncpg connection pool")
+
     def _initialize_sqlalchemy(self):
         if self._engine is None:
             url = URL.create(
@@ -66,8 +133,24 @@ class PostgresDB(DatabaseService):
             self._engine = create_engine(url, poolclass=NullPool)
             self._Session = sessionmaker(bind=self._engine)
             Base.metadata.create_all(self._engine)
+            self._register_vector_adapter()
             logger.info("Initialized SQLalchemy engine")
 
+    def _register_vector_adapter(self):
+        """
+        Register pgvector's psycopg2 adapter and typecaster process-wide.
+
+        numpy arrays then bind directly as vector literals (parsed once by
+        vector_in instead of a numeric[] -> vector cast) and vector columns
+        are read back as numpy arrays. psycopg2 has no binary parameter
+        support, so this is as compact as the sync path gets.
+        """
+        try:
+            with self._engine.connect() as conn:
+                register_vector(conn.connection.driver_connection, globally=True)
+        except Exception as e:
+            logger.error(f"Failed to register pgvector adapter: {e}")
+
     def _ensure_schema(self):
         Base.metadata.create_all(self._engine)
 
@@ -7,6 +7,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from core.config import settings
 from core.utils.logger import setup_logging
+from database.postgres import PostgresDB
 from routes import (auth_routes, chat_routes, course_routes, embedding_routes,
                     ingestion_routes, role_routes, quizz_routes)
 
@@ -43,6 +44,8 @@ async def lifespan(app: FastAPI):
 
     yield
 
+    await PostgresDB.close_async_pool()
+
 app = FastAPI(lifespan=lifespan)
 
 app.include_router(auth_routes, prefix="/api/auth", tags=["Auth"])
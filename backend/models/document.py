@@ -4,14 +4,23 @@ from typing import List
 
 from langchain.schema import Document
 from pgvector.sqlalchemy import Vector
-from sqlalchemy import Column, DateTime, ForeignKey, String, func
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import (Column, Computed, DateTime, ForeignKey, Index, Integer,
+                        String, func, text)
+from sqlalchemy.dialects.postgresql import JSONB, REGCONFIG, TSVECTOR, UUID
 from sqlalchemy.orm import relationship
 
+from core.config import settings
 from core.database import Base
 from models.henry_doc import HenryDoc
 
 
+# course_id of chunks that do not belong to any course
+UNASSIGNED_COURSE_ID = 0
+# Whether chunks_embeddings is LIST-partitioned by course_id (opt-in, see
+# services.vector_store.partitioning)
+PARTITIONED = settings.vector_store.partition_by_course
+
+
 class DateTimeEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, datetime):
@@ -24,13 +33,35 @@ class ChunkEmbedding(Base):
 
     __tablename__ = "chunks_embeddings"
 
-    # Since LangChain Document uses string UUID, we'll use String type
+    # Since LangChain Document uses string UUID, we'll use String type.
+    # The primary key is (id) or, on the partitioned table, (id, course_id):
+    # Postgres cannot enforce uniqueness of id alone across partitions.
     id = Column(String, primary_key=True, index=True)
     document_id = Column(
         String, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False
     )
+    # Owner of the chunk (references auth.users, see the chunks migration)
+    user_id = Column(UUID(as_uuid=False), nullable=False, index=True)
+    # Course the chunk belongs to (course.id), UNASSIGNED_COURSE_ID if none.
+    # Also the partition key when partitioned, hence part of the primary key.
+    course_id = Column(
+        Integer, primary_key=PARTITIONED, nullable=False, index=True,
+        default=UNASSIGNED_COURSE_ID, server_default=text("0"),
+    )
     data = Column(JSONB, nullable=False, default={})
     embedding = Column(Vector(384))
+    # Text search configuration (language) used to build content_tsv
+    ts_config = Column(
+        REGCONFIG, nullable=False, server_default=text("'french'::regconfig")
+    )
+    # Persisted tsvector so full-text search does not re-tokenize every row
+    content_tsv = Column(
+        TSVECTOR,
+        Computed(
+            "to_tsvector(ts_config, coalesce(data->>'page_content', ''))",
+            persisted=True,
+        ),
+    )
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
@@ -38,9 +69,13 @@ class ChunkEmbedding(Base):
 
     # Define indexes using proper SQLAlchemy syntax
     __table_args__ = (
-        # Index for faster user_id filtering
-        # We'll create indexes separately in the ensure_text_search_index method
-        {"schema": None}
+        # GIN index backing the content_tsv @@ tsquery filter
+        Index("idx_chunks_content_tsv", "content_tsv", postgresql_using="gin"),
+        # The ANN index is managed by PGVectorStore.ensure_indexes (see
+        # services.vector_store.admin)
+        {"schema": None, **(
+            {"postgresql_partition_by": "LIST (course_id)"} if PARTITIONED else {}
+        )},
     )
 
     # Relationship to parent document
@@ -57,6 +92,7 @@ class ChunkEmbedding(Base):
         return cls(
             id=doc.id,  # Use the LangChain document's ID directly as string
             document_id=document_id,
+            user_id=user_id,
             data=json.loads(json.dumps(doc_dict, cls=DateTimeEncoder)),
             embedding=embedding,
         )
@@ -71,6 +107,7 @@ class ChunkEmbedding(Base):
 class SQLDocument(Base):
     __tablename__ = "documents"
     id = Column(String, primary_key=True)
+    user_id = Column(UUID(as_uuid=False), nullable=False, index=True)
     data = Column(JSONB, nullable=False)
     chunks = relationship(
         "ChunkEmbedding", back_populates="document", cascade="all, delete-orphan"
@@ -0,0 +1,17 @@
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import Column, DateTime, String, func
+
+from core.database import Base
+
+
+class EmbeddingCacheEntry(Base):
+    """SQLAlchemy model for the embedding_cache table"""
+
+    __tablename__ = "embedding_cache"
+
+    model = Column(String, primary_key=True)
+    # SHA-256 hex digest of the normalized chunk text
+    content_hash = Column(String, primary_key=True)
+    # Dimension depends on the model, so it is left unconstrained
+    embedding = Column(Vector(), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
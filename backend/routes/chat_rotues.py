@@ -19,6 +19,7 @@ async def invoke_graph(query: Query = Body(...)):
     config = {"configurable": {"thread_id": "2"}}
     state = State()
     state["messages"] = [HumanMessage(content=query.message)]
+    state["course_id"] = query.course_id
 
     def is_numeric(s):
         import re
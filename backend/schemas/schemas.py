@@ -39,10 +39,12 @@ class CreateCourseRequest(BaseModel):
 
 class Query(BaseModel):
     message: str
+    course_id: Optional[int] = None
 
 
 class Query(BaseModel):
     message: str
+    course_id: Optional[int] = None
 
 
 class BulkIngestionRequest(BaseModel):
@@ -1,6 +1,9 @@
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, START, StateGraph
 
+from core.config import settings
+
+from .nodes.compress_node import compress
 from .nodes.generate_node import generate
 from .nodes.grade_node import grade
 from .nodes.retrieve_node import retrieve
@@ -15,7 +18,12 @@ workflow.add_node("generate", generate)
 
 # define the edge
 workflow.add_edge(START, "retrieve")
-workflow.add_edge("retrieve", "generate")
+if settings.context.compression.enabled:
+    workflow.add_node("compress", compress)
+    workflow.add_edge("retrieve", "compress")
+    workflow.add_edge("compress", "generate")
+else:
+    workflow.add_edge("retrieve", "generate")
 workflow.add_edge("generate", END)
 
 graph = workflow.compile(checkpointer=memory)
@@ -0,0 +1,35 @@
+import asyncio
+
+from core.config import settings
+from services.context.compression import get_sentence_compressor
+from services.context.merging import drop_duplicates, merge_adjacent
+
+
+async def compress(state):
+    """
+    Keep only the sentences of the retrieved documents that are relevant
+    to the question
+
+    Args:
+        state (dict): The current graph state
+
+    Returns:
+        state (dict): Updates documents with the compressed documents
+    """
+    print("---COMPRESS---")
+    question = state["messages"][-1].content
+    documents = state["documents"]
+
+    # Merge overlapping chunks while their positions still match their text
+    config = settings.context
+    if config.merge_adjacent:
+        documents = merge_adjacent(documents, min_overlap=config.min_overlap)
+    if config.dedup_threshold is not None:
+        documents = drop_duplicates(
+            documents, threshold=config.dedup_threshold, shingle_size=config.shingle_size)
+
+    documents = await asyncio.to_thread(
+        get_sentence_compressor().compress, question, documents)
+    print(f"Compressed to {len(documents)} documents")
+
+    return {"documents": documents}
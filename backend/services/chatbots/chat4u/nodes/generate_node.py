@@ -1,21 +1,30 @@
 from langchain_core.messages import AIMessage
 
+from core.config import settings
+from services.context.packer import get_context_packer
+
 from ..chains.generate_chain import generate_chain
 
 
 def generate(state):
     print("--GENERATE--")
     question = state["messages"][-1].content
-    documents = state["documents"]
 
-    docs_content = "\n\n".join(doc.page_content for doc in documents)
+    # Only the chunks that fit the token budget reach the prompt; the
+    # compress node already merged and deduplicated them
+    context = get_context_packer().pack(
+        state["documents"], merged=settings.context.compression.enabled)
+    print(
+        f"Context: {len(context.documents)} chunks, {context.tokens} tokens, "
+        f"{len(context.dropped)} dropped"
+    )
     generation = generate_chain.invoke(
         {
-            "context": docs_content,
+            "context": context.text,
             "question": question,
             "chat_history": state["messages"],
         }
     )
     message = state["messages"] + [AIMessage(content=generation)]
 
-    return {"documents": documents, "messages": message}
+    return {"documents": context.documents, "messages": message}
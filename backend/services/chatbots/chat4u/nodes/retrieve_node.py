@@ -3,7 +3,7 @@ from services.retrieval.retriever import Retriever
 retriever = Retriever()
 
 
-def retrieve(state):
+async def retrieve(state):
     """
     Retrieve documents
 
@@ -16,8 +16,9 @@ def retrieve(state):
     try:
         print("---RETRIEVE---")
         question = state["messages"][-1].content
-        # Retrieval with error handling
-        documents = retriever.retrieve(question, method="default")
+        # Configured strategy (settings.retrieval.method and params)
+        documents = await retriever.aretrieve(
+            question, course_id=state.get("course_id"))
 
         print(f"Retrieved {len(documents)} documents")
 
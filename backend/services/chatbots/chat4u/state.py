@@ -8,6 +8,8 @@ from typing_extensions import TypedDict
 class State(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
     documents: List[dict]
+    # Restricts retrieval to a course's chunks when set
+    course_id: Optional[int]
 
 
 def for_client(state: State) -> dict:
@@ -0,0 +1,159 @@
+import logging
+import re
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+from langchain.schema import Document
+from langchain.schema.embeddings import Embeddings
+
+from core.config import settings
+from core.factories.embedding_factory import (get_embeddings,
+                                             get_query_embedding_cache)
+from services.embedding.query_cache import QueryEmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+# Sentence ends, and line breaks (lists, headings, table rows)
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?;:])\s+|\s*\n+\s*")
+# Placed where sentences were cut out of a chunk
+ELISION = " [...] "
+
+
+def split_sentences(text: str, min_chars: int = 20) -> List[str]:
+    """Split text into sentences, gluing fragments shorter than min_chars to the next."""
+    sentences = []
+    pending = ""
+    for part in SENTENCE_BOUNDARY.split(text):
+        part = part.strip()
+        if not part:
+            continue
+        pending = f"{pending} {part}" if pending else part
+        if len(pending) >= min_chars:
+            sentences.append(pending)
+            pending = ""
+    if pending:
+        if sentences:
+            sentences[-1] = f"{sentences[-1]} {pending}"
+        else:
+            sentences.append(pending)
+    return sentences
+
+
+class SentenceCompressor:
+    """
+    Extractive compression of retrieved chunks against a question.
+
+    Every sentence of every chunk is embedded in one batch with the
+    retrieval embedding model; sentence embeddings are cached across
+    questions, since the same chunks keep coming back. A chunk keeps its
+    sentences whose cosine similarity to the question reaches threshold,
+    each with window neighbouring sentences on both sides, and is dropped
+    if none qualifies. If every chunk would be dropped, the chunks are
+    returned unchanged.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        threshold: float = 0.35,
+        window: int = 1,
+        min_sentence_chars: int = 20,
+        cache_size: int = 8192,
+    ):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.threshold = threshold
+        self.window = window
+        self.min_sentence_chars = min_sentence_chars
+        self._cache = QueryEmbeddingCache(max_size=cache_size)
+
+    def _embed_sentences(self, sentences: List[str]) -> np.ndarray:
+        vectors: List[Optional[np.ndarray]] = [
+            self._cache.get(self.model_name, sentence) for sentence in sentences
+        ]
+        missing = sorted({
+            sentence for sentence, vector in zip(sentences, vectors) if vector is None
+        })
+        if missing:
+            computed = dict(zip(missing, self.embeddings.embed_documents(missing)))
+            vectors = [
+                vector if vector is not None
+                else self._cache.put(self.model_name, sentence, computed[sentence])
+                for sentence, vector in zip(sentences, vectors)
+            ]
+        matrix = np.vstack(vectors).astype(np.float32)
+        return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+    def _embed_question(self, question: str) -> np.ndarray:
+        vector = get_query_embedding_cache().get_or_compute(
+            self.model_name, question, self.embeddings.embed_query)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def compress(self, question: str, documents: List[Document]) -> List[Document]:
+        split = [split_sentences(doc.page_content, self.min_sentence_chars) for doc in documents]
+        sentences = [sentence for chunk in split for sentence in chunk]
+        if not sentences:
+            return documents
+
+        similarities = self._embed_sentences(sentences) @ self._embed_question(question)
+
+        compressed = []
+        offset = 0
+        before = after = 0
+        for doc, chunk in zip(documents, split):
+            scores = similarities[offset:offset + len(chunk)]
+            offset += len(chunk)
+            before += len(doc.page_content)
+            keep = np.zeros(len(chunk), dtype=bool)
+            for i in np.flatnonzero(scores >= self.threshold):
+                keep[max(0, i - self.window):i + self.window + 1] = True
+            if not keep.any():
+                continue
+            if keep.all():
+                compressed.append(doc)
+                after += len(doc.page_content)
+                continue
+
+            # Contiguous runs of kept sentences, with elisions between them
+            runs, run = [], []
+            for sentence, kept in zip(chunk, keep):
+                if kept:
+                    run.append(sentence)
+                elif run:
+                    runs.append(" ".join(run))
+                    run = []
+            if run:
+                runs.append(" ".join(run))
+            text = ELISION.join(runs)
+            metadata = {
+                key: value for key, value in doc.metadata.items()
+                # Positions no longer match the compressed text
+                if key != "start_index"
+            }
+            metadata["compressed_from"] = len(doc.page_content)
+            compressed.append(Document(page_content=text, metadata=metadata))
+            after += len(text)
+
+        if not compressed:
+            logger.info("No sentence reached the compression threshold, keeping chunks as is")
+            return documents
+        logger.info(
+            f"Compressed {len(documents)} chunks to {len(compressed)}, "
+            f"{before} to {after} characters"
+        )
+        return compressed
+
+
+@lru_cache()
+def get_sentence_compressor() -> SentenceCompressor:
+    config = settings.context.compression
+    return SentenceCompressor(
+        embeddings=get_embeddings(),
+        model_name=settings.embedding.model_name,
+        threshold=config.threshold,
+        window=config.window,
+        min_sentence_chars=config.min_sentence_chars,
+        cache_size=config.cache_size,
+    )
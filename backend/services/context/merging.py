@@ -0,0 +1,193 @@
+import hashlib
+import logging
+from collections import defaultdict
+from typing import Dict, FrozenSet, Hashable, List, Optional
+
+from langchain.schema import Document
+
+from services.embedding.query_cache import QueryEmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+# Metadata keys holding a relevance score, higher is better
+SCORE_KEYS = ("rerank_score", "score")
+
+
+def _span_key(doc: Document) -> Hashable:
+    """Chunks sharing this key come from the same text and can be merged."""
+    metadata = doc.metadata
+    return (
+        metadata.get("document_id"),
+        metadata.get("source"),
+        metadata.get("page"),
+    )
+
+
+def _overlap(left: str, right: str, min_overlap: int) -> int:
+    """Length of the longest suffix of left that is a prefix of right."""
+    if min_overlap < 1 or len(left) < min_overlap or len(right) < min_overlap:
+        return 0
+    probe = right[:min_overlap]
+    start = max(0, len(left) - len(right))
+    position = left.find(probe, start)
+    while position != -1:
+        if right.startswith(left[position:]):
+            return len(left) - position
+        position = left.find(probe, position + 1)
+    return 0
+
+
+def _combine(members: List[Document], text: str, start: Optional[int]) -> Document:
+    """A document spanning members, which are given best ranked first."""
+    metadata = dict(members[0].metadata)
+    metadata["merged_ids"] = [doc.metadata.get("id") for doc in members]
+    if start is not None:
+        metadata["start_index"] = start
+    for key in SCORE_KEYS:
+        scores = [doc.metadata[key] for doc in members if doc.metadata.get(key) is not None]
+        if scores:
+            metadata[key] = max(scores)
+    return Document(page_content=text, metadata=metadata)
+
+
+def merge_adjacent(
+    documents: List[Document], min_overlap: int = 50, max_gap: int = 1
+) -> List[Document]:
+    """
+    Merge chunks of the same document that overlap or touch into single
+    spans, so overlapping text reaches the prompt once.
+
+    Chunks with a start_index (see Splitter) are merged by position when
+    they overlap or are at most max_gap characters apart. Chunks without
+    one are merged when the end of one repeats the start of another over
+    at least min_overlap characters. A merged span takes the place and the
+    metadata of its best ranked chunk, with the ids of all its chunks in
+    metadata["merged_ids"].
+    """
+    groups: Dict[Hashable, List[int]] = defaultdict(list)
+    for rank, doc in enumerate(documents):
+        groups[_span_key(doc)].append(rank)
+
+    # rank of the best member -> merged document; other members are dropped
+    merged: Dict[int, Document] = {}
+    absorbed = set()
+    for ranks in groups.values():
+        if len(ranks) < 2:
+            continue
+        members = [(rank, documents[rank]) for rank in ranks]
+        for span_ranks, text, start in _merge_group(members, min_overlap, max_gap):
+            if len(span_ranks) < 2:
+                continue
+            best = min(span_ranks)
+            merged[best] = _combine(
+                [documents[rank] for rank in sorted(span_ranks)], text, start)
+            absorbed.update(rank for rank in span_ranks if rank != best)
+
+    result = [
+        merged.get(rank, doc) for rank, doc in enumerate(documents) if rank not in absorbed
+    ]
+    if absorbed:
+        logger.debug(f"Merged {len(documents)} chunks into {len(result)} spans")
+    return result
+
+
+def _merge_group(members, min_overlap: int, max_gap: int):
+    """Yield (ranks, text, start_index) spans covering chunks of one document."""
+    positioned = sorted(
+        (m for m in members if isinstance(m[1].metadata.get("start_index"), int)),
+        key=lambda m: m[1].metadata["start_index"],
+    )
+    unpositioned = [m for m in members if not isinstance(m[1].metadata.get("start_index"), int)]
+
+    span = None
+    for rank, doc in positioned:
+        start = doc.metadata["start_index"]
+        end = start + len(doc.page_content)
+        if span is not None and start <= span["end"] + max_gap:
+            if end > span["end"]:
+                if start >= span["end"]:
+                    span["text"] += " " * (start - span["end"]) + doc.page_content
+                else:
+                    span["text"] += doc.page_content[span["end"] - start:]
+                span["end"] = end
+            span["ranks"].append(rank)
+            continue
+        if span is not None:
+            yield _finish(span)
+        span = {"ranks": [rank], "text": doc.page_content, "start": start, "end": end}
+    if span is not None:
+        yield _finish(span)
+
+    # Without positions, chain chunks whose ends and starts repeat each other
+    spans = [{"ranks": [rank], "text": doc.page_content} for rank, doc in unpositioned]
+    changed = True
+    while changed and len(spans) > 1:
+        changed = False
+        for left in spans:
+            for right in spans:
+                if left is right:
+                    continue
+                size = _overlap(left["text"], right["text"], min_overlap)
+                if size:
+                    left["text"] += right["text"][size:]
+                    left["ranks"].extend(right["ranks"])
+                    spans.remove(right)
+                    changed = True
+                    break
+            if changed:
+                break
+    for span in spans:
+        yield _finish({**span, "start": None})
+
+
+def _finish(span):
+    return span["ranks"], span["text"], span["start"]
+
+
+def _shingles(text: str, size: int) -> FrozenSet[str]:
+    words = QueryEmbeddingCache.normalize(text).split()
+    if len(words) <= size:
+        return frozenset([" ".join(words)])
+    return frozenset(" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+
+
+def drop_duplicates(
+    documents: List[Document], threshold: float = 0.9, shingle_size: int = 5
+) -> List[Document]:
+    """
+    Drop exact and near-exact duplicate passages, keeping the best ranked.
+
+    Exact duplicates are found by hashing the normalized text. A passage is
+    a near duplicate when the Jaccard similarity of its word shingles with
+    a kept passage reaches threshold, or when at least threshold of its
+    shingles appear in a single kept passage (it is contained in it).
+    """
+    kept: List[Document] = []
+    kept_shingles: List[FrozenSet[str]] = []
+    seen = set()
+    for doc in documents:
+        digest = hashlib.sha1(
+            QueryEmbeddingCache.normalize(doc.page_content).encode("utf-8")).digest()
+        if digest in seen:
+            continue
+        shingles = _shingles(doc.page_content, shingle_size)
+        duplicate = False
+        for other in kept_shingles:
+            common = len(shingles & other)
+            if not common:
+                continue
+            if (
+                common / len(shingles | other) >= threshold
+                or common / len(shingles) >= threshold
+            ):
+                duplicate = True
+                break
+        if duplicate:
+            continue
+        seen.add(digest)
+        kept.append(doc)
+        kept_shingles.append(shingles)
+
+    if len(kept) < len(documents):
+        logger.debug(f"Dropped {len(documents) - len(kept)} duplicate passages")
+    return kept
@@ -0,0 +1,161 @@
+import logging
+from functools import lru_cache
+from typing import Callable, List, NamedTuple, Optional
+
+from langchain.schema import Document
+
+from core.config import settings
+from core.factories.llm_factory import get_llm
+from services.context.merging import SCORE_KEYS, drop_duplicates, merge_adjacent
+
+logger = logging.getLogger(__name__)
+
+# Rough characters per token, used when the LLM cannot count tokens
+FALLBACK_CHARS_PER_TOKEN = 4
+
+
+class PackedContext(NamedTuple):
+    """Outcome of packing retrieved chunks into the prompt context."""
+
+    text: str
+    documents: List[Document]
+    dropped: List[Document]
+    tokens: int
+
+    @property
+    def dropped_tokens(self) -> int:
+        return sum(doc.metadata.get("context_tokens", 0) for doc in self.dropped)
+
+
+class ContextPacker:
+    """
+    Packs retrieved chunks into a token budget for the prompt context.
+
+    Overlapping or adjacent chunks of a document are first merged into
+    single spans and duplicate passages dropped, so repeated text does not
+    use the budget twice. Chunks are then considered best first: by their
+    score metadata when every chunk has one, else in retrieval order. A
+    chunk that does not fit is skipped and smaller ones after it may still
+    be packed. The packed chunks keep their retrieval order in the context
+    text. Returned documents are copies annotated with their token count in
+    metadata["context_tokens"]; the input documents are left untouched.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        count_tokens: Callable[[str], int],
+        separator: str = "\n\n",
+        merge_adjacent: bool = True,
+        min_overlap: int = 50,
+        dedup_threshold: Optional[float] = 0.9,
+        shingle_size: int = 5,
+    ):
+        if max_tokens < 1:
+            raise ValueError("max_tokens must be at least 1")
+        self.max_tokens = max_tokens
+        self.count_tokens = count_tokens
+        self.separator = separator
+        self.merge_adjacent = merge_adjacent
+        self.min_overlap = min_overlap
+        self.dedup_threshold = dedup_threshold
+        self.shingle_size = shingle_size
+        self._separator_tokens = count_tokens(separator) if separator else 0
+
+    @staticmethod
+    def _score(doc: Document) -> Optional[float]:
+        for key in SCORE_KEYS:
+            if doc.metadata.get(key) is not None:
+                return float(doc.metadata[key])
+        return None
+
+    def _ranked(self, documents: List[Document]) -> List[int]:
+        scores = [self._score(doc) for doc in documents]
+        if all(score is not None for score in scores):
+            return sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)
+        return list(range(len(documents)))
+
+    def pack(
+        self,
+        documents: List[Document],
+        max_tokens: Optional[int] = None,
+        merged: bool = False,
+    ) -> PackedContext:
+        """
+        Pack documents into the budget.
+
+        Args:
+            documents: Retrieved chunks, in retrieval order
+            max_tokens: Budget overriding the packer's max_tokens
+            merged: The documents were already merged and deduplicated
+                (e.g. before compression), so that pass is skipped
+        """
+        budget = self.max_tokens if max_tokens is None else max_tokens
+        retrieved = len(documents)
+        if self.merge_adjacent and not merged:
+            documents = merge_adjacent(documents, min_overlap=self.min_overlap)
+        if self.dedup_threshold is not None and not merged:
+            documents = drop_duplicates(
+                documents, threshold=self.dedup_threshold, shingle_size=self.shingle_size)
+        if len(documents) < retrieved:
+            logger.info(
+                f"Context reduced {retrieved} chunks to {len(documents)} passages "
+                "by merging and deduplication"
+            )
+
+        used = 0
+        kept = set()
+        documents = list(documents)
+        for i in self._ranked(documents):
+            doc = documents[i]
+            tokens = self.count_tokens(doc.page_content)
+            # Annotate a copy: the caller's documents live on in graph state
+            documents[i] = Document(
+                page_content=doc.page_content,
+                metadata={**doc.metadata, "context_tokens": tokens},
+                id=doc.id,
+            )
+            cost = tokens + (self._separator_tokens if kept else 0)
+            if used + cost <= budget:
+                kept.add(i)
+                used += cost
+
+        packed = [doc for i, doc in enumerate(documents) if i in kept]
+        dropped = [doc for i, doc in enumerate(documents) if i not in kept]
+        context = PackedContext(
+            text=self.separator.join(doc.page_content for doc in packed),
+            documents=packed,
+            dropped=dropped,
+            tokens=used,
+        )
+        if dropped:
+            logger.info(
+                f"Context packed {len(packed)}/{len(documents)} chunks in {used} tokens "
+                f"(budget {budget}); dropped {len(dropped)} chunks, "
+                f"{context.dropped_tokens} tokens: "
+                f"{[doc.metadata.get('id') for doc in dropped]}"
+            )
+        return context
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    """Token count of text for the configured LLM, cached per text."""
+    try:
+        return get_llm().get_num_tokens(text)
+    except Exception as e:
+        logger.debug(f"LLM cannot count tokens, estimating from length: {e}")
+        return max(1, len(text) // FALLBACK_CHARS_PER_TOKEN)
+
+
+@lru_cache()
+def get_context_packer() -> ContextPacker:
+    return ContextPacker(
+        max_tokens=settings.context.max_tokens,
+        count_tokens=count_tokens,
+        separator=settings.context.separator,
+        merge_adjacent=settings.context.merge_adjacent,
+        min_overlap=settings.context.min_overlap,
+        dedup_threshold=settings.context.dedup_threshold,
+        shingle_size=settings.context.shingle_size,
+    )
@@ -0,0 +1,169 @@
+import hashlib
+import logging
+import unicodedata
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Tuple
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+from database.postgres import PostgresDB
+
+logger = logging.getLogger(__name__)
+
+
+class CacheLookup(NamedTuple):
+    """Hit/miss counts of one batch of chunk embeddings."""
+
+    hits: int
+    misses: int
+
+    def __add__(self, other: "CacheLookup") -> "CacheLookup":
+        return CacheLookup(self.hits + other.hits, self.misses + other.misses)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ChunkEmbeddingCache:
+    """
+    Persistent, content-addressed cache of chunk embeddings.
+
+    Vectors live in the embedding_cache table keyed by (model, SHA-256 of
+    the normalized text). Only texts missing from the table are sent to the
+    model; duplicates within a batch are embedded once. Unlike the query
+    cache, text is not lowercased since casing can change a document
+    embedding.
+    """
+
+    def __init__(self, db: PostgresDB):
+        self.db = db
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        normalized = " ".join(unicodedata.normalize("NFKC", text).split())
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def _plan(self, texts: List[str]) -> Tuple[List[str], Dict[str, str]]:
+        """Hash texts; return hashes in order and one text per distinct hash."""
+        hashes = [self.content_hash(text) for text in texts]
+        unique = {}
+        for digest, text in zip(hashes, texts):
+            unique.setdefault(digest, text)
+        return hashes, unique
+
+    def embed(
+        self,
+        model: str,
+        texts: List[str],
+        embed_documents: Callable[[List[str]], List[List[float]]],
+    ) -> Tuple[List[np.ndarray], CacheLookup]:
+        """
+        Embed texts, reusing cached vectors.
+
+        Args:
+            model: Embedding model name, part of the cache key
+            texts: Chunk texts
+            embed_documents: Model call for the texts not in the cache
+
+        Returns:
+            One vector per text, in order, and the lookup counts
+        """
+        if not texts:
+            return [], CacheLookup(0, 0)
+        hashes, unique = self._plan(texts)
+
+        # No connection is held while the model runs: look up, release,
+        # embed the misses, then write them back on a fresh session
+        found = self._fetch(model, list(unique))
+        missing = [digest for digest in unique if digest not in found]
+        if missing:
+            vectors = embed_documents([unique[digest] for digest in missing])
+            computed = {digest: np.asarray(vector, dtype=np.float32)
+                        for digest, vector in zip(missing, vectors)}
+            self._store(model, computed)
+            found.update(computed)
+
+        return [found[digest] for digest in hashes], self._lookup(hashes, missing)
+
+    def _fetch(self, model: str, digests: List[str]) -> Dict[str, np.ndarray]:
+        session = None
+        try:
+            session = self.db._Session()
+            cur = session.connection().connection.cursor()
+            cur.execute(
+                "SELECT content_hash, embedding FROM embedding_cache "
+                "WHERE model = %s AND content_hash = ANY(%s)",
+                [model, digests],
+            )
+            return {digest: np.asarray(vector, dtype=np.float32)
+                    for digest, vector in cur.fetchall()}
+        finally:
+            if session:
+                session.close()
+
+    def _store(self, model: str, vectors: Dict[str, np.ndarray]):
+        """Write computed vectors back; a failure only costs future cache hits."""
+        session = None
+        try:
+            session = self.db._Session()
+            cur = session.connection().connection.cursor()
+            execute_values(
+                cur,
+                "INSERT INTO embedding_cache (model, content_hash, embedding) "
+                "VALUES %s ON CONFLICT DO NOTHING",
+                [(model, digest, vector) for digest, vector in vectors.items()],
+            )
+            session.commit()
+        except Exception as e:
+            if session:
+                session.rollback()
+            logger.warning(f"Failed to cache {len(vectors)} chunk embeddings: {e}")
+        finally:
+            if session:
+                session.close()
+
+    async def aembed(
+        self,
+        model: str,
+        texts: List[str],
+        aembed_documents: Callable[[List[str]], Awaitable[List[List[float]]]],
+    ) -> Tuple[List[np.ndarray], CacheLookup]:
+        """Async version of embed, on the asyncpg pool."""
+        if not texts:
+            return [], CacheLookup(0, 0)
+        hashes, unique = self._plan(texts)
+
+        pool = await self.db.get_async_pool()
+        rows = await pool.fetch(
+            "SELECT content_hash, embedding FROM embedding_cache "
+            "WHERE model = $1 AND content_hash = ANY($2::text[])",
+            model,
+            list(unique),
+        )
+        found = {row["content_hash"]: np.asarray(row["embedding"], dtype=np.float32)
+                 for row in rows}
+
+        missing = [digest for digest in unique if digest not in found]
+        if missing:
+            vectors = await aembed_documents([unique[digest] for digest in missing])
+            computed = {digest: np.asarray(vector, dtype=np.float32)
+                        for digest, vector in zip(missing, vectors)}
+            try:
+                await pool.executemany(
+                    "INSERT INTO embedding_cache (model, content_hash, embedding) "
+                    "VALUES ($1, $2, $3::vector) ON CONFLICT DO NOTHING",
+                    [(model, digest, vector) for digest, vector in computed.items()],
+                )
+            except Exception as e:
+                logger.warning(f"Failed to cache {len(computed)} chunk embeddings: {e}")
+            found.update(computed)
+
+        return [found[digest] for digest in hashes], self._lookup(hashes, missing)
+
+    @staticmethod
+    def _lookup(hashes: List[str], missing: List[str]) -> CacheLookup:
+        # A text is a miss only for the first chunk that needed the model
+        misses = len(missing)
+        return CacheLookup(len(hashes) - misses, misses)
@@ -0,0 +1,104 @@
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU cache of query embeddings with an optional TTL.
+
+    Entries are keyed by (model name, normalized query text), so the same
+    question asked with different casing or spacing is embedded once.
+    Vectors are stored as read-only float32 arrays.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Unicode-normalize, lowercase and collapse whitespace."""
+        return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        key = (model, self.normalize(text))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, vector = entry
+                if self.ttl is None or self._clock() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return vector
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, model: str, text: str, embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector.setflags(write=False)
+        key = (model, self.normalize(text))
+        with self._lock:
+            self._entries[key] = (self._clock(), vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return vector
+
+    def get_or_compute(
+        self, model: str, text: str, compute: Callable[[str], List[float]]
+    ) -> np.ndarray:
+        """
+        Return the cached embedding of text, computing it on a miss.
+
+        The normalized text is only the cache key: the embedding is
+        computed on text as given, so cased models see the query exactly
+        as a direct embed_query call would.
+        """
+        vector = self.get(model, text)
+        if vector is None:
+            vector = self.put(model, text, compute(text))
+        return vector
+
+    async def aget_or_compute(
+        self, model: str, text: str, compute: Callable[[str], Awaitable[List[float]]]
+    ) -> np.ndarray:
+        """Async version of get_or_compute."""
+        vector = self.get(model, text)
+        if vector is None:
+            vector = self.put(model, text, await compute(text))
+        return vector
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
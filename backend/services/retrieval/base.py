@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from enum import Enum
 from typing import List, Optional
@@ -24,3 +25,7 @@ class BaseRetriever(ABC):
     @abstractmethod
     def retrieve(self, query: str, user_id: str = None, **kwargs) -> List[Document]:
         pass
+
+    async def aretrieve(self, query: str, user_id: str = None, **kwargs) -> List[Document]:
+        """Async retrieve; runs retrieve() in a thread unless overridden."""
+        return await asyncio.to_thread(self.retrieve, query, user_id, **kwargs)
@@ -0,0 +1,122 @@
+import logging
+from typing import List, Optional, Sequence
+
+from langchain.schema import Document
+
+from services.context.merging import SCORE_KEYS
+
+logger = logging.getLogger(__name__)
+
+CUTOFF_METHODS = ("relative", "gap", "elbow")
+RERANK_KEY = SCORE_KEYS[0]
+
+
+def _all_have(documents: List[Document], key: str) -> bool:
+    return all(doc.metadata.get(key) is not None for doc in documents)
+
+
+def relevance_scores(documents: List[Document]) -> Optional[List[float]]:
+    """
+    Relevance scores the cut is looked for in, higher is better.
+
+    Reranked documents are ordered by their rerank score, which is used as
+    is. A fused (RRF) score only depends on ranks, so its curve has the
+    same shape whatever the query; fused documents are instead scored by
+    the cosine similarity (1 - distance) of those the dense leg matched,
+    sorted best first, and the cut tells how many fused documents to keep.
+    None when there is neither.
+    """
+    if _all_have(documents, RERANK_KEY):
+        return [float(doc.metadata[RERANK_KEY]) for doc in documents]
+    similarities = sorted(
+        (
+            1.0 - float(doc.metadata["distance"])
+            for doc in documents
+            if doc.metadata.get("distance") is not None
+        ),
+        reverse=True,
+    )
+    return similarities or None
+
+
+def _relative_cut(normalized: List[float], min_relative_score: float) -> int:
+    for i, score in enumerate(normalized):
+        if score < min_relative_score:
+            return i
+    return len(normalized)
+
+
+def _gap_cut(normalized: List[float], gap_ratio: float, min_k: int) -> int:
+    for i in range(max(min_k, 1), len(normalized)):
+        if normalized[i - 1] - normalized[i] >= gap_ratio:
+            return i
+    return len(normalized)
+
+
+def _elbow_cut(normalized: List[float]) -> int:
+    """Kneedle: keep up to the point furthest below the first-to-last chord."""
+    n = len(normalized) - 1
+    if n < 2:
+        return len(normalized)
+    first, last = normalized[0], normalized[-1]
+    below = [first + (last - first) * i / n - score for i, score in enumerate(normalized)]
+    knee = max(range(len(below)), key=below.__getitem__)
+    return knee + 1 if below[knee] > 0 else len(normalized)
+
+
+def adaptive_cutoff(
+    documents: List[Document],
+    min_k: int = 2,
+    max_k: int = 10,
+    methods: Sequence[str] = CUTOFF_METHODS,
+    min_relative_score: float = 0.5,
+    gap_ratio: float = 0.25,
+    min_spread: float = 0.05,
+) -> List[Document]:
+    """
+    Keep the leading documents until their relevance falls off.
+
+    documents are expected best first. The relevance scores of the first
+    max_k (see relevance_scores) are rescaled so the best is 1 and 0 is a
+    score of 0, or the worst candidate when scores can be negative. Each
+    method then proposes a cut and the earliest one wins:
+
+    - relative: before the first score below min_relative_score
+    - gap: before the first drop between consecutive scores of at least
+      gap_ratio
+    - elbow: after the knee of the score curve
+
+    At least min_k and at most max_k documents are kept. Documents without
+    scores, or whose scores differ by less than min_spread of the best one,
+    are cut at max_k: there is no falloff to find.
+    """
+    unknown = set(methods) - set(CUTOFF_METHODS)
+    if unknown:
+        raise ValueError(f"Unknown cutoff methods: {sorted(unknown)}")
+    candidates = documents[:max_k]
+    if len(candidates) <= min_k:
+        return candidates
+    scores = relevance_scores(candidates)
+    if scores is None or len(scores) <= min_k:
+        return candidates
+    best, worst = max(scores), min(scores)
+    floor = min(worst, 0.0)
+    if best - worst <= min_spread * (best - floor):
+        return candidates
+    normalized = [(score - floor) / (best - floor) for score in scores]
+
+    cuts = []
+    if "relative" in methods:
+        cuts.append(_relative_cut(normalized, min_relative_score))
+    if "gap" in methods:
+        cuts.append(_gap_cut(normalized, gap_ratio, min_k))
+    if "elbow" in methods:
+        cuts.append(_elbow_cut(normalized))
+    # A method that keeps every score does not cut documents without one
+    k = max(min_k, min(
+        [cut for cut in cuts if cut < len(scores)], default=len(candidates)))
+    logger.debug(
+        f"Adaptive cutoff kept {k}/{len(candidates)} chunks "
+        f"(scores {[round(score, 3) for score in scores]})"
+    )
+    return candidates[:k]
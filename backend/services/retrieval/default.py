@@ -1,25 +1,141 @@
+import asyncio
+import logging
 from typing import List, Optional
 
 from langchain.schema import Document
 
+from core.config import AdaptiveCutoffConfig, settings
 from core.supabase_client import get_supabase_client
+from database.postgres import PostgresDB
 from services.retrieval.base import BaseRetriever
+from services.retrieval.cutoff import adaptive_cutoff
 from services.vector_store.vector_store_service import VectorStoreService
 
 supabase = get_supabase_client()
+logger = logging.getLogger(__name__)
+
+COURSE_MEMBER_SQL = "SELECT 1 FROM user_course WHERE user_id = {} AND course_id = {} LIMIT 1"
 
 
 class DefaultRetriever(BaseRetriever):
+    """
+    Retrieves the k chunks similarity_search ranks first. With the adaptive
+    cutoff enabled, retrieves up to cutoff.max_k chunks and keeps those
+    before their scores fall off (see adaptive_cutoff) instead.
+
+    A course_id only scopes the search to the course's chunks if the user
+    is enrolled in it (user_course); otherwise the user's own chunks are
+    searched.
+    """
+
     def __init__(
-        self, vector_store: Optional[VectorStoreService] = None, k: int = 5, **kwargs
+        self,
+        vector_store: Optional[VectorStoreService] = None,
+        k: int = 5,
+        cutoff: Optional[AdaptiveCutoffConfig] = None,
+        **kwargs,
     ):
         super().__init__(vector_store)
         self.default_k = k
+        self.cutoff = cutoff or settings.retrieval.cutoff
 
-    def retrieve(self, query: str, user_id: str = None, **kwargs) -> List[Document]:
+    def _top_k(self, k: Optional[int]) -> int:
+        """Number of chunks to retrieve when k are asked for."""
+        if self.cutoff.enabled:
+            return self.cutoff.max_k
+        return k or self.default_k
+
+    def _cut(self, documents: List[Document]) -> List[Document]:
+        if not self.cutoff.enabled:
+            return documents
+        return adaptive_cutoff(
+            documents,
+            min_k=self.cutoff.min_k,
+            max_k=self.cutoff.max_k,
+            methods=self.cutoff.methods,
+            min_relative_score=self.cutoff.min_relative_score,
+            gap_ratio=self.cutoff.gap_ratio,
+            min_spread=self.cutoff.min_spread,
+        )
+
+    @staticmethod
+    def _current_user_id() -> str:
         user = supabase.auth.get_user()
-        current_user_id = ""
-        if user:
-            current_user_id = user.user.id
+        return user.user.id if user else ""
+
+    @staticmethod
+    async def _acurrent_user_id() -> str:
+        user = await asyncio.to_thread(supabase.auth.get_user)
+        return user.user.id if user else ""
+
+    @staticmethod
+    def _course_scope(user_id: str, course_id: Optional[int], member: bool) -> Optional[int]:
+        if course_id is None or member:
+            return course_id
+        logger.warning(
+            f"User {user_id or '<none>'} is not enrolled in course {course_id}, "
+            "searching their own chunks instead"
+        )
+        return None
+
+    def _allowed_course(self, user_id: str, course_id: Optional[int]) -> Optional[int]:
+        """course_id if user_id may search the course's chunks, else None."""
+        member = False
+        if course_id is not None and user_id:
+            member = bool(PostgresDB.fetch_all(
+                COURSE_MEMBER_SQL.format("%s::uuid", "%s"), (str(user_id), int(course_id))))
+        return self._course_scope(user_id, course_id, member)
+
+    async def _aallowed_course(self, user_id: str, course_id: Optional[int]) -> Optional[int]:
+        """Async version of _allowed_course."""
+        member = False
+        if course_id is not None and user_id:
+            pool = await PostgresDB.get_async_pool()
+            member = await pool.fetchval(
+                COURSE_MEMBER_SQL.format("$1::uuid", "$2"), str(user_id), int(course_id)
+            ) is not None
+        return self._course_scope(user_id, course_id, member)
+
+    def _search(
+        self,
+        query: str,
+        user_id: str,
+        top_k: Optional[int] = None,
+        course_id: Optional[int] = None,
+    ) -> List[Document]:
+        kwargs = {"course_id": self._allowed_course(user_id, course_id)}
+        if top_k is not None:
+            kwargs["top_k"] = top_k
+        return self.store.similarity_search(query, user_id, **kwargs)
+
+    async def _asearch(
+        self,
+        query: str,
+        user_id: str,
+        top_k: Optional[int] = None,
+        course_id: Optional[int] = None,
+    ) -> List[Document]:
+        kwargs = {"course_id": await self._aallowed_course(user_id, course_id)}
+        if top_k is not None:
+            kwargs["top_k"] = top_k
+        if hasattr(self.store, "asimilarity_search"):
+            return await self.store.asimilarity_search(query, user_id, **kwargs)
+        return await asyncio.to_thread(
+            self.store.similarity_search, query, user_id, **kwargs
+        )
+
+    def retrieve(self, query: str, user_id: str = None, **kwargs) -> List[Document]:
+        return self._cut(self._search(
+            query,
+            self._current_user_id(),
+            top_k=self._top_k(kwargs.get("k")),
+            course_id=kwargs.get("course_id"),
+        ))
 
-        return self.store.similarity_search(query, current_user_id)
+    async def aretrieve(self, query: str, user_id: str = None, **kwargs) -> List[Document]:
+        return self._cut(await self._asearch(
+            query,
+            await self._acurrent_user_id(),
+            top_k=self._top_k(kwargs.get("k")),
+            course_id=kwargs.get("course_id"),
+        ))
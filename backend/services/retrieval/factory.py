@@ -13,6 +13,12 @@ class RetrieverFactory:
         method: Union[str, RetrievalMethod], vector_store=None, **kwargs
     ) -> BaseRetriever:
         from services.retrieval.default import DefaultRetriever
+        from services.retrieval.reranked import RerankedRetriever
+
+        retrievers = {
+            RetrievalMethod.DEFAULT: DefaultRetriever,
+            RetrievalMethod.RERANKED: RerankedRetriever,
+        }
 
         if isinstance(method, str):
             try:
@@ -25,13 +31,31 @@ class RetrieverFactory:
                     f"Invalid retrieval method: '{method}', falling back to DEFAULT"
                 )
                 method = RetrievalMethod.DEFAULT
-        filtered_kwargs = {
-            "vector_store": vector_store} if vector_store else {}
+        filtered_kwargs = dict(kwargs)
+        if vector_store:
+            filtered_kwargs["vector_store"] = vector_store
 
-        logger.warning(
-            "RerankedRetriever not implemented, falling back to DefaultRetriever"
-        )
-        return DefaultRetriever(**filtered_kwargs)
+        retriever_class = retrievers.get(method)
+        if retriever_class is None:
+            logger.warning(
+                f"Retrieval method '{method.value}' not implemented, "
+                "falling back to DefaultRetriever"
+            )
+            retriever_class = DefaultRetriever
+        return retriever_class(**filtered_kwargs)
+
+    @staticmethod
+    def config_params() -> Dict[str, Any]:
+        """Retriever arguments from settings.retrieval: k and params."""
+        from core.config import settings
+
+        params = {}
+        if hasattr(settings.retrieval, "k"):
+            params["k"] = settings.retrieval.k
+        if hasattr(settings.retrieval, "params"):
+            for key, value in settings.retrieval.params.items():
+                params[key] = value
+        return params
 
     @staticmethod
     def from_config(config: Dict[str, Any] = None) -> BaseRetriever:
@@ -42,14 +66,8 @@ class RetrieverFactory:
                 method = settings.retrieval.method
                 logger.info(
                     f"Creating retriever from config with method: {method}")
-                params = {}
-                if hasattr(settings.retrieval, "k"):
-                    params["k"] = settings.retrieval.k
-                if hasattr(settings.retrieval, "params"):
-                    method_params = settings.retrieval.params
-                    for key, value in method_params.items():
-                        params[key] = value
-                return RetrieverFactory.get_retriever(method, **params)
+                return RetrieverFactory.get_retriever(
+                    method, **RetrieverFactory.config_params())
             logger.info("No retrieval config found, using default retriever")
             return RetrieverFactory.get_retriever(RetrievalMethod.DEFAULT)
         method = (
@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain.schema import Document
+
+from core.factories.reranker_factory import get_cross_encoder
+from services.embedding.query_cache import QueryEmbeddingCache
+from services.retrieval.default import DefaultRetriever
+from services.vector_store.vector_store_service import VectorStoreService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+class CrossEncoderReranker:
+    """
+    Scores (query, chunk) pairs with a cross-encoder, in batches.
+
+    Scores are the sigmoid of the model's logits, in [0, 1]. They are kept
+    in a bounded LRU cache keyed by (query hash, chunk id), so follow-up
+    questions and retries only score chunks not seen yet for that query.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_RERANKER_MODEL,
+        backend: str = "torch",
+        model_file: Optional[str] = None,
+        batch_size: int = 32,
+        cache_size: int = 4096,
+    ):
+        if cache_size < 1:
+            raise ValueError("cache_size must be at least 1")
+        self.model_name = model_name
+        self.backend = backend
+        self.model_file = model_file
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._scores: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        return get_cross_encoder(self.model_name, self.backend, self.model_file)
+
+    @staticmethod
+    def _query_key(query: str) -> str:
+        normalized = QueryEmbeddingCache.normalize(query)
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _chunk_key(doc: Document) -> str:
+        chunk_id = doc.metadata.get("id")
+        if chunk_id:
+            return str(chunk_id)
+        return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+    def score(self, query: str, documents: List[Document]) -> List[float]:
+        """Relevance score of each document for query, in input order."""
+        query_key = self._query_key(query)
+        keys = [(query_key, self._chunk_key(doc)) for doc in documents]
+        scores: Dict[Tuple[str, str], float] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._scores:
+                    self._scores.move_to_end(key)
+                    scores[key] = self._scores[key]
+
+        pending = {}
+        for key, doc in zip(keys, documents):
+            if key not in scores:
+                pending.setdefault(key, doc.page_content)
+        if pending:
+            predicted = self.model.predict(
+                [(query, content) for content in pending.values()],
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+            probabilities = 1.0 / (1.0 + np.exp(-np.asarray(predicted, dtype=float)))
+            new_scores = dict(zip(pending, probabilities.tolist()))
+            scores.update(new_scores)
+            with self._lock:
+                self._scores.update(new_scores)
+                while len(self._scores) > self.cache_size:
+                    self._scores.popitem(last=False)
+
+        logger.debug(
+            f"Reranked {len(documents)} chunks, {len(documents) - len(pending)} cached")
+        return [scores[key] for key in keys]
+
+    def rerank(
+        self,
+        query: str,
+        documents: List[Document],
+        top_k: int,
+        threshold: Optional[float] = None,
+    ) -> List[Document]:
+        """
+        Return the top_k documents by cross-encoder score, best first, with
+        the score in metadata["rerank_score"]. Documents scoring below
+        threshold, in [0, 1], are dropped.
+        """
+        if not documents:
+            return []
+        scores = self.score(query, documents)
+        order = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)
+        reranked = []
+        for i in order:
+            if threshold is not None and scores[i] < threshold:
+                break
+            doc = documents[i]
+            doc.metadata["rerank_score"] = scores[i]
+            reranked.append(doc)
+            if len(reranked) == top_k:
+                break
+        return reranked
+
+    def clear(self):
+        with self._lock:
+            self._scores.clear()
+
+
+@lru_cache()
+def get_reranker(
+    model_name: str = DEFAULT_RERANKER_MODEL,
+    backend: str = "torch",
+    model_file: Optional[str] = None,
+    batch_size: int = 32,
+    cache_size: int = 4096,
+) -> CrossEncoderReranker:
+    """Shared reranker, so retriever instances share one score cache."""
+    return CrossEncoderReranker(model_name, backend, model_file, batch_size, cache_size)
+
+
+class RerankedRetriever(DefaultRetriever):
+    """
+    Retrieves fused candidates with similarity_search, then keeps the k
+    chunks a CPU cross-encoder scores highest for the query. The adaptive
+    cutoff, when enabled, is applied to the cross-encoder scores.
+    """
+
+    def __init__(
+        self,
+        vector_store: Optional[VectorStoreService] = None,
+        k: int = 5,
+        reranker_model: str = DEFAULT_RERANKER_MODEL,
+        reranker_threshold: Optional[float] = None,
+        reranker_backend: str = "torch",
+        reranker_model_file: Optional[str] = None,
+        reranker_candidates: int = 50,
+        reranker_batch_size: int = 32,
+        reranker_cache_size: int = 4096,
+        **kwargs,
+    ):
+        super().__init__(vector_store, k=k, **kwargs)
+        self.threshold = reranker_threshold
+        self.candidates = max(reranker_candidates, self._top_k(k))
+        self.reranker = get_reranker(
+            reranker_model,
+            reranker_backend,
+            reranker_model_file,
+            reranker_batch_size,
+            reranker_cache_size,
+        )
+
+    def retrieve(self, query: str, user_id: str = None, **kwargs) -> List[Document]:
+        candidates = self._search(
+            query, self._current_user_id(), top_k=self.candidates,
+            course_id=kwargs.get("course_id"))
+        return self._cut(self.reranker.rerank(
+            query, candidates, self._top_k(kwargs.get("k")), self.threshold))
+
+    async def aretrieve(self, query: str, user_id: str = None, **kwargs) -> List[Document]:
+        candidates = await self._asearch(
+            query, await self._acurrent_user_id(), top_k=self.candidates,
+            course_id=kwargs.get("course_id"))
+        # Model inference is CPU bound
+        return self._cut(await asyncio.to_thread(
+            self.reranker.rerank,
+            query,
+            candidates,
+            self._top_k(kwargs.get("k")),
+            self.threshold,
+        ))
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from typing import Any, Dict, List, Optional, Union
 
@@ -21,10 +22,19 @@ class Retriever:
             f"Initialized retriever with default strategy: {type(self.default_retriever).__name__}"
         )
 
+    def _for_method(self, method: Union[str, RetrievalMethod]):
+        """
+        Retriever for an explicitly named method, built with the configured
+        parameters (k, reranker settings, ...) like the default one.
+        """
+        if str(getattr(method, "value", method)) == settings.retrieval.method:
+            return self.default_retriever
+        return self.factory.get_retriever(
+            method, vector_store=self.store, **self.factory.config_params())
+
     def as_retriever(self, method: Union[str, RetrievalMethod] = None, **kwargs):
         if method:
-            retriever = self.factory.get_retriever(
-                method, vector_store=self.store)
+            retriever = self._for_method(method)
             logger.debug(
                 f"Creating LangChain retriever with strategy: {method}")
         else:
@@ -48,9 +58,38 @@ class Retriever:
         user_id = None
         if user:
             user_id = user.user.id
+        retriever = self._select_retriever(query, method, user_id, kwargs)
+        docs = retriever.retrieve(query, **kwargs)
+        logger.debug(
+            f"Retrieved {len(docs)} documents using {type(retriever).__name__}"
+        )
+        return docs
+
+    async def aretrieve(
+        self, query: str, method: Union[str, RetrievalMethod] = None, **kwargs
+    ):
+        """Async version of retrieve; does not block the event loop."""
+        supabase = get_supabase_client()
+        user = await asyncio.to_thread(supabase.auth.get_user)
+        user_id = None
+        if user:
+            user_id = user.user.id
+        retriever = self._select_retriever(query, method, user_id, kwargs)
+        docs = await retriever.aretrieve(query, **kwargs)
+        logger.debug(
+            f"Retrieved {len(docs)} documents using {type(retriever).__name__}"
+        )
+        return docs
+
+    def _select_retriever(
+        self,
+        query: str,
+        method: Union[str, RetrievalMethod],
+        user_id: Optional[str],
+        kwargs: Dict[str, Any],
+    ):
         if method:
-            retriever = self.factory.get_retriever(
-                method, vector_store=self.store)
+            retriever = self._for_method(method)
             logger.debug(
                 f"Using retrieval strategy '{method}' for query: {query[:50]}..."
             )
@@ -65,8 +104,4 @@ class Retriever:
             )
         if user_id:
             kwargs["user_id"] = user_id
-        docs = retriever.retrieve(query, **kwargs)
-        logger.debug(
-            f"Retrieved {len(docs)} documents using {type(retriever).__name__}"
-        )
-        return docs
+        return retriever
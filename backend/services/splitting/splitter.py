@@ -1,5 +1,5 @@
 import uuid
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional
 
 from langchain.schema import Document
 from langchain_experimental.text_splitter import SemanticChunker
@@ -34,10 +34,22 @@ class Splitter:
     def recursive_character_text_splitter(
         self, documents: List[Document]
     ) -> List[Document]:
+        # start_index lets retrieval merge overlapping neighbours back together
         text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            add_start_index=True,
         )
         documents = text_splitter.split_documents(documents)
-        for doc in text_splitter.split_documents(documents):
+        for doc in documents:
             doc.id = str(uuid.uuid4())
         return documents
+
+    def iter_split_document(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """
+        Lazily split documents one at a time, for streaming ingestion.
+
+        Chunks come out in the same order as split_document would return them.
+        """
+        for document in documents:
+            yield from self.split_document([document])
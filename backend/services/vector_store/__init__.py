@@ -1,8 +1,10 @@
 from services.vector_store.base import VectorStoreBase
 from services.vector_store.vector_store_service import VectorStoreService
 from services.vector_store.pgvector import PGVectorStore
+from services.vector_store.faiss_store import FAISSVectorStore
 __all__ = [
     "VectorStoreBase",
     "VectorStoreService",
-    "PGVectorStore"
+    "PGVectorStore",
+    "FAISSVectorStore"
 ]
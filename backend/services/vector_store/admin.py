@@ -0,0 +1,65 @@
+"""
+Maintenance of the pgvector chunk store, run on deploy or by an operator
+rather than by the API process:
+
+    python -m services.vector_store.admin ensure-indexes
+    python -m services.vector_store.admin reindex
+    python -m services.vector_store.admin rebuild-index
+    python -m services.vector_store.admin partition-by-course [--course ID ...]
+    python -m services.vector_store.admin create-course-partition ID [ID ...]
+"""
+import argparse
+import logging
+
+from core.utils.logger import setup_logging
+from services.vector_store.partitioning import partition_by_course
+from services.vector_store.pgvector import PGVectorStore
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m services.vector_store.admin",
+        description="Maintain the ANN index and partitions of chunks_embeddings",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser(
+        "ensure-indexes", help="Build the configured ANN index if missing or invalid")
+    reindex = commands.add_parser("reindex", help="Rebuild the current ANN index in place")
+    reindex.add_argument(
+        "--blocking", action="store_true", help="Reindex without CONCURRENTLY")
+    commands.add_parser(
+        "rebuild-index",
+        help="Build the configured ANN index next to the current one and swap it in",
+    )
+    partition = commands.add_parser(
+        "partition-by-course",
+        help="Convert chunks_embeddings to a table partitioned by course_id, online",
+    )
+    partition.add_argument(
+        "--course", type=int, nargs="*", default=[], help="Courses to give a partition")
+    partition.add_argument(
+        "--batch-size", type=int, default=5000, help="Rows copied per transaction")
+    create_partition = commands.add_parser(
+        "create-course-partition", help="Give courses their own partition ahead of time")
+    create_partition.add_argument("course", type=int, nargs="+")
+    args = parser.parse_args(argv)
+
+    setup_logging(level=logging.INFO)
+    store = PGVectorStore()
+    if args.command == "ensure-indexes":
+        store.ensure_indexes()
+    elif args.command == "reindex":
+        store.reindex(concurrently=not args.blocking)
+    elif args.command == "rebuild-index":
+        store.rebuild_index()
+    elif args.command == "partition-by-course":
+        partition_by_course(store, course_ids=args.course, batch_size=args.batch_size)
+    elif args.command == "create-course-partition":
+        for course_id in args.course:
+            store.create_course_partition(course_id)
+
+
+if __name__ == "__main__":
+    main()
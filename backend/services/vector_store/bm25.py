@@ -0,0 +1,481 @@
+import heapq
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+# Longer tokens are almost always noise (URLs, base64, hashes) and would
+# widen the fixed-width vocabulary array for every term
+MAX_TOKEN_BYTES = 48
+
+FILE_MAGIC = b"BM25IDX1"
+FILE_VERSION = 1
+ALIGNMENT = 64
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokenizer shared by indexing and querying."""
+    return [
+        token
+        for token in TOKEN_PATTERN.findall(text.lower())
+        if len(token.encode("utf-8")) <= MAX_TOKEN_BYTES
+    ]
+
+
+def _encode(values: Sequence[str]) -> np.ndarray:
+    """Encode strings as a fixed-width bytes array (compact and mmap-able)."""
+    encoded = [value.encode("utf-8") for value in values]
+    width = max((len(value) for value in encoded), default=1) or 1
+    return np.array(encoded, dtype=f"S{width}")
+
+
+class BM25Hit(NamedTuple):
+    chunk_id: str
+    document_id: str
+    score: float
+
+
+class BM25Segment:
+    """
+    Immutable term -> postings matrix in CSR layout.
+
+    Postings of term t are postings[indptr[t]:indptr[t + 1]] (document
+    positions) with matching term frequencies in tfs. The vocabulary is a
+    sorted fixed-width bytes array searched with np.searchsorted, so every
+    array can be memory-mapped straight from disk and shared between
+    worker processes.
+    """
+
+    ARRAYS = ("terms", "indptr", "postings", "tfs", "doc_len", "chunk_ids", "document_ids")
+
+    def __init__(
+        self,
+        terms: np.ndarray,
+        indptr: np.ndarray,
+        postings: np.ndarray,
+        tfs: np.ndarray,
+        doc_len: np.ndarray,
+        chunk_ids: np.ndarray,
+        document_ids: np.ndarray,
+    ):
+        self.terms = terms
+        self.indptr = indptr
+        self.postings = postings
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.chunk_ids = chunk_ids
+        self.document_ids = document_ids
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.doc_len)
+
+    @property
+    def n_terms(self) -> int:
+        return len(self.terms)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+    @classmethod
+    def build(
+        cls,
+        chunk_ids: Sequence[str],
+        document_ids: Sequence[str],
+        texts: Iterable[str],
+    ) -> "BM25Segment":
+        """Tokenize texts and build the CSR postings in a few vectorized passes."""
+        tokens: List[str] = []
+        token_docs: List[int] = []
+        doc_len: List[int] = []
+        for position, text in enumerate(texts):
+            doc_tokens = tokenize(text or "")
+            tokens.extend(doc_tokens)
+            token_docs.extend([position] * len(doc_tokens))
+            doc_len.append(len(doc_tokens))
+
+        n_docs = len(doc_len)
+        if n_docs != len(chunk_ids) or n_docs != len(document_ids):
+            raise ValueError("chunk_ids, document_ids and texts must have the same length")
+
+        if tokens:
+            terms, term_of_token = np.unique(_encode(tokens), return_inverse=True)
+        else:
+            terms, term_of_token = np.array([], dtype="S1"), np.array([], dtype=np.int64)
+
+        # One key per (term, doc) pair; unique() both counts term frequencies
+        # and sorts postings by term, then by document
+        keys = term_of_token.astype(np.int64) * max(n_docs, 1) + np.asarray(
+            token_docs, dtype=np.int64
+        )
+        keys, counts = np.unique(keys, return_counts=True)
+        posting_terms = keys // max(n_docs, 1)
+
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(posting_terms, minlength=len(terms)), out=indptr[1:])
+
+        return cls(
+            terms=terms,
+            indptr=indptr,
+            postings=(keys % max(n_docs, 1)).astype(np.int32),
+            tfs=counts.astype(np.float32),
+            doc_len=np.asarray(doc_len, dtype=np.float32),
+            chunk_ids=_encode(chunk_ids),
+            document_ids=_encode(document_ids),
+        )
+
+    def lookup(self, tokens: Sequence[str]) -> np.ndarray:
+        """Map tokens to term ids, dropping tokens missing from the vocabulary."""
+        if not tokens or not self.n_terms:
+            return np.array([], dtype=np.int64)
+        query = _encode(tokens)
+        positions = np.searchsorted(self.terms, query)
+        positions = np.minimum(positions, self.n_terms - 1)
+        return positions[self.terms[positions] == query]
+
+    def save(self, path: str, metadata: Optional[Dict] = None):
+        """
+        Write the segment to a single file, atomically.
+
+        Layout: magic, header length, JSON header, then every array at a
+        64-byte aligned offset so it can be memory-mapped in place.
+        """
+        arrays = {name: np.ascontiguousarray(getattr(self, name)) for name in self.ARRAYS}
+        header = {
+            "version": FILE_VERSION,
+            "metadata": metadata or {},
+            "arrays": {},
+        }
+        # Offsets depend on the header size, which depends on the offsets;
+        # reserve a generous fixed header block instead of iterating
+        header_block = 4096 + len(json.dumps(metadata or {}))
+        header_block += -header_block % ALIGNMENT
+        offset = len(FILE_MAGIC) + 8 + header_block
+        for name, array in arrays.items():
+            offset += -offset % ALIGNMENT
+            header["arrays"][name] = {
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+                "offset": offset,
+            }
+            offset += array.nbytes
+
+        header_bytes = json.dumps(header).encode("utf-8")
+        if len(header_bytes) > header_block:
+            raise ValueError("BM25 index header too large")
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(FILE_MAGIC)
+                f.write(len(header_bytes).to_bytes(8, "little"))
+                f.write(header_bytes.ljust(header_block, b" "))
+                for name, array in arrays.items():
+                    f.seek(header["arrays"][name]["offset"])
+                    f.write(array.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> Tuple["BM25Segment", Dict]:
+        """
+        Load a segment written by save().
+
+        With mmap=True arrays are read-only views of the page cache, so
+        workers loading the same file share its memory.
+
+        Returns:
+            The segment and the metadata stored with it
+        """
+        with open(path, "rb") as f:
+            if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+                raise ValueError(f"{path} is not a BM25 index file")
+            header_len = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_len))
+        if header.get("version") != FILE_VERSION:
+            raise ValueError(f"Unsupported BM25 index version in {path}")
+
+        arrays = {}
+        for name in cls.ARRAYS:
+            spec = header["arrays"][name]
+            dtype, shape = np.dtype(spec["dtype"]), tuple(spec["shape"])
+            if not mmap or int(np.prod(shape)) == 0:
+                with open(path, "rb") as f:
+                    f.seek(spec["offset"])
+                    count = int(np.prod(shape))
+                    arrays[name] = np.fromfile(f, dtype=dtype, count=count).reshape(shape)
+            else:
+                arrays[name] = np.memmap(
+                    path, dtype=dtype, mode="r", offset=spec["offset"], shape=shape
+                )
+        return cls(**arrays), header["metadata"]
+
+
+def _merge_segments(
+    segments: Sequence[BM25Segment], live_masks: Sequence[np.ndarray]
+) -> BM25Segment:
+    """
+    Merge segments into one, dropping tombstoned documents.
+
+    Works on the postings in COO form: term ids are remapped onto the merged
+    vocabulary, document positions onto the surviving documents, and the
+    (term, doc) pairs are re-sorted to rebuild the CSR arrays.
+    """
+    terms = np.unique(np.concatenate([segment.terms for segment in segments]))
+    n_docs = int(sum(int(live.sum()) for live in live_masks))
+
+    keys, tfs = [], []
+    doc_offset = 0
+    for segment, live in zip(segments, live_masks):
+        # New position of every surviving document in the merged segment
+        new_position = np.cumsum(live, dtype=np.int64) - 1 + doc_offset
+        term_map = np.searchsorted(terms, segment.terms)
+        posting_terms = np.repeat(
+            term_map, np.diff(segment.indptr)).astype(np.int64)
+        keep = live[segment.postings]
+        keys.append(posting_terms[keep] * max(n_docs, 1) +
+                    new_position[segment.postings[keep]])
+        tfs.append(segment.tfs[keep])
+        doc_offset += int(live.sum())
+
+    keys = np.concatenate(keys)
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // max(n_docs, 1),
+              minlength=len(terms)), out=indptr[1:])
+
+    return BM25Segment(
+        terms=terms,
+        indptr=indptr,
+        postings=(keys % max(n_docs, 1)).astype(np.int32),
+        tfs=np.concatenate(tfs)[order].astype(np.float32),
+        doc_len=np.concatenate(
+            [segment.doc_len[live] for segment, live in zip(segments, live_masks)]
+        ).astype(np.float32),
+        chunk_ids=np.concatenate(
+            [segment.chunk_ids[live] for segment, live in zip(segments, live_masks)]
+        ),
+        document_ids=np.concatenate(
+            [segment.document_ids[live]
+                for segment, live in zip(segments, live_masks)]
+        ),
+    )
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a list of BM25Segments, scored with NumPy.
+
+    The index is updated incrementally: add() appends a small segment for
+    the new chunks and delete() only flips tombstone bits, so neither
+    touches the existing postings. compact() later merges everything into a
+    single segment without the tombstoned documents. Document frequencies
+    and the corpus size are both taken over live documents only, so scores
+    do not depend on whether a delete has been compacted yet.
+
+    Each query term adds its contribution to a dense score vector with one
+    vectorized operation over its postings, and the top k are selected with
+    np.argpartition instead of sorting the whole corpus.
+
+    Readers work on an immutable snapshot of (segments, live masks) which
+    writers replace atomically, so search() never takes a lock.
+    """
+
+    def __init__(self, segment: BM25Segment, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._state: Tuple[Tuple[BM25Segment, ...], Tuple[np.ndarray, ...]] = (
+            (segment,),
+            (np.ones(segment.n_docs, dtype=bool),),
+        )
+        self._write_lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+
+    @classmethod
+    def from_texts(
+        cls,
+        chunk_ids: Sequence[str],
+        document_ids: Sequence[str],
+        texts: Iterable[str],
+        k1: float = 1.2,
+        b: float = 0.75,
+    ) -> "BM25Index":
+        return cls(BM25Segment.build(chunk_ids, document_ids, texts), k1=k1, b=b)
+
+    @classmethod
+    def load(cls, path: str, k1: float = 1.2, b: float = 0.75, mmap: bool = True):
+        """Load a persisted index; returns (index, metadata)."""
+        segment, metadata = BM25Segment.load(path, mmap=mmap)
+        return cls(segment, k1=k1, b=b), metadata
+
+    def save(self, path: str, metadata: Optional[Dict] = None):
+        """Persist the index, compacting it first if it has pending changes."""
+        if self.n_segments > 1 or self.n_deleted:
+            self.compact()
+        self._state[0][0].save(path, metadata)
+
+    def __len__(self) -> int:
+        return int(sum(int(live.sum()) for live in self._state[1]))
+
+    @property
+    def n_segments(self) -> int:
+        return len(self._state[0])
+
+    @property
+    def n_deleted(self) -> int:
+        return int(sum(int((~live).sum()) for live in self._state[1]))
+
+    def needs_compaction(self, max_segments: int = 8, max_deleted_ratio: float = 0.2) -> bool:
+        segments, live_masks = self._state
+        total = sum(len(live) for live in live_masks)
+        return len(segments) > max_segments or (
+            total > 0 and self.n_deleted / total > max_deleted_ratio
+        )
+
+    def add(
+        self,
+        chunk_ids: Sequence[str],
+        document_ids: Sequence[str],
+        texts: Iterable[str],
+    ):
+        """Index new chunks; chunks already present are replaced."""
+        if not chunk_ids:
+            return
+        segment = BM25Segment.build(chunk_ids, document_ids, texts)
+        with self._write_lock:
+            self._tombstone(lambda s: np.isin(s.chunk_ids, segment.chunk_ids))
+            segments, live_masks = self._state
+            self._state = (
+                segments + (segment,),
+                live_masks + (np.ones(segment.n_docs, dtype=bool),),
+            )
+
+    def delete(
+        self,
+        chunk_ids: Optional[Sequence[str]] = None,
+        document_ids: Optional[Sequence[str]] = None,
+    ):
+        """Tombstone chunks by chunk id and/or by parent document id."""
+        with self._write_lock:
+            if chunk_ids:
+                encoded = _encode(chunk_ids)
+                self._tombstone(lambda s: np.isin(s.chunk_ids, encoded))
+            if document_ids:
+                encoded = _encode(document_ids)
+                self._tombstone(lambda s: np.isin(s.document_ids, encoded))
+
+    def _tombstone(self, matcher):
+        # Caller holds self._write_lock. Masks are copied, never mutated, so
+        # concurrent readers keep a consistent snapshot.
+        segments, live_masks = self._state
+        new_masks = []
+        for segment, live in zip(segments, live_masks):
+            hit = matcher(segment) & live
+            new_masks.append(live & ~hit if hit.any() else live)
+        self._state = (segments, tuple(new_masks))
+
+    def compact(self):
+        """
+        Merge all segments into one and drop tombstoned documents.
+
+        The merge runs without blocking writers; segments added and
+        documents deleted while it runs are carried over at the swap.
+        """
+        with self._compact_lock:
+            segments, live_masks = self._state
+            if len(segments) == 1 and live_masks[0].all():
+                return
+            merged = _merge_segments(segments, live_masks)
+
+            with self._write_lock:
+                current_segments, current_masks = self._state
+                n = len(segments)
+                # Deletes that hit the merged segments during the merge
+                merged_live = np.concatenate(
+                    [current[snapshot]
+                        for current, snapshot in zip(current_masks[:n], live_masks)]
+                )
+                self._state = (
+                    (merged,) + current_segments[n:],
+                    (merged_live,) + current_masks[n:],
+                )
+        logger.debug(
+            f"Compacted {len(segments)} BM25 segments into {merged.n_docs} documents")
+
+    def search(self, query: str, k: int = 10) -> List[BM25Hit]:
+        """
+        Return the k best matching chunks for query, best first.
+
+        Documents without any query term are never returned.
+        """
+        segments, live_masks = self._state
+        n_docs = sum(int(live.sum()) for live in live_masks)
+        if not n_docs or k <= 0:
+            return []
+        avgdl = sum(
+            float(segment.doc_len[live].sum()) for segment, live in zip(segments, live_masks)
+        ) / n_docs or 1.0
+
+        tokens = tokenize(query)
+        term_ids = [segment.lookup(tokens) for segment in segments]
+        # Document frequencies are global across segments and, like n_docs,
+        # skip tombstoned documents
+        df: Dict[bytes, int] = {}
+        for segment, live, ids in zip(segments, live_masks, term_ids):
+            for term_id in np.unique(ids):
+                term = bytes(segment.terms[term_id])
+                start, end = segment.indptr[term_id], segment.indptr[term_id + 1]
+                df[term] = df.get(term, 0) + int(
+                    np.count_nonzero(live[segment.postings[start:end]]))
+
+        hits: List[Tuple[float, BM25Segment, int]] = []
+        for segment, live, ids in zip(segments, live_masks, term_ids):
+            if not len(ids):
+                continue
+            scores = np.zeros(segment.n_docs, dtype=np.float32)
+            unique_ids, query_tf = np.unique(ids, return_counts=True)
+            for term_id, qtf in zip(unique_ids, query_tf):
+                start, end = segment.indptr[term_id], segment.indptr[term_id + 1]
+                docs = segment.postings[start:end]
+                tf = segment.tfs[start:end]
+                term_df = df[bytes(segment.terms[term_id])]
+                idf = np.log1p((n_docs - term_df + 0.5) / (term_df + 0.5))
+                norm = self.k1 * (1 - self.b + self.b *
+                                  segment.doc_len[docs] / avgdl)
+                # Postings of a single term hold each document once, so plain
+                # fancy-index accumulation is safe here
+                scores[docs] += (qtf * idf) * tf * (self.k1 + 1) / (tf + norm)
+            scores[~live] = 0
+
+            candidates = np.flatnonzero(scores)
+            if len(candidates) > k:
+                top = np.argpartition(-scores[candidates], k - 1)[:k]
+                candidates = candidates[top]
+            hits.extend((float(scores[i]), segment, int(i)) for i in candidates)
+
+        hits = heapq.nlargest(k, hits, key=lambda hit: hit[0])
+        return [
+            BM25Hit(
+                chunk_id=segment.chunk_ids[i].decode("utf-8"),
+                document_id=segment.document_ids[i].decode("utf-8"),
+                score=score,
+            )
+            for score, segment, i in hits
+        ]
@@ -0,0 +1,210 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    """A cached index and the tenant fingerprint it is known to match."""
+
+    __slots__ = ("index", "fingerprint", "checked_at")
+
+    def __init__(self, index: Any, fingerprint: Optional[str], checked_at: float):
+        self.index = index
+        # None once patched in place: the next check adopts the current one
+        self.fingerprint = fingerprint
+        self.checked_at = checked_at
+
+
+class BM25IndexCache:
+    """
+    Bounded, thread-safe LRU cache of per-tenant BM25 indexes.
+
+    Each tenant key maps to an index built on demand by a caller supplied
+    builder. Builds for the same key are serialized so concurrent queries
+    for a cold tenant trigger a single build. Writers call invalidate() for
+    the tenants they touched, or update() to patch a cached index in place;
+    an index whose build raced with either is returned to its caller but
+    never cached.
+
+    Writes made by other processes are caught by revalidation: given a
+    fingerprint callable (see PGVectorStore._bm25_fingerprint), a cached
+    index is checked against the database at most every
+    revalidate_interval seconds and rebuilt when the fingerprint changed.
+    An index patched in place adopts the fingerprint of its next check, so
+    a write by another process within that interval can go unnoticed until
+    the tenant's next write or eviction.
+
+    Per-key bookkeeping (generations, build locks) only exists while a key
+    is cached or being built.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 32,
+        revalidate_interval: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.revalidate_interval = revalidate_interval
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._generations: Dict[Hashable, int] = {}
+        self._build_locks: Dict[Hashable, threading.Lock] = {}
+        # Threads building or waiting to build each key
+        self._builders: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached index for key (marking it recently used), or None."""
+        entry = self._entry(key)
+        return entry.index if entry is not None else None
+
+    def _entry(self, key: Hashable) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _current(
+        self, key: Hashable, fingerprint: Optional[Callable[[], str]]
+    ) -> Optional[Any]:
+        """The cached index for key, None if missing or found stale."""
+        entry = self._entry(key)
+        if entry is None:
+            return None
+        if fingerprint is None or self._clock() - entry.checked_at < self.revalidate_interval:
+            return entry.index
+        current = fingerprint()
+        if entry.fingerprint is not None and entry.fingerprint != current:
+            logger.info(f"BM25 index for {key} is stale, rebuilding")
+            self.invalidate(key)
+            return None
+        entry.fingerprint = current
+        entry.checked_at = self._clock()
+        return entry.index
+
+    def get_or_build(
+        self,
+        key: Hashable,
+        builder: Callable[[], Any],
+        fingerprint: Optional[Callable[[], str]] = None,
+    ) -> Any:
+        """
+        Return the cached index for key, building it with builder() on a miss.
+
+        Args:
+            key: Tenant key
+            builder: Zero-argument callable returning a fresh index
+            fingerprint: Zero-argument callable summarizing the tenant's
+                chunks in the database, to revalidate the cached index
+
+        Returns:
+            The index for key
+        """
+        index = self._current(key, fingerprint)
+        if index is not None:
+            return index
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+            self._builders[key] = self._builders.get(key, 0) + 1
+        try:
+            with build_lock:
+                # Another thread may have built it while we waited
+                index = self.get(key)
+                if index is not None:
+                    return index
+
+                with self._lock:
+                    generation = self._generations.get(key, 0)
+
+                # Taken before the build: a write during the build shows up
+                # as a changed fingerprint at the next check
+                built_fingerprint = fingerprint() if fingerprint is not None else None
+                index = builder()
+
+                with self._lock:
+                    if self._generations.get(key, 0) == generation:
+                        self._entries[key] = _Entry(index, built_fingerprint, self._clock())
+                        self._entries.move_to_end(key)
+                        self._evict()
+                    else:
+                        logger.debug(
+                            f"BM25 index for {key} invalidated during build, not caching")
+                return index
+        finally:
+            with self._lock:
+                self._builders[key] -= 1
+                if not self._builders[key]:
+                    del self._builders[key]
+                    if key not in self._entries:
+                        self._forget(key)
+
+    def update(self, key: Hashable, updater: Callable[[Any], None]) -> bool:
+        """
+        Apply an in-place update to the cached index for key, if any.
+
+        In-flight builds for key are marked stale, since they may have read
+        the database before the write being applied here.
+
+        Returns:
+            True if a cached index was updated
+        """
+        with self._lock:
+            self._bump(key)
+            entry = self._entries.get(key)
+        if entry is None:
+            return False
+        updater(entry.index)
+        entry.fingerprint = None
+        return True
+
+    def invalidate(self, key: Hashable):
+        """Drop the index for key; in-flight builds for key will not be cached."""
+        with self._lock:
+            self._bump(key)
+            self._entries.pop(key, None)
+            if key not in self._builders:
+                self._forget(key)
+        logger.debug(f"Invalidated BM25 index for {key}")
+
+    def clear(self):
+        """Drop every cached index."""
+        with self._lock:
+            for key in list(self._entries):
+                self._bump(key)
+                if key not in self._builders:
+                    self._forget(key)
+            self._entries.clear()
+
+    def _bump(self, key: Hashable):
+        # Caller holds self._lock. Only builds in flight read generations,
+        # and a key with none starts again from 0.
+        if key in self._builders or key in self._entries:
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def _forget(self, key: Hashable):
+        # Caller holds self._lock
+        self._generations.pop(key, None)
+        self._build_locks.pop(key, None)
+
+    def _evict(self):
+        # Caller holds self._lock
+        while len(self._entries) > self.max_size:
+            key, _ = self._entries.popitem(last=False)
+            if key not in self._builders:
+                self._forget(key)
+            logger.debug(f"Evicted BM25 index for {key}")
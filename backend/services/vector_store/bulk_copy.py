@@ -0,0 +1,254 @@
+import io
+import json
+import logging
+import struct
+import time
+import uuid
+from typing import Iterable, Iterator, NamedTuple, Sequence, Tuple
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+from database.postgres import DateTimeEncoder
+
+logger = logging.getLogger(__name__)
+
+# Header of a binary COPY stream: signature, flags field, extension length
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+PGCOPY_TRAILER = struct.pack(">h", -1)
+# jsonb binary format version
+JSONB_VERSION = b"\x01"
+
+STAGING_TABLE = "chunks_embeddings_staging"
+STAGING_COLUMNS = ("id", "document_id", "user_id", "course_id", "data", "embedding")
+STAGING_SQL = f"""
+    CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+        id text,
+        document_id text,
+        user_id uuid,
+        course_id integer,
+        data {{data_type}},
+        embedding vector
+    ) ON COMMIT DROP
+"""
+
+# Conflict policy of every chunk write, COPY merge and row inserts alike:
+# a chunk already stored under the primary key (id, or (id, course_id) on a
+# partitioned table) is updated in place when it belongs to the same
+# document, and left alone rather than moved when another document owns it.
+ON_CONFLICT_SQL = """
+    ON CONFLICT ON CONSTRAINT chunks_embeddings_pkey DO UPDATE SET
+        course_id = EXCLUDED.course_id,
+        data = EXCLUDED.data,
+        embedding = EXCLUDED.embedding,
+        ts_config = EXCLUDED.ts_config,
+        updated_at = now()
+    WHERE chunks_embeddings.document_id = EXCLUDED.document_id
+"""
+MERGE_SQL = f"""
+    INSERT INTO chunks_embeddings
+        (id, document_id, user_id, course_id, data, embedding, ts_config)
+    SELECT id, document_id, user_id, course_id, data::jsonb, embedding,
+        {{language}}::regconfig
+    FROM {STAGING_TABLE}
+    {ON_CONFLICT_SQL}
+"""
+# Row inserts for batches too small to be worth a COPY
+INSERT_SQL = f"""
+    INSERT INTO chunks_embeddings
+        (id, document_id, user_id, course_id, data, embedding, ts_config)
+    VALUES %s
+    {ON_CONFLICT_SQL}
+"""
+INSERT_TEMPLATE = "(%s, %s, %s::uuid, %s, %s::jsonb, %s, %s::regconfig)"
+AINSERT_SQL = f"""
+    INSERT INTO chunks_embeddings
+        (id, document_id, user_id, course_id, data, embedding, ts_config)
+    VALUES ($1, $2, $3::uuid, $4, $5, $6::vector, $7::regconfig)
+    {ON_CONFLICT_SQL}
+"""
+
+# (id, document_id, user_id, course_id, data, embedding)
+ChunkRow = Tuple[str, str, str, int, dict, Sequence[float]]
+
+
+class CopyStats(NamedTuple):
+    """Outcome of a bulk write."""
+
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float("inf")
+
+
+def _field(payload: bytes) -> bytes:
+    return struct.pack(">i", len(payload)) + payload
+
+
+def encode_row(row: ChunkRow) -> bytes:
+    """Encode one chunk as a binary COPY tuple matching STAGING_COLUMNS."""
+    chunk_id, document_id, user_id, course_id, data, embedding = row
+    vector = np.asarray(embedding, dtype=">f4")
+    return b"".join(
+        (
+            struct.pack(">h", len(STAGING_COLUMNS)),
+            _field(chunk_id.encode("utf-8")),
+            _field(document_id.encode("utf-8")),
+            _field(uuid.UUID(str(user_id)).bytes),
+            _field(struct.pack(">i", course_id)),
+            _field(JSONB_VERSION + json.dumps(data, cls=DateTimeEncoder).encode("utf-8")),
+            # pgvector binary format: int16 dim, int16 unused, float4 values
+            _field(struct.pack(">hh", vector.shape[0], 0) + vector.tobytes()),
+        )
+    )
+
+
+def iter_copy_binary(rows: Iterable[ChunkRow]) -> Iterator[bytes]:
+    """Yield a complete binary COPY stream for rows, one tuple at a time."""
+    yield PGCOPY_HEADER
+    for row in rows:
+        yield encode_row(row)
+    yield PGCOPY_TRAILER
+
+
+class _StreamReader(io.RawIOBase):
+    """Read-only file object over an iterator of byte strings."""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = b""
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        self.bytes_read += n
+        return n
+
+
+class _Counter:
+    """Iterable wrapper counting the items that went through it."""
+
+    def __init__(self, items: Iterable):
+        self._items = items
+        self.count = 0
+
+    def __iter__(self):
+        for item in self._items:
+            self.count += 1
+            yield item
+
+
+class ChunkCopyWriter:
+    """
+    Bulk writer for chunks_embeddings based on COPY FROM STDIN.
+
+    Rows are streamed in binary COPY format into a temporary staging table,
+    then merged into chunks_embeddings with a single INSERT ... SELECT, so
+    the generated tsvector and indexes are maintained set-wise instead of
+    row by row. The caller owns the transaction: the staging table is
+    dropped on commit.
+
+    insert() and ainsert() write small batches with plain INSERTs instead.
+    Both paths resolve duplicates with ON_CONFLICT_SQL, so the outcome of
+    a write does not depend on the batch size.
+    """
+
+    def insert(self, cursor, rows: Sequence[ChunkRow], language: str) -> int:
+        """Write rows through a psycopg2 cursor with multi-row INSERTs."""
+        execute_values(
+            cursor,
+            INSERT_SQL,
+            [
+                (
+                    chunk_id,
+                    document_id,
+                    str(user_id),
+                    course_id,
+                    json.dumps(data, cls=DateTimeEncoder),
+                    np.asarray(embedding, dtype=np.float32),
+                    language,
+                )
+                for chunk_id, document_id, user_id, course_id, data, embedding in rows
+            ],
+            template=INSERT_TEMPLATE,
+        )
+        return len(rows)
+
+    async def ainsert(self, conn, rows: Sequence[ChunkRow], language: str) -> int:
+        """Write rows through an asyncpg connection, one INSERT per row."""
+        await conn.executemany(AINSERT_SQL, [tuple(row) + (language,) for row in rows])
+        return len(rows)
+
+    def write(self, cursor, rows: Iterable[ChunkRow], language: str) -> CopyStats:
+        """
+        Write rows through a psycopg2 cursor.
+
+        Args:
+            cursor: psycopg2 cursor inside an open transaction
+            rows: Chunks as (id, document_id, user_id, course_id, data, embedding)
+            language: Text search configuration for the chunks
+
+        Returns:
+            CopyStats for the rows written
+        """
+        start = time.perf_counter()
+        counted = _Counter(rows)
+        cursor.execute(STAGING_SQL.format(data_type="jsonb"))
+        cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+        reader = _StreamReader(iter_copy_binary(counted))
+        cursor.copy_expert(
+            f"COPY {STAGING_TABLE} ({', '.join(STAGING_COLUMNS)}) "
+            "FROM STDIN WITH (FORMAT binary)",
+            io.BufferedReader(reader, buffer_size=1 << 20),
+        )
+        cursor.execute(MERGE_SQL.format(language="%s"), [language])
+        stats = CopyStats(counted.count, time.perf_counter() - start)
+        logger.info(
+            f"COPY wrote {stats.rows} chunks ({reader.bytes_read / 1e6:.1f} MB) "
+            f"in {stats.seconds:.2f}s, {stats.rows_per_second:.0f} rows/s"
+        )
+        return stats
+
+    async def awrite(self, conn, rows: Iterable[ChunkRow], language: str) -> CopyStats:
+        """
+        Write rows through an asyncpg connection.
+
+        asyncpg produces the binary COPY stream itself. The JSONB codec of
+        the pool is text-only, so data is staged as text and cast on merge.
+        """
+        start = time.perf_counter()
+        await conn.execute(STAGING_SQL.format(data_type="text"))
+        await conn.execute(f"TRUNCATE {STAGING_TABLE}")
+        records = [
+            (
+                chunk_id,
+                document_id,
+                uuid.UUID(str(user_id)),
+                course_id,
+                json.dumps(data, cls=DateTimeEncoder),
+                np.asarray(embedding, dtype=np.float32),
+            )
+            for chunk_id, document_id, user_id, course_id, data, embedding in rows
+        ]
+        await conn.copy_records_to_table(
+            STAGING_TABLE, records=records, columns=list(STAGING_COLUMNS)
+        )
+        await conn.execute(MERGE_SQL.format(language="$1"), language)
+        stats = CopyStats(len(records), time.perf_counter() - start)
+        logger.info(
+            f"COPY wrote {stats.rows} chunks in {stats.seconds:.2f}s, "
+            f"{stats.rows_per_second:.0f} rows/s"
+        )
+        return stats
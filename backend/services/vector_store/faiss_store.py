@@ -0,0 +1,815 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain.schema.embeddings import Embeddings
+from langchain.vectorstores import VectorStore
+from langchain_core.documents import Document
+
+from core.config import FaissConfig, settings
+from core.factories.embedding_factory import (get_embeddings,
+                                             get_query_embedding_cache)
+from models.document import UNASSIGNED_COURSE_ID, DateTimeEncoder
+
+logger = logging.getLogger(__name__)
+
+DOCSTORE_VERSION = 2
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+# IVF quantizers are trained once a shard holds this many vectors per list;
+# smaller shards stay exact
+IVF_TRAINING_FACTOR = 39
+# The chunk log is rewritten from the live chunks once it holds this many
+# records per live chunk (and at least LOG_COMPACTION_MIN records)
+LOG_COMPACTION_FACTOR = 2
+LOG_COMPACTION_MIN = 1000
+
+
+class _Shard:
+    """In-memory state of one tenant's index and docstore."""
+
+    def __init__(self, index, dim: int):
+        self.index = index
+        self.dim = dim
+        # faiss id -> chunk record (id, document_id, user_id, course_id,
+        # page_content, metadata)
+        self.chunks: Dict[int, Dict[str, Any]] = {}
+        self.ids: Dict[str, int] = {}
+        # user_id -> number of chunks of that user in the shard
+        self.owners: Counter = Counter()
+        self.next_id = 0
+        # Removed from the docstore but still in an index without remove_ids
+        self.deleted: set = set()
+        self.generation = 0
+        self.index_file: Optional[str] = None
+        # Append-only chunk log: its file, the length and the number of
+        # records the docstore vouches for
+        self.log_file: Optional[str] = None
+        self.log_length = 0
+        self.log_records = 0
+        # Log records of changes not yet persisted
+        self.pending: List[Dict[str, Any]] = []
+        self.mmapped = False
+        # (inode, mtime) of the docstore this state was loaded from; every
+        # write replaces the file, so a new inode means a new generation
+        self.stamp: Optional[Tuple[int, int]] = None
+        self.lock = threading.Lock()
+
+    def add_chunk(self, faiss_id: int, chunk: Dict[str, Any]):
+        self.chunks[faiss_id] = chunk
+        self.ids[chunk["id"]] = faiss_id
+        self.owners[chunk["user_id"]] += 1
+
+    def remove_chunk(self, faiss_id: int):
+        chunk = self.chunks.pop(faiss_id)
+        self.ids.pop(chunk["id"], None)
+        self.owners[chunk["user_id"]] -= 1
+        if not self.owners[chunk["user_id"]]:
+            del self.owners[chunk["user_id"]]
+
+    def replay(self, lines: List[bytes]):
+        """Apply chunk log records."""
+        for line in lines:
+            record = json.loads(line)
+            if "add" in record:
+                self.add_chunk(record["add"], record["chunk"])
+            else:
+                for faiss_id in record["remove"]:
+                    self.remove_chunk(faiss_id)
+        self.log_records += len(lines)
+
+    @property
+    def kind(self) -> str:
+        inner = faiss.downcast_index(self.index.index)
+        if isinstance(inner, faiss.IndexHNSW):
+            return "hnsw"
+        if isinstance(inner, faiss.IndexIVF):
+            return "ivf"
+        return "flat"
+
+
+class FAISSVectorStore(VectorStore):
+    """
+    Local vector store backed by FAISS, for single-node deployments and tests.
+
+    Chunks are sharded by tenant: one index per course, or per user for
+    chunks outside any course. Searches follow PGVectorStore's tenant
+    filter: a course search reads the course's shard, a user search reads
+    every chunk the user owns, i.e. their shard and their chunks in course
+    shards. Each shard is a FAISS index wrapped in IndexIDMap2, a JSON
+    docstore and an append-only JSON lines chunk log. Vectors are
+    L2-normalized and compared by inner product, i.e. cosine similarity.
+
+    Writes persist the shard atomically: the index goes to a new
+    generation-numbered file, the changed chunks are appended to the log,
+    and the docstore, which names the index file and the length of the log
+    it covers, is swapped in with os.replace, so readers never pair a
+    docstore with the wrong index or a half-written log. Indexes are loaded
+    with IO_FLAG_MMAP where the index type supports it, so workers on the
+    same node share pages; other processes pick up new generations on their
+    next query.
+    """
+
+    def __init__(
+        self,
+        embeddings: Optional[Embeddings] = None,
+        config: Optional[FaissConfig] = None,
+    ):
+        self.config = config or settings.vector_store.faiss
+        if self.config.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unsupported FAISS index type: {self.config.index_type}")
+        self._embeddings = embeddings
+        self._query_cache = get_query_embedding_cache()
+        self._shards: Dict[str, _Shard] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.config.index_dir, exist_ok=True)
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self._embeddings or get_embeddings()
+
+    # -- shard files --------------------------------------------------------
+
+    @staticmethod
+    def _tenant_key(user_id: Optional[str], course_id: Optional[int]) -> str:
+        if course_id is not None:
+            return f"course_{int(course_id)}"
+        return f"user_{re.sub(r'[^A-Za-z0-9_-]', '_', str(user_id))}"
+
+    def _docstore_path(self, key: str) -> str:
+        return os.path.join(self.config.index_dir, f"{key}.json")
+
+    def _read_log(self, log_file: str, length: int) -> List[bytes]:
+        """Records of a chunk log, up to the length a docstore vouches for."""
+        with open(os.path.join(self.config.index_dir, log_file), "rb") as f:
+            return f.read(length).splitlines()
+
+    def _shard_keys(self) -> List[str]:
+        """Tenant keys of every shard on disk."""
+        return sorted(
+            name[: -len(".json")]
+            for name in os.listdir(self.config.index_dir)
+            if name.endswith(".json")
+        )
+
+    @staticmethod
+    def _is_current(f, path: str) -> bool:
+        """Whether an open file is still the one at path."""
+        try:
+            return os.path.samestat(os.fstat(f.fileno()), os.stat(path))
+        except FileNotFoundError:
+            return False
+
+    @contextmanager
+    def _file_lock(self, key: str):
+        """Serialize writers of a shard across processes."""
+        path = os.path.join(self.config.index_dir, f"{key}.lock")
+        while True:
+            with open(path, "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    # Dropping a shard unlinks its lock file while holding
+                    # it; whoever waited on the old file locks the new one
+                    if self._is_current(f, path):
+                        yield
+                        return
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _remove_shard_files(self, key: str, shard: Optional[_Shard]):
+        """Delete a shard's files; the caller holds its file lock."""
+        names = [f"{key}.json", f"{key}.lock"]
+        if shard is not None:
+            names.extend(name for name in (shard.index_file, shard.log_file) if name)
+        for name in names:
+            try:
+                os.unlink(os.path.join(self.config.index_dir, name))
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._shards.pop(key, None)
+
+    def _new_index(self, kind: str, dim: int, vectors: Optional[np.ndarray] = None):
+        """Create an empty IndexIDMap2 of the given kind, training IVF on vectors."""
+        if kind == "hnsw":
+            inner = faiss.IndexHNSWFlat(dim, self.config.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            inner.hnsw.efConstruction = self.config.ef_construction
+        elif kind == "ivf":
+            quantizer = faiss.IndexFlatIP(dim)
+            inner = faiss.IndexIVFFlat(
+                quantizer, dim, self.config.nlist, faiss.METRIC_INNER_PRODUCT)
+            inner.train(vectors)
+            # Keeps reconstruct() and remove_ids() available
+            inner.set_direct_map_type(faiss.DirectMap.Hashtable)
+        else:
+            inner = faiss.IndexFlatIP(dim)
+        return faiss.IndexIDMap2(inner)
+
+    def _read_index(self, path: str) -> Tuple[Any, bool]:
+        """Read an index, memory-mapped when possible; returns (index, mmapped)."""
+        if self.config.mmap:
+            try:
+                return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY), True
+            except RuntimeError as e:
+                logger.debug(f"Cannot memory-map {path}, reading it instead: {e}")
+        return faiss.read_index(path), False
+
+    @staticmethod
+    def _stamp(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _load_shard(self, key: str, writable: bool = False) -> Optional[_Shard]:
+        """
+        Return the current state of a shard, reloading it if another process
+        wrote a newer generation. None if the shard does not exist.
+        """
+        path = self._docstore_path(key)
+        # A writer may swap the docstore and unlink the index it named
+        # between our two reads; the retry then sees the new generation
+        for attempt in range(3):
+            stamp = self._stamp(path)
+            if stamp is None:
+                with self._lock:
+                    self._shards.pop(key, None)
+                return None
+
+            with self._lock:
+                shard = self._shards.get(key)
+            if shard is not None and shard.stamp == stamp and not (writable and shard.mmapped):
+                return shard
+
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    docstore = json.load(f)
+                if docstore.get("version") not in (1, DOCSTORE_VERSION):
+                    raise ValueError(f"Unsupported FAISS docstore version in {path}")
+                log = None
+                if docstore.get("log_file"):
+                    log = self._read_log(docstore["log_file"], docstore["log_length"])
+                index_path = os.path.join(self.config.index_dir, docstore["index_file"])
+                if writable:
+                    # Memory-mapped indexes are read-only
+                    index, mmapped = faiss.read_index(index_path), False
+                else:
+                    index, mmapped = self._read_index(index_path)
+                break
+            except (FileNotFoundError, RuntimeError):
+                if attempt == 2:
+                    raise
+
+        shard = _Shard(index, docstore["dim"])
+        if log is None:
+            # Version 1 kept the chunks in the docstore; the next write
+            # moves them to a log
+            for i, chunk in docstore["chunks"].items():
+                shard.add_chunk(int(i), chunk)
+        else:
+            shard.replay(log)
+            shard.log_file = docstore["log_file"]
+            shard.log_length = docstore["log_length"]
+        shard.next_id = docstore["next_id"]
+        shard.deleted = set(docstore["deleted"])
+        shard.generation = docstore["generation"]
+        shard.index_file = docstore["index_file"]
+        shard.mmapped = mmapped
+        shard.stamp = stamp
+        with self._lock:
+            self._shards[key] = shard
+        return shard
+
+    @staticmethod
+    def _encode(records: List[Dict[str, Any]]) -> bytes:
+        return b"".join(
+            json.dumps(record, cls=DateTimeEncoder).encode("utf-8") + b"\n"
+            for record in records
+        )
+
+    def _write_log(self, key: str, shard: _Shard, generation: int) -> Tuple[str, int, int]:
+        """
+        Append the shard's pending records to its chunk log, or write a new
+        log of its live chunks once the current one is mostly dead records.
+
+        Returns:
+            (log file, length, number of records)
+        """
+        directory = self.config.index_dir
+        records = shard.log_records + len(shard.pending)
+        if shard.log_file is not None and records <= max(
+            LOG_COMPACTION_MIN, LOG_COMPACTION_FACTOR * len(shard.chunks)
+        ):
+            with open(os.path.join(directory, shard.log_file), "r+b") as f:
+                # Drop whatever a writer that crashed before its docstore
+                # swap left behind
+                f.truncate(shard.log_length)
+                f.seek(shard.log_length)
+                f.write(self._encode(shard.pending))
+                f.flush()
+                os.fsync(f.fileno())
+                return shard.log_file, f.tell(), records
+
+        log_file = f"{key}.{generation}.log"
+        snapshot = [
+            {"add": i, "chunk": chunk} for i, chunk in sorted(shard.chunks.items())
+        ]
+        fd, tmp_log = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._encode(snapshot))
+                f.flush()
+                os.fsync(f.fileno())
+                length = f.tell()
+            os.replace(tmp_log, os.path.join(directory, log_file))
+        except BaseException:
+            if os.path.exists(tmp_log):
+                os.unlink(tmp_log)
+            raise
+        return log_file, length, len(snapshot)
+
+    def _persist(self, key: str, shard: _Shard):
+        """Write a new generation of the shard and swap its docstore in."""
+        directory = self.config.index_dir
+        generation = shard.generation + 1
+        index_file = f"{key}.{generation}.faiss"
+
+        fd, tmp_index = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            faiss.write_index(shard.index, tmp_index)
+            os.replace(tmp_index, os.path.join(directory, index_file))
+        except BaseException:
+            if os.path.exists(tmp_index):
+                os.unlink(tmp_index)
+            raise
+        log_file, log_length, log_records = self._write_log(key, shard, generation)
+
+        docstore = {
+            "version": DOCSTORE_VERSION,
+            "generation": generation,
+            "index_file": index_file,
+            "index_type": shard.kind,
+            "dim": shard.dim,
+            "next_id": shard.next_id,
+            "deleted": sorted(shard.deleted),
+            "log_file": log_file,
+            "log_length": log_length,
+        }
+        path = self._docstore_path(key)
+        fd, tmp_docstore = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(docstore, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_docstore, path)
+        except BaseException:
+            if os.path.exists(tmp_docstore):
+                os.unlink(tmp_docstore)
+            raise
+
+        # Readers holding the old generation keep their mapping until they
+        # reload; unlinking only removes the name
+        for old, new in ((shard.index_file, index_file), (shard.log_file, log_file)):
+            if old and old != new:
+                try:
+                    os.unlink(os.path.join(directory, old))
+                except FileNotFoundError:
+                    pass
+        shard.generation = generation
+        shard.index_file = index_file
+        shard.log_file = log_file
+        shard.log_length = log_length
+        shard.log_records = log_records
+        shard.pending = []
+        shard.stamp = self._stamp(path)
+
+    @contextmanager
+    def _writing(self, key: str, dim: Optional[int] = None):
+        """
+        Yield a writable shard (created if dim is given and the shard is
+        new), persisting it when the block exits without error.
+        """
+        with self._file_lock(key):
+            shard = self._load_shard(key, writable=True)
+            if shard is None:
+                if dim is None:
+                    yield None
+                    return
+                shard = _Shard(self._new_index("flat", dim), dim)
+                with self._lock:
+                    self._shards[key] = shard
+            with shard.lock:
+                try:
+                    yield shard
+                except BaseException:
+                    # Drop the partially modified state; next use reloads it
+                    with self._lock:
+                        self._shards.pop(key, None)
+                    raise
+                self._persist(key, shard)
+
+    # -- index maintenance --------------------------------------------------
+
+    def _live_vectors(self, shard: _Shard) -> Tuple[np.ndarray, np.ndarray]:
+        ids = np.array(sorted(shard.chunks), dtype=np.int64)
+        if not len(ids):
+            return np.empty((0, shard.dim), dtype=np.float32), ids
+        vectors = np.vstack([shard.index.reconstruct(int(i)) for i in ids])
+        return vectors.astype(np.float32), ids
+
+    def _rebuild(self, shard: _Shard, kind: str, extra: Optional[np.ndarray] = None):
+        """Rebuild the shard's index as kind from its live vectors."""
+        vectors, ids = self._live_vectors(shard)
+        training = vectors if extra is None else np.vstack([vectors, extra])
+        index = self._new_index(kind, shard.dim, training)
+        if len(ids):
+            index.add_with_ids(vectors, ids)
+        shard.index = index
+        shard.deleted.clear()
+        logger.info(f"Rebuilt FAISS {kind} index with {len(ids)} vectors")
+
+    def _maybe_upgrade(self, shard: _Shard, incoming: np.ndarray):
+        """
+        Move a shard to the configured index type once it is worth it.
+
+        HNSW is used from the start; IVF needs enough vectors to train its
+        coarse quantizer, so IVF shards stay flat until then.
+        """
+        target = self.config.index_type
+        if shard.kind == target:
+            return
+        if target == "hnsw" and shard.kind == "flat":
+            self._rebuild(shard, "hnsw")
+        elif target == "ivf" and shard.kind == "flat":
+            if len(shard.chunks) + len(incoming) >= self.config.nlist * IVF_TRAINING_FACTOR:
+                self._rebuild(shard, "ivf", extra=incoming)
+
+    def _remove(self, shard: _Shard, faiss_ids: List[int]):
+        for i in faiss_ids:
+            shard.remove_chunk(i)
+        shard.pending.append({"remove": [int(i) for i in faiss_ids]})
+        try:
+            shard.index.remove_ids(np.array(faiss_ids, dtype=np.int64))
+        except RuntimeError:
+            # HNSW graphs do not support removal: hide the vectors and
+            # compact once enough of the index is dead
+            shard.deleted.update(faiss_ids)
+            if len(shard.deleted) > self.config.max_deleted_ratio * shard.index.ntotal:
+                self._rebuild(shard, shard.kind)
+
+    def _set_search_params(self, shard: _Shard):
+        inner = faiss.downcast_index(shard.index.index)
+        if isinstance(inner, faiss.IndexHNSW):
+            inner.hnsw.efSearch = self.config.ef_search
+        elif isinstance(inner, faiss.IndexIVF):
+            inner.nprobe = self.config.nprobe
+
+    # -- VectorStore interface ----------------------------------------------
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.array(vectors, dtype=np.float32, ndmin=2)
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    def _embed_query(self, query: str) -> np.ndarray:
+        return self._query_cache.get_or_compute(
+            settings.embedding.model_name, query, self.embeddings.embed_query
+        )
+
+    def _write(
+        self,
+        texts: List[str],
+        metadatas: List[dict],
+        ids: List[str],
+        embeddings: List[List[float]],
+        document_id: str,
+        user_id: Optional[str],
+        course_id: Optional[int],
+    ):
+        vectors = self._normalize(embeddings)
+        key = self._tenant_key(user_id, course_id)
+        with self._writing(key, dim=vectors.shape[1]) as shard:
+            if vectors.shape[1] != shard.dim:
+                raise ValueError(
+                    f"Embedding dimension {vectors.shape[1]} does not match "
+                    f"index dimension {shard.dim}"
+                )
+            # Re-adding a chunk id replaces it
+            replaced = [shard.ids[i] for i in ids if i in shard.ids]
+            if replaced:
+                self._remove(shard, replaced)
+            self._maybe_upgrade(shard, vectors)
+
+            faiss_ids = np.arange(shard.next_id, shard.next_id + len(ids), dtype=np.int64)
+            shard.next_id += len(ids)
+            shard.index.add_with_ids(vectors, faiss_ids)
+            for faiss_id, chunk_id, text, metadata in zip(faiss_ids, ids, texts, metadatas):
+                chunk = {
+                    "id": chunk_id,
+                    "document_id": document_id,
+                    "user_id": str(user_id) if user_id is not None else None,
+                    "course_id": UNASSIGNED_COURSE_ID if course_id is None else int(course_id),
+                    "page_content": text,
+                    "metadata": metadata,
+                }
+                shard.add_chunk(int(faiss_id), chunk)
+                shard.pending.append({"add": int(faiss_id), "chunk": chunk})
+        logger.info(f"Added {len(ids)} chunks of document {document_id} to FAISS shard {key}")
+
+    def add_documents(
+        self,
+        documents: List[Document],
+        document_id: str,
+        language: Optional[str] = None,
+        course_id: Optional[int] = None,
+        user_id: Optional[str] = None,
+    ) -> bool:
+        """
+        Add documents to the store, optionally within a course.
+
+        There is no documents table to read the owner from, so user_id is
+        taken from the argument or the first document's metadata. language
+        is accepted for interface compatibility with PGVectorStore.
+        """
+        if not documents:
+            return True
+        if user_id is None:
+            user_id = documents[0].metadata.get("user_id")
+        texts = [doc.page_content for doc in documents]
+        ids = [
+            doc.metadata.get("id") or getattr(doc, "id", None) or str(uuid.uuid4())
+            for doc in documents
+        ]
+        self._write(
+            texts,
+            [doc.metadata for doc in documents],
+            ids,
+            self.embeddings.embed_documents(texts),
+            document_id,
+            user_id,
+            course_id,
+        )
+        return True
+
+    async def aadd_documents(
+        self,
+        documents: List[Document],
+        document_id: str,
+        language: Optional[str] = None,
+        course_id: Optional[int] = None,
+        user_id: Optional[str] = None,
+    ) -> bool:
+        """Async version of add_documents."""
+        return await asyncio.to_thread(
+            self.add_documents, documents, document_id, language, course_id, user_id
+        )
+
+    def from_texts(
+        self,
+        texts: List[str],
+        embedding: Optional[Embeddings] = None,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Add texts to the vector store.
+
+        Args:
+            texts: List of texts to add
+            embedding: Optional embedding function (will use self.embeddings if not provided)
+            metadatas: Optional list of metadatas associated with the texts
+            ids: Optional list of IDs to associate with the texts
+            **kwargs: Additional arguments (must include document_id,
+                may include user_id and course_id)
+
+        Returns:
+            List of IDs of the added texts
+        """
+        document_id = kwargs.get("document_id")
+        if not document_id:
+            raise ValueError("document_id is required in kwargs")
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        self._write(
+            texts,
+            metadatas,
+            ids,
+            (embedding or self.embeddings).embed_documents(texts),
+            document_id,
+            kwargs.get("user_id"),
+            kwargs.get("course_id"),
+        )
+        return ids
+
+    @staticmethod
+    def _to_document(chunk: Dict[str, Any]) -> Document:
+        metadata = {
+            **(chunk.get("metadata") or {}),
+            "id": chunk["id"],
+            "document_id": chunk["document_id"],
+            "course_id": chunk["course_id"],
+        }
+        return Document(page_content=chunk["page_content"], metadata=metadata)
+
+    @staticmethod
+    def _check_tenant(user_id: Optional[str], course_id: Optional[int]):
+        """
+        Fail closed: a search scoped to nobody must not fall back to every
+        tenant's chunks.
+        """
+        if course_id is None and not user_id:
+            raise ValueError("A user_id or a course_id is required to scope chunks")
+
+    def _search_shard(
+        self, shard: _Shard, vector: np.ndarray, top_k: int, owner: Optional[str]
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        """Top chunks of a shard, restricted to owner's chunks if given."""
+        with shard.lock:
+            self._set_search_params(shard)
+            # Deleted vectors and other owners' chunks can take result slots
+            skipped = len(shard.deleted)
+            if owner is not None:
+                skipped += len(shard.chunks) - shard.owners[owner]
+            k = min(top_k + skipped, shard.index.ntotal)
+            scores, faiss_ids = shard.index.search(vector, k)
+
+        results = []
+        for score, faiss_id in zip(scores[0], faiss_ids[0]):
+            chunk = shard.chunks.get(int(faiss_id))
+            # -1 pads short result lists; deleted ids have no chunk
+            if chunk is None or (owner is not None and chunk["user_id"] != owner):
+                continue
+            results.append((chunk, float(score)))
+            if len(results) == top_k:
+                break
+        return results
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        user_id: Optional[str],
+        top_k: int = 200,
+        course_id: Optional[int] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """
+        Dense search of a tenant's chunks; scores are cosine similarities.
+
+        Raises:
+            ValueError: if neither user_id nor course_id is given
+        """
+        self._check_tenant(user_id, course_id)
+        if course_id is not None:
+            keys, owner = [self._tenant_key(None, course_id)], None
+        else:
+            # A user's chunks inside courses live in the course shards
+            owner = str(user_id)
+            keys = [self._tenant_key(owner, None)] + [
+                key for key in self._shard_keys() if key.startswith("course_")
+            ]
+
+        vector = None
+        results = []
+        for key in keys:
+            shard = self._load_shard(key)
+            if shard is None or not (shard.owners[owner] if owner else shard.chunks):
+                continue
+            if vector is None:
+                vector = self._normalize(self._embed_query(query))
+            results.extend(self._search_shard(shard, vector, top_k, owner))
+        results.sort(key=lambda result: result[1], reverse=True)
+        return [(self._to_document(chunk), score) for chunk, score in results[:top_k]]
+
+    def similarity_search(
+        self,
+        query: str,
+        user_id: Optional[str],
+        top_k: int = 200,
+        course_id: Optional[int] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        """
+        Search for chunks similar to a query within a user's chunks, or a
+        course's chunks when course_id is given.
+
+        Only dense retrieval is available; the hybrid search options of
+        PGVectorStore.similarity_search are accepted and ignored. Each
+        document carries its cosine similarity in metadata["score"] and its
+        cosine distance in metadata["distance"].
+        """
+        documents = []
+        for doc, score in self.similarity_search_with_score(
+            query, user_id=user_id, top_k=top_k, course_id=course_id
+        ):
+            doc.metadata["score"] = score
+            doc.metadata["distance"] = 1.0 - score
+            documents.append(doc)
+        return documents
+
+    async def asimilarity_search(
+        self,
+        query: str,
+        user_id: Optional[str],
+        top_k: int = 200,
+        course_id: Optional[int] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        """Async version of similarity_search."""
+        return await asyncio.to_thread(
+            self.similarity_search, query, user_id, top_k, course_id
+        )
+
+    def get_all_documents(self, user_id: Optional[str] = None) -> List[Document]:
+        documents = []
+        for key in self._shard_keys():
+            shard = self._load_shard(key)
+            if shard is None:
+                continue
+            documents.extend(
+                self._to_document(chunk)
+                for _, chunk in sorted(shard.chunks.items())
+                if user_id is None or chunk["user_id"] == str(user_id)
+            )
+        return documents
+
+    async def aget_all_documents(self, user_id: Optional[str] = None) -> List[Document]:
+        """Async version of get_all_documents."""
+        return await asyncio.to_thread(self.get_all_documents, user_id)
+
+    def delete_documents(self, doc_id: str, user_id: Optional[str] = None) -> bool:
+        """Delete every chunk of a document, from whichever shards hold it."""
+        deleted = 0
+        for key in self._shard_keys():
+            shard = self._load_shard(key)
+            if shard is None or not any(
+                chunk["document_id"] == doc_id for chunk in shard.chunks.values()
+            ):
+                continue
+            with self._writing(key) as shard:
+                if shard is None:
+                    continue
+                faiss_ids = [
+                    i for i, chunk in shard.chunks.items()
+                    if chunk["document_id"] == doc_id
+                    and (user_id is None or chunk["user_id"] == str(user_id))
+                ]
+                if faiss_ids:
+                    self._remove(shard, faiss_ids)
+                    deleted += len(faiss_ids)
+        logger.info(f"Deleted {deleted} chunks of document {doc_id}")
+        return deleted > 0
+
+    async def adelete_documents(self, doc_id: str, user_id: Optional[str] = None) -> bool:
+        """Async version of delete_documents."""
+        return await asyncio.to_thread(self.delete_documents, doc_id, user_id)
+
+    def drop_course(self, course_id: int) -> int:
+        """
+        Remove every chunk of a course by deleting its shard files.
+
+        Returns:
+            Number of chunks removed
+        """
+        key = self._tenant_key(None, course_id)
+        with self._file_lock(key):
+            shard = self._load_shard(key)
+            removed = len(shard.chunks) if shard is not None else 0
+            self._remove_shard_files(key, shard)
+        logger.info(f"Removed {removed} chunks of course {course_id}")
+        return removed
+
+    def save(self):
+        """
+        Persist every loaded shard.
+
+        Writes are already persisted as they happen; this rewrites shards
+        that were modified in memory through other means.
+        """
+        with self._lock:
+            keys = list(self._shards)
+        for key in keys:
+            with self._writing(key):
+                pass
+
+    def clear_store(self) -> bool:
+        """Delete every shard."""
+        for key in self._shard_keys():
+            with self._file_lock(key):
+                self._remove_shard_files(key, self._load_shard(key))
+        with self._lock:
+            self._shards.clear()
+        return True
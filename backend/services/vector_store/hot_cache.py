@@ -0,0 +1,190 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class CourseMirror:
+    """
+    In-memory copy of one course's chunks: normalized embeddings as a single
+    float32 matrix, row-aligned with chunk ids, document ids and content.
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        document_ids: List[str],
+        contents: List[str],
+        metadatas: List[dict],
+        embeddings: np.ndarray,
+        fingerprint: str,
+        checked_at: float,
+    ):
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.maximum(norms, np.finfo(np.float32).tiny)
+        matrix.setflags(write=False)
+        self.matrix = matrix
+        self.ids = ids
+        self.document_ids = document_ids
+        self.contents = contents
+        self.metadatas = metadatas
+        # Tenant fingerprint at load time, see PGVectorStore._bm25_fingerprint
+        self.fingerprint = fingerprint
+        self.checked_at = checked_at
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+    def search(self, vector: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+        """
+        Exact cosine search: one matrix-vector product, then argpartition
+        for the top_k rows.
+
+        Returns:
+            (row, cosine distance) pairs, nearest first
+        """
+        if not len(self) or top_k <= 0:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), np.finfo(np.float32).tiny)
+        scores = self.matrix @ query
+        if top_k < len(scores):
+            rows = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            rows = np.arange(len(scores))
+        rows = rows[np.argsort(-scores[rows], kind="stable")]
+        # Same ordering and scale as pgvector's <=> operator
+        return [(int(row), 1.0 - float(scores[row])) for row in rows]
+
+
+class HotTenantCache:
+    """
+    Bounded, thread-safe LRU cache of CourseMirrors for the busiest courses.
+
+    A course is worth mirroring once it has missed the cache min_queries
+    times; the least recently queried mirror is evicted beyond max_courses.
+    Misses are only counted for the max_tracked courses missed most
+    recently. A course being loaded has a version bumped by invalidate();
+    a mirror loaded while its course was written to is discarded by put(),
+    so writes are never hidden by a load that raced with them.
+    """
+
+    def __init__(
+        self,
+        max_courses: int = 8,
+        min_queries: int = 3,
+        max_tracked: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_courses < 1:
+            raise ValueError("max_courses must be at least 1")
+        self.max_courses = max_courses
+        self.min_queries = min_queries
+        self.max_tracked = max_tracked
+        self._clock = clock
+        self._mirrors: "OrderedDict[int, CourseMirror]" = OrderedDict()
+        # Only held for courses being loaded
+        self._versions: Dict[int, int] = {}
+        self._misses: "OrderedDict[int, int]" = OrderedDict()
+        self._loading: set = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._mirrors)
+
+    def __contains__(self, course_id: int) -> bool:
+        return course_id in self._mirrors
+
+    def now(self) -> float:
+        return self._clock()
+
+    def get(self, course_id: int) -> Optional[CourseMirror]:
+        """Return the mirror of a course (marking it recently used), or None."""
+        with self._lock:
+            mirror = self._mirrors.get(course_id)
+            if mirror is not None:
+                self._mirrors.move_to_end(course_id)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return mirror
+
+    def claim_load(self, course_id: int) -> Optional[int]:
+        """
+        Record a miss for a course and decide whether to load its mirror.
+
+        Returns:
+            The course version to hand back to put() if the caller should
+            load the mirror now, else None (not hot enough, or already loading)
+        """
+        with self._lock:
+            if course_id in self._mirrors or course_id in self._loading:
+                return None
+            misses = self._misses.pop(course_id, 0) + 1
+            if misses < self.min_queries:
+                self._misses[course_id] = misses
+                while len(self._misses) > self.max_tracked:
+                    self._misses.popitem(last=False)
+                return None
+            self._loading.add(course_id)
+            return self._versions.setdefault(course_id, 0)
+
+    def put(self, course_id: int, mirror: Optional[CourseMirror], version: int) -> bool:
+        """
+        Store a mirror loaded at version, releasing the load claim.
+
+        Returns:
+            True if the mirror was cached
+        """
+        with self._lock:
+            self._loading.discard(course_id)
+            if mirror is None:
+                self._versions.pop(course_id, None)
+                return False
+            if self._versions.pop(course_id, 0) != version:
+                logger.debug(f"Mirror of course {course_id} written during load, not caching")
+                return False
+            self._mirrors[course_id] = mirror
+            self._mirrors.move_to_end(course_id)
+            while len(self._mirrors) > self.max_courses:
+                evicted, _ = self._mirrors.popitem(last=False)
+                logger.debug(f"Evicted mirror of course {evicted}")
+            return True
+
+    def invalidate(self, course_id: int):
+        """Drop the mirror of a course; in-flight loads will not be cached."""
+        with self._lock:
+            self._mirrors.pop(course_id, None)
+            if course_id in self._loading:
+                self._versions[course_id] += 1
+
+    def clear(self):
+        with self._lock:
+            for course_id in self._loading:
+                self._versions[course_id] += 1
+            self._mirrors.clear()
+            self._misses.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "courses": len(self._mirrors),
+                "rows": sum(len(m) for m in self._mirrors.values()),
+                "bytes": sum(m.nbytes for m in self._mirrors.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,263 @@
+"""
+Online conversion of chunks_embeddings to a table LIST-partitioned by
+course_id (opt-in, see settings.vector_store.partition_by_course).
+
+Rewriting the live table in one INSERT ... SELECT would hold an exclusive
+lock for the whole copy, so the conversion runs in steps, each short:
+
+1. Build the partitioned table next to the live one, with its indexes,
+   trigger and row level security, and the requested course partitions.
+2. Mirror writes on the live table into it with a trigger.
+3. Backfill the existing rows in keyset batches, one transaction each.
+4. Swap the two tables (and repoint the document_chunks view) in one
+   transaction that only takes the locks needed for the renames.
+
+Steps 1-3 are idempotent, so an interrupted conversion can be rerun.
+Postgres cannot enforce a unique index that leaves out the partition key,
+so the primary key becomes (id, course_id) and idx_chunks_id keeps id
+lookups fast; set partition_by_course once the swap is done so the ORM
+declares the same key.
+"""
+import logging
+import time
+from typing import Iterable, List, Optional
+
+from psycopg2 import errors
+
+from services.vector_store.pgvector import (
+    COURSE_PARTITION_PREFIX,
+    DEFAULT_PARTITION,
+    PARTITION_COLUMNS,
+    PGVectorStore,
+)
+
+logger = logging.getLogger(__name__)
+
+NEW_TABLE = "chunks_embeddings_partitioned"
+OLD_TABLE = "chunks_embeddings_unpartitioned"
+MIRROR_FUNCTION = "mirror_chunks_embeddings"
+MIRROR_TRIGGER = "mirror_chunks_embeddings_to_partitioned"
+# Suffix of the new table's indexes until the swap gives them their names
+INDEX_SUFFIX = "_p"
+# Secondary indexes of chunks_embeddings, as created by the migrations
+INDEXES = {
+    "idx_chunks_id": "(id)",
+    "idx_chunks_document_id": "(document_id)",
+    "idx_chunks_user_id": "(user_id)",
+    "idx_chunks_course_id": "(course_id)",
+    "idx_chunks_data": "USING GIN (data)",
+    "idx_chunks_content_tsv": "USING GIN (content_tsv)",
+}
+POLICIES = (
+    ("Enable read access for chunk owner only", "SELECT",
+     "USING (auth.role() = 'authenticated' AND user_id = auth.uid())"),
+    ("Enable insert for chunk owner only", "INSERT",
+     "WITH CHECK (auth.role() = 'authenticated' AND user_id = auth.uid())"),
+    ("Enable update for chunk owner only", "UPDATE",
+     "USING (auth.role() = 'authenticated' AND user_id = auth.uid())"),
+    ("Enable delete for chunk owner only", "DELETE",
+     "USING (auth.role() = 'authenticated' AND user_id = auth.uid())"),
+)
+_SET_COLUMNS = ", ".join(
+    f"{column} = EXCLUDED.{column}"
+    for column in PARTITION_COLUMNS.split(", ")
+    if column not in ("id", "course_id")
+)
+
+
+def partition_by_course(
+    store: PGVectorStore,
+    course_ids: Iterable[int] = (),
+    batch_size: int = 5000,
+    lock_timeout: str = "5s",
+    swap_attempts: int = 10,
+):
+    """
+    Convert chunks_embeddings to a table partitioned by course_id.
+
+    Args:
+        store: Vector store whose database is converted
+        course_ids: Courses given their own partition up front; other
+            courses stay in the default partition until
+            create-course-partition is run for them
+        batch_size: Rows copied per backfill transaction
+        lock_timeout: How long the swap waits for its locks before retrying
+        swap_attempts: Number of times the swap is tried
+    """
+    with store._autocommit_cursor() as cur:
+        if store._is_partitioned(cur):
+            logger.info("chunks_embeddings is already partitioned")
+            return
+        _create_table(store, cur, course_ids)
+        _install_mirror(cur)
+        _backfill(cur, batch_size)
+        _swap(cur, _index_names(store), lock_timeout, swap_attempts)
+    logger.info("chunks_embeddings is now partitioned by course_id")
+
+
+def _create_table(store: PGVectorStore, cur, course_ids: Iterable[int]):
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {NEW_TABLE} (
+            LIKE chunks_embeddings INCLUDING DEFAULTS INCLUDING GENERATED,
+            CONSTRAINT {NEW_TABLE}_pkey PRIMARY KEY (id, course_id),
+            FOREIGN KEY (document_id) REFERENCES documents(id) ON DELETE CASCADE,
+            FOREIGN KEY (user_id) REFERENCES auth.users(id) ON DELETE CASCADE
+        ) PARTITION BY LIST (course_id)
+        """
+    )
+    # Partitions get their final names now: they do not clash with anything
+    cur.execute(
+        f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {NEW_TABLE} DEFAULT")
+    for course_id in course_ids:
+        course_id = int(course_id)
+        cur.execute(
+            f"CREATE TABLE IF NOT EXISTS {COURSE_PARTITION_PREFIX}{course_id} "
+            f"PARTITION OF {NEW_TABLE} FOR VALUES IN ({course_id})"
+        )
+
+    # Indexes are built while the table is empty and maintained by the backfill
+    for name, definition in INDEXES.items():
+        cur.execute(
+            f"CREATE INDEX IF NOT EXISTS {name}{INDEX_SUFFIX} ON {NEW_TABLE} {definition}")
+    config = store.index_config
+    if config.type != "none":
+        cur.execute(store._vector_index_ddl(
+            store._vector_index_name(config) + INDEX_SUFFIX,
+            config,
+            concurrently=False,
+            table=NEW_TABLE,
+        ))
+
+    cur.execute(
+        f"""
+        DROP TRIGGER IF EXISTS update_chunks_embeddings_updated_at ON {NEW_TABLE};
+        CREATE TRIGGER update_chunks_embeddings_updated_at
+            BEFORE UPDATE ON {NEW_TABLE}
+            FOR EACH ROW
+            EXECUTE FUNCTION update_updated_at_column();
+        ALTER TABLE {NEW_TABLE} ENABLE ROW LEVEL SECURITY;
+        """
+    )
+    for name, command, clause in POLICIES:
+        cur.execute(
+            f'DROP POLICY IF EXISTS "{name}" ON {NEW_TABLE}; '
+            f'CREATE POLICY "{name}" ON {NEW_TABLE} FOR {command} {clause}'
+        )
+
+
+def _index_names(store: PGVectorStore) -> List[str]:
+    names = list(INDEXES)
+    if store.index_config.type != "none":
+        names.append(store._vector_index_name(store.index_config))
+    return names
+
+
+def _install_mirror(cur):
+    """Keep the new table in step with writes to the live one."""
+    new_values = ", ".join(f"NEW.{column}" for column in PARTITION_COLUMNS.split(", "))
+    cur.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION {MIRROR_FUNCTION}() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM {NEW_TABLE} WHERE id = OLD.id AND course_id = OLD.course_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO {NEW_TABLE} ({PARTITION_COLUMNS})
+                VALUES ({new_values})
+                ON CONFLICT (id, course_id) DO UPDATE SET {_SET_COLUMNS};
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS {MIRROR_TRIGGER} ON chunks_embeddings;
+        CREATE TRIGGER {MIRROR_TRIGGER}
+            AFTER INSERT OR UPDATE OR DELETE ON chunks_embeddings
+            FOR EACH ROW
+            EXECUTE FUNCTION {MIRROR_FUNCTION}();
+        """
+    )
+
+
+def _backfill(cur, batch_size: int):
+    """
+    Copy the live rows in id order, one short transaction per batch.
+
+    Rows written since the mirror trigger was installed are already in the
+    new table and are left alone; FOR SHARE keeps a batch's rows from
+    changing until the batch commits.
+    """
+    last_id: Optional[str] = ""
+    copied = 0
+    while True:
+        cur.execute(
+            f"""
+            WITH batch AS (
+                SELECT {PARTITION_COLUMNS} FROM chunks_embeddings
+                WHERE id > %s
+                ORDER BY id
+                LIMIT %s
+                FOR SHARE
+            ), copied AS (
+                INSERT INTO {NEW_TABLE} ({PARTITION_COLUMNS})
+                SELECT {PARTITION_COLUMNS} FROM batch
+                ON CONFLICT (id, course_id) DO NOTHING
+            )
+            SELECT max(id), count(*) FROM batch
+            """,
+            (last_id, batch_size),
+        )
+        last_id, count = cur.fetchone()
+        if not count:
+            break
+        copied += count
+        logger.info(f"Backfilled {copied} chunks into {NEW_TABLE}")
+
+
+def _swap(cur, index_names: List[str], lock_timeout: str, attempts: int):
+    """
+    Put the partitioned table in place of the live one.
+
+    Runs in one short transaction, retried when its locks cannot be had
+    within lock_timeout so other queries are not queued behind it for long.
+    Anything else still depending on the live table makes the DROP fail
+    and the whole swap roll back.
+    """
+    for attempt in range(1, attempts + 1):
+        cur.execute("BEGIN")
+        try:
+            cur.execute("SET LOCAL lock_timeout = %s", (lock_timeout,))
+            _swap_tables(cur, index_names)
+            cur.execute("COMMIT")
+            return
+        except errors.LockNotAvailable:
+            cur.execute("ROLLBACK")
+            if attempt == attempts:
+                raise
+            logger.warning(f"Swap attempt {attempt} could not get its locks, retrying")
+            time.sleep(attempt)
+
+
+def _swap_tables(cur, index_names: List[str]):
+    cur.execute(f"LOCK TABLE chunks_embeddings, {NEW_TABLE} IN ACCESS EXCLUSIVE MODE")
+    cur.execute(f"DROP TRIGGER {MIRROR_TRIGGER} ON chunks_embeddings")
+    cur.execute(
+        "SELECT pg_get_viewdef(to_regclass('document_chunks'))")
+    view = cur.fetchone()[0]
+
+    cur.execute(f"ALTER TABLE chunks_embeddings RENAME TO {OLD_TABLE}")
+    cur.execute(f"ALTER TABLE {NEW_TABLE} RENAME TO chunks_embeddings")
+    if view is not None:
+        # The view follows the table it was created on; point it at the new one
+        cur.execute(f"CREATE OR REPLACE VIEW document_chunks AS {view}")
+    cur.execute(f"DROP TABLE {OLD_TABLE}")
+    cur.execute(f"DROP FUNCTION {MIRROR_FUNCTION}()")
+
+    cur.execute(
+        f"ALTER TABLE chunks_embeddings RENAME CONSTRAINT {NEW_TABLE}_pkey "
+        "TO chunks_embeddings_pkey"
+    )
+    for name in index_names:
+        cur.execute(f"ALTER INDEX IF EXISTS {name}{INDEX_SUFFIX} RENAME TO {name}")
@@ -1,57 +1,660 @@
-import json
+import asyncio
+import copy
+import hashlib
+import itertools
 import logging
+import os
+import queue
+import threading
+import time
 import uuid
 from collections import defaultdict
-from datetime import datetime
-from typing import Any, List, Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 import numpy as np
 from langchain.schema.embeddings import Embeddings
 from langchain.vectorstores import VectorStore
-from langchain_community.retrievers import BM25Retriever
 from langchain_core.documents import Document
-from pgvector.sqlalchemy import Vector
 from psycopg2.extras import RealDictCursor
-from sqlalchemy import Column, DateTime, ForeignKey, String, func
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy import func, text
 
-from core.factories.embedding_factory import get_embeddings
-from database.postgres import Base, DateTimeEncoder, PostgresDB, SQLDocument
+from core.config import VectorIndexConfig, settings
+from core.factories.embedding_factory import (get_embeddings,
+                                             get_query_embedding_cache)
+from database.postgres import PostgresDB, SQLDocument
 from models.henry_doc import HenryDoc
 from core.supabase_client import get_supabase_client
-from models.document import ChunkEmbedding
+from models.document import UNASSIGNED_COURSE_ID, ChunkEmbedding
+from services.embedding.embedding_cache import CacheLookup, ChunkEmbeddingCache
+from services.vector_store.bm25 import BM25Index
+from services.vector_store.bm25_cache import BM25IndexCache
+from services.vector_store.bulk_copy import ChunkCopyWriter
+from services.vector_store.hot_cache import CourseMirror, HotTenantCache
 supabase = get_supabase_client()
 
 logger = logging.getLogger(__name__)
 
+# Names of the ANN indexes managed on chunks_embeddings.embedding, per index type
+VECTOR_INDEX_NAMES = {
+    "hnsw": "idx_chunks_embeddings_embedding_hnsw",
+    "ivfflat": "idx_chunks_embeddings_embedding_ivfflat",
+}
+# Indexed expression, operator class and distance operator per quantization
+# mode; {column} is the embedding column (or query vector) and {dim} its
+# dimension. Binary codes keep the sign bit of each dimension and are
+# compared by Hamming distance.
+QUANTIZATIONS = {
+    "none": ("{column}", "vector_cosine_ops", "<=>"),
+    "halfvec": ("({column}::halfvec({dim}))", "halfvec_cosine_ops", "<=>"),
+    "binary": ("(binary_quantize({column})::bit({dim}))", "bit_hamming_ops", "<~>"),
+}
+EMBEDDING_DIM = ChunkEmbedding.embedding.type.dim
+# Partitions of chunks_embeddings when it is partitioned by course_id
+DEFAULT_PARTITION = "chunks_embeddings_default"
+COURSE_PARTITION_PREFIX = "chunks_embeddings_course_"
+# Stored (non-generated) columns, for moving rows between partitions
+PARTITION_COLUMNS = (
+    "id, document_id, user_id, course_id, data, embedding, ts_config, "
+    "created_at, updated_at"
+)
+# pgvector refuses ef_search values above this
+MAX_EF_SEARCH = 1000
+# Accepted hnsw.iterative_scan / ivfflat.iterative_scan values per index type
+ITERATIVE_SCAN_MODES = {
+    "hnsw": ("off", "relaxed_order", "strict_order"),
+    "ivfflat": ("off", "relaxed_order"),
+}
+# Columns retrieval reads from chunks_embeddings (aliased c). The embedding,
+# timestamps and the rest of the JSONB blob never leave the server.
+RESULT_COLUMNS = (
+    "c.id, c.document_id, c.course_id, "
+    "c.data->>'page_content' AS page_content, c.data->'metadata' AS metadata"
+)
+# Columns fetched by retrieval legs when content is hydrated after fusion
+ID_COLUMNS = "c.id, c.document_id, c.course_id"
+# Retrieval scores copied from result rows into Document metadata: fused
+# RRF score (higher is better), cosine distance of the dense leg (lower is
+# better) and ts_rank of the text search leg (higher is better)
+SCORE_FIELDS = ("score", "distance", "ts_rank")
+# Legs of a hybrid search, as named in metadata["ranks"]
+SEARCH_LEGS = ("sparse", "dense")
+
+
+class HybridSearchMode(str, Enum):
+    # BM25 + text search, then dense search, fused in Python
+    SEQUENTIAL = "sequential"
+    # Text search and dense legs as CTEs, fused with RRF in one statement
+    SQL = "sql"
+    # Sparse and dense legs on a thread pool, fused in Python
+    CONCURRENT = "concurrent"
+
 
 class PGVectorStore(VectorStore):
     """
     Custom PostgreSQL pgvector implementation using SQLAlchemy ORM.
     """
 
-    def __init__(self, embedding_dim: int = 3072, create_indexes: bool = True):
+    def __init__(
+        self,
+        embedding_dim: int = 3072,
+        index_config: Optional[VectorIndexConfig] = None,
+    ):
         """
         Initialize the vector store.
 
+        The ANN index is not built here: building it can take minutes on a
+        large table, so it is an admin step (python -m
+        services.vector_store.admin ensure-indexes) run on deploy.
+
         Args:
             embedding_dim: Dimension of the embedding vectors
-            create_indexes: Whether to automatically create optimized indexes
+            index_config: ANN index settings (defaults to settings.vector_store.index)
         """
         self.embedding_dim = embedding_dim
+        self.index_config = index_config or settings.vector_store.index
 
         # Initialize PostgresDB if not already initialized
         self.db = PostgresDB()
         self._Session = self.db._Session
 
-        # Initialize BM25 retriever as None, will be created on first use
-        self._bm25_retriever = None
-        self._bm25_docs = None
+        # Repeated questions skip the embedding model entirely
+        self._query_cache = get_query_embedding_cache()
+        self._copy_writer = ChunkCopyWriter()
+        self._embedding_cache = ChunkEmbeddingCache(self.db)
+
+        # Per-tenant BM25 indexes, built on first use and invalidated on writes
+        self._bm25_cache = BM25IndexCache(
+            max_size=settings.vector_store.bm25.cache_size,
+            revalidate_interval=settings.vector_store.bm25.revalidate_interval,
+        )
+        # Threads running the sparse and dense legs of concurrent searches
+        self._search_executor = ThreadPoolExecutor(
+            max_workers=settings.vector_store.search_workers,
+            thread_name_prefix="hybrid-search",
+        )
+        # Single background worker merging incremental BM25 segments
+        self._bm25_compactor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="bm25-compact")
+        # Embedding matrices of the busiest courses, searched without SQL
+        self._hot_cache = HotTenantCache(
+            max_courses=settings.vector_store.hot_cache.max_courses,
+            min_queries=settings.vector_store.hot_cache.min_queries,
+            max_tracked=settings.vector_store.hot_cache.max_tracked,
+        )
+        self._hot_loader = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="hot-cache-load")
 
         # Log initialization
         logger.info("Vector store initialized")
 
+    @contextmanager
+    def _autocommit_cursor(self):
+        """
+        Yield a cursor on a dedicated autocommit connection.
+
+        CREATE/DROP INDEX CONCURRENTLY and REINDEX CONCURRENTLY cannot run
+        inside a transaction block, so they bypass the ORM session.
+        """
+        conn = self.db._engine.raw_connection()
+        try:
+            conn.driver_connection.autocommit = True
+            cur = conn.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _index_is_valid(cur, index_name: str) -> Optional[bool]:
+        """Return None if the index does not exist, else whether it is valid."""
+        cur.execute(
+            """
+            SELECT i.indisvalid FROM pg_class c
+            JOIN pg_index i ON i.indexrelid = c.oid
+            WHERE c.relname = %s
+            """,
+            (index_name,),
+        )
+        row = cur.fetchone()
+        return None if row is None else bool(row[0])
+
+    @staticmethod
+    def _vector_index_name(config: VectorIndexConfig) -> str:
+        """Name of the ANN index for an index type and quantization mode."""
+        index_name = VECTOR_INDEX_NAMES[config.type]
+        if config.quantization != "none":
+            index_name = f"{index_name}_{config.quantization}"
+        return index_name
+
+    @staticmethod
+    def _quantized(column: str, quantization: str) -> str:
+        """SQL expression of column (or query vector) under a quantization mode."""
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        return QUANTIZATIONS[quantization][0].format(column=column, dim=EMBEDDING_DIM)
+
+    def _vector_index_ddl(
+        self,
+        index_name: str,
+        config: VectorIndexConfig,
+        concurrently: bool = True,
+        table: str = "chunks_embeddings",
+        only: bool = False,
+    ) -> str:
+        """Build the CREATE INDEX statement for the configured ANN index."""
+        if config.type == "hnsw":
+            params = {"m": config.m, "ef_construction": config.ef_construction}
+        elif config.type == "ivfflat":
+            params = {"lists": config.lists}
+        else:
+            raise ValueError(f"Unsupported vector index type: {config.type}")
+
+        with_clause = ", ".join(f"{key} = {int(value)}" for key, value in params.items())
+        expression = self._quantized("embedding", config.quantization)
+        opclass = QUANTIZATIONS[config.quantization][1]
+        return (
+            f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {index_name} "
+            f"ON {'ONLY ' if only else ''}{table} USING {config.type} ({expression} {opclass}) "
+            f"WITH ({with_clause})"
+        )
+
+    @staticmethod
+    def _is_partitioned(cur) -> bool:
+        cur.execute(
+            "SELECT relkind FROM pg_class WHERE oid = 'chunks_embeddings'::regclass")
+        return cur.fetchone()[0] == "p"
+
+    @staticmethod
+    def _partitions(cur) -> List[str]:
+        cur.execute(
+            """
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'chunks_embeddings'::regclass
+            ORDER BY c.relname
+            """
+        )
+        return [row[0] for row in cur.fetchall()]
+
+    @staticmethod
+    def _partition_index_name(partition: str, index_name: str) -> str:
+        # Kept under the 63 character identifier limit
+        digest = hashlib.sha1(index_name.encode("utf-8")).hexdigest()[:10]
+        return f"idx_{partition}_{digest}"
+
+    def _drop_index(self, cur, index_name: str):
+        """Drop an index, concurrently unless it is a partitioned index."""
+        cur.execute("SELECT relkind FROM pg_class WHERE relname = %s", (index_name,))
+        row = cur.fetchone()
+        if row is None:
+            return
+        if row[0] == "I":
+            # Partitioned indexes cannot be dropped concurrently; this also
+            # drops the per-partition indexes attached to it
+            cur.execute(f"DROP INDEX IF EXISTS {index_name}")
+        else:
+            cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+    def _create_vector_index(
+        self, cur, index_name: str, config: VectorIndexConfig, where: str = ""
+    ):
+        """
+        Create an ANN index without blocking writes.
+
+        CREATE INDEX CONCURRENTLY is not supported on a partitioned table,
+        so there each partition's index is built concurrently and attached
+        to an index created ON ONLY the parent, which becomes valid once
+        every partition has one. Partitions created later get their index
+        automatically. Re-running resumes an interrupted build.
+        """
+        where = f" WHERE {where}" if where else ""
+        if not self._is_partitioned(cur):
+            cur.execute(self._vector_index_ddl(index_name, config) + where)
+            return
+
+        cur.execute(
+            self._vector_index_ddl(index_name, config, concurrently=False, only=True)
+            + where)
+        for partition in self._partitions(cur):
+            child_name = self._partition_index_name(partition, index_name)
+            if self._index_is_valid(cur, child_name) is False:
+                logger.warning(f"Dropping invalid index {child_name}")
+                cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {child_name}")
+            logger.info(f"Building {config.type} index {child_name} on {partition}")
+            cur.execute(
+                self._vector_index_ddl(child_name, config, table=partition) + where)
+            cur.execute(f"ALTER INDEX {index_name} ATTACH PARTITION {child_name}")
+
+    def _set_maintenance_work_mem(self, cur, config: VectorIndexConfig):
+        if config.maintenance_work_mem:
+            cur.execute("SET maintenance_work_mem = %s",
+                        (config.maintenance_work_mem,))
+
+    def ensure_indexes(self):
+        """
+        Create the configured ANN index on chunks_embeddings.embedding if missing.
+
+        The index is built CONCURRENTLY so writes are not blocked. A previous
+        concurrent build that failed leaves an INVALID index behind, which
+        IF NOT EXISTS would silently keep, so it is dropped and rebuilt; on a
+        partitioned table only the partitions still missing a valid index
+        are built. Also makes sure a partitioned table has its default
+        partition.
+        """
+        config = self.index_config
+        with self._autocommit_cursor() as cur:
+            partitioned = self._is_partitioned(cur)
+            if partitioned:
+                cur.execute(
+                    f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} "
+                    "PARTITION OF chunks_embeddings DEFAULT"
+                )
+            if config.type == "none":
+                return
+            index_name = self._vector_index_name(config)
+            state = self._index_is_valid(cur, index_name)
+            if state:
+                return
+            if state is False and not partitioned:
+                logger.warning(f"Dropping invalid index {index_name}")
+                self._drop_index(cur, index_name)
+
+            self._set_maintenance_work_mem(cur, config)
+            logger.info(f"Building {config.type} index {index_name}")
+            self._create_vector_index(cur, index_name, config)
+            logger.info(f"Index {index_name} ready")
+
+    def reindex(self, concurrently: bool = True):
+        """
+        Rebuild the current ANN index in place, e.g. after large deletes.
+
+        With concurrently=True the table stays readable and writable while the
+        replacement index is built. A partitioned index is rebuilt partition
+        by partition.
+        """
+        config = self.index_config
+        if config.type == "none":
+            return
+        index_name = self._vector_index_name(config)
+        with self._autocommit_cursor() as cur:
+            self._set_maintenance_work_mem(cur, config)
+            cur.execute(
+                f"REINDEX INDEX {'CONCURRENTLY ' if concurrently else ''}{index_name}")
+        logger.info(f"Reindexed {index_name}")
+
+    def rebuild_index(self, index_config: Optional[VectorIndexConfig] = None):
+        """
+        Build a new ANN index (possibly of another type or with new build
+        parameters) next to the old one, then swap it in.
+
+        Queries keep using the old index until the new one is valid. The
+        old index is renamed away and the new one renamed in within a
+        single transaction, and only then are the old indexes dropped, so
+        some ANN index exists at every point and this can run against live
+        traffic.
+        """
+        config = index_config or self.index_config
+        if config.type == "none":
+            raise ValueError("Cannot rebuild an index of type 'none'")
+        index_name = self._vector_index_name(config)
+        tmp_name = f"{index_name}_new"
+        old_name = f"{index_name}_old"
+
+        with self._autocommit_cursor() as cur:
+            self._drop_index(cur, tmp_name)
+            self._drop_index(cur, old_name)
+            self._set_maintenance_work_mem(cur, config)
+            logger.info(f"Building replacement index {tmp_name}")
+            self._create_vector_index(cur, tmp_name, config)
+
+            cur.execute("BEGIN")
+            try:
+                cur.execute(f"ALTER INDEX IF EXISTS {index_name} RENAME TO {old_name}")
+                cur.execute(f"ALTER INDEX {tmp_name} RENAME TO {index_name}")
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+            logger.info(f"Swapped in rebuilt index {index_name}")
+
+            self._drop_index(cur, old_name)
+            for index_type in VECTOR_INDEX_NAMES:
+                for quantization in QUANTIZATIONS:
+                    other_name = self._vector_index_name(VectorIndexConfig(
+                        type=index_type, quantization=quantization))
+                    if other_name != index_name:
+                        self._drop_index(cur, other_name)
+
+        self.index_config = config
+
+    def _tenant_index_name(self, course_id: int) -> str:
+        config = self.index_config
+        index_name = f"idx_chunks_course_{int(course_id)}_{config.type}"
+        if config.quantization != "none":
+            index_name = f"{index_name}_{config.quantization}"
+        return index_name
+
+    def create_tenant_index(self, course_id: int):
+        """
+        Give one course its own ANN index.
+
+        Dense queries filtered on that course_id are then answered from a
+        graph holding only the course's chunks, so their cost follows the
+        size of the course rather than the table. On a partitioned table
+        this means moving the course to its own partition; otherwise a
+        partial index (WHERE course_id = ...) is built. Worth it for large
+        courses; small ones are cheaper to filter from the shared index.
+        """
+        config = self.index_config
+        if config.type == "none":
+            raise ValueError("Cannot build a tenant index of type 'none'")
+        if self.create_course_partition(course_id):
+            return
+        index_name = self._tenant_index_name(course_id)
+        with self._autocommit_cursor() as cur:
+            state = self._index_is_valid(cur, index_name)
+            if state:
+                return
+            if state is False:
+                logger.warning(f"Dropping invalid index {index_name}")
+                self._drop_index(cur, index_name)
+
+            self._set_maintenance_work_mem(cur, config)
+            logger.info(f"Building {config.type} index {index_name}")
+            self._create_vector_index(
+                cur, index_name, config, where=f"course_id = {int(course_id)}")
+            logger.info(f"Index {index_name} ready")
+
+    def drop_tenant_index(self, course_id: int):
+        """Drop the partial ANN index of a course, if any."""
+        with self._autocommit_cursor() as cur:
+            self._drop_index(cur, self._tenant_index_name(course_id))
+
+    @staticmethod
+    def _course_partition_name(course_id: int) -> str:
+        return f"{COURSE_PARTITION_PREFIX}{int(course_id)}"
+
+    def create_course_partition(self, course_id: int) -> Optional[str]:
+        """
+        Give a course its own partition if chunks_embeddings is partitioned.
+
+        An admin step (python -m services.vector_store.admin
+        create-course-partition), best run before the course gets chunks:
+        it is never run on the query or ingest path. The partition is built
+        as a standalone table and attached; a CHECK constraint validated on
+        the default partition beforehand lets ATTACH skip scanning it, so
+        only brief locks are taken. While the constraint is in place,
+        writes of that course into the default partition fail.
+
+        A course already holding chunks in the default partition has them
+        moved in the same transaction as the ATTACH, which then has to scan
+        the default partition under an ACCESS EXCLUSIVE lock; run that in a
+        maintenance window.
+
+        Returns:
+            The partition name, or None if the table is not partitioned or
+            the course is UNASSIGNED_COURSE_ID
+        """
+        course_id = int(course_id)
+        if course_id == UNASSIGNED_COURSE_ID:
+            return None
+        partition = self._course_partition_name(course_id)
+        with self._autocommit_cursor() as cur:
+            if not self._is_partitioned(cur):
+                return None
+            cur.execute("SELECT to_regclass(%s)", (partition,))
+            if cur.fetchone()[0] is not None:
+                return partition
+            self._create_course_partition(cur, course_id, partition)
+        return partition
+
+    def _create_course_partition(self, cur, course_id: int, partition: str):
+        guard = f"{DEFAULT_PARTITION}_not_{course_id}"
+        cur.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {partition} (
+                LIKE chunks_embeddings INCLUDING DEFAULTS INCLUDING GENERATED,
+                CONSTRAINT {partition}_course CHECK (course_id = {course_id})
+            )
+            """
+        )
+        cur.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE course_id = %s)",
+            (course_id,),
+        )
+        if not cur.fetchone()[0]:
+            # NOT VALID + VALIDATE scans the default partition without
+            # blocking reads or writes; ATTACH then trusts the constraint
+            cur.execute(
+                f"ALTER TABLE {DEFAULT_PARTITION} ADD CONSTRAINT {guard} "
+                f"CHECK (course_id <> {course_id}) NOT VALID"
+            )
+            try:
+                cur.execute(f"ALTER TABLE {DEFAULT_PARTITION} VALIDATE CONSTRAINT {guard}")
+                cur.execute(
+                    f"ALTER TABLE chunks_embeddings ATTACH PARTITION {partition} "
+                    f"FOR VALUES IN ({course_id})"
+                )
+            finally:
+                cur.execute(
+                    f"ALTER TABLE {DEFAULT_PARTITION} DROP CONSTRAINT IF EXISTS {guard}")
+        else:
+            logger.warning(
+                f"Moving chunks of course {course_id} out of {DEFAULT_PARTITION}; "
+                "the default partition is locked until the partition is attached"
+            )
+            cur.execute("BEGIN")
+            try:
+                cur.execute(
+                    f"""
+                    WITH moved AS (
+                        DELETE FROM {DEFAULT_PARTITION} WHERE course_id = %s
+                        RETURNING {PARTITION_COLUMNS}
+                    )
+                    INSERT INTO {partition} ({PARTITION_COLUMNS})
+                    SELECT {PARTITION_COLUMNS} FROM moved
+                    """,
+                    (course_id,),
+                )
+                logger.info(f"Moved {cur.rowcount} chunks into {partition}")
+                cur.execute(
+                    f"ALTER TABLE chunks_embeddings ATTACH PARTITION {partition} "
+                    f"FOR VALUES IN ({course_id})"
+                )
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+        cur.execute(f"ALTER TABLE {partition} DROP CONSTRAINT IF EXISTS {partition}_course")
+        logger.info(f"Created partition {partition}")
+
+    def drop_course(self, course_id: int) -> int:
+        """
+        Remove every chunk of a course.
+
+        A course with its own partition is dropped as a table instead of
+        deleting its rows one by one, which leaves no dead tuples or index
+        bloat behind. Parent documents are kept.
+
+        Returns:
+            Number of chunks removed
+        """
+        course_id = int(course_id)
+        session = None
+        try:
+            session = self._Session()
+            owners = defaultdict(list)
+            for user_id, document_id in (
+                session.query(ChunkEmbedding.user_id, ChunkEmbedding.document_id)
+                .filter(ChunkEmbedding.course_id == course_id)
+                .distinct()
+            ):
+                owners[str(user_id)].append(document_id)
+        finally:
+            if session:
+                session.close()
+
+        partition = self._course_partition_name(course_id)
+        with self._autocommit_cursor() as cur:
+            cur.execute("SELECT to_regclass(%s)", (partition,))
+            if cur.fetchone()[0] is not None:
+                cur.execute(f"SELECT count(*) FROM {partition}")
+                removed = cur.fetchone()[0]
+                cur.execute(f"DROP TABLE {partition}")
+            else:
+                cur.execute(
+                    "DELETE FROM chunks_embeddings WHERE course_id = %s", (course_id,))
+                removed = cur.rowcount
+
+        for user_id, document_ids in owners.items():
+            self._bm25_delete(user_id, document_ids)
+        self._bm25_cache.invalidate(self._tenant_key(None, course_id))
+        self._hot_cache.invalidate(course_id)
+        logger.info(f"Removed {removed} chunks of course {course_id}")
+        return removed
+
+    def _search_param_statements(
+        self,
+        top_k: int,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> List[str]:
+        """
+        SET LOCAL statements carrying per-query ANN search parameters.
+
+        HNSW never returns more than ef_search rows, so it is raised to the
+        number of rows the index scan must produce when needed.
+        """
+        config = self.index_config
+        top_k = self._candidate_count(top_k)
+        if config.type == "hnsw":
+            ef_search = min(max(ef_search or config.ef_search, top_k), MAX_EF_SEARCH)
+            statements = [f"SET LOCAL hnsw.ef_search = {int(ef_search)}"]
+        elif config.type == "ivfflat":
+            statements = [f"SET LOCAL ivfflat.probes = {int(probes or config.probes)}"]
+        else:
+            return []
+
+        if config.iterative_scan:
+            if config.iterative_scan not in ITERATIVE_SCAN_MODES[config.type]:
+                raise ValueError(
+                    f"Unsupported iterative_scan for {config.type}: {config.iterative_scan}")
+            statements.append(
+                f"SET LOCAL {config.type}.iterative_scan = {config.iterative_scan}")
+        return statements
+
+    def _candidate_count(self, top_k: int) -> int:
+        """Rows taken from the ANN index to return top_k results."""
+        if self.index_config.quantization == "none":
+            return top_k
+        return top_k * max(1, self.index_config.rescore_factor)
+
+    def _dense_sql(self, select: str, where: str, vector: str, limit: str, top_k: int) -> str:
+        """
+        Statement returning select for the chunks (aliased c) closest to the
+        query vector placeholder by cosine distance.
+
+        With a quantized index the nearest _candidate_count(top_k) chunks are
+        taken from the compact index first (cosine on halfvec, Hamming on
+        binary codes), then re-scored exactly against the full-precision
+        embeddings.
+        """
+        quantization = self.index_config.quantization
+        if quantization == "none":
+            return f"""
+                SELECT {select} FROM chunks_embeddings c {where}
+                ORDER BY c.embedding <=> {vector}::vector
+                LIMIT {limit}
+            """
+        return f"""
+            SELECT {select} FROM (
+                SELECT c.id, c.document_id, c.course_id, c.data, c.embedding
+                FROM chunks_embeddings c {where}
+                ORDER BY {self._quantized("c.embedding", quantization)}
+                    {QUANTIZATIONS[quantization][2]}
+                    {self._quantized(f"{vector}::vector", quantization)}
+                LIMIT {int(self._candidate_count(top_k))}
+            ) c
+            ORDER BY c.embedding <=> {vector}::vector
+            LIMIT {limit}
+        """
+
+    def _apply_search_params(
+        self,
+        cur,
+        top_k: int,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ):
+        """Set per-query ANN search parameters for the current transaction."""
+        for statement in self._search_param_statements(top_k, ef_search, probes):
+            cur.execute(statement)
+
     def get_document(self, document_id: str) -> Optional[HenryDoc]:
         """
         Retrieve a document from the store.
@@ -83,41 +686,109 @@ class PGVectorStore(VectorStore):
         )
         return get_embeddings()
 
-    def add_documents(self, documents: List[Document], document_id: str) -> bool:
-        """Add documents to the store using SQLAlchemy ORM."""
-        session = None
-        try:
-            session = self._Session()
+    def _embed_query(self, query: str) -> np.ndarray:
+        """Embed a search query through the shared query-embedding cache."""
+        return self._query_cache.get_or_compute(
+            settings.embedding.model_name, query, self.embeddings.embed_query
+        )
 
-            # Check if document exists
-            existing_doc = (
-                session.query(SQLDocument).filter(
-                    SQLDocument.id == document_id).first()
-            )
-            if not existing_doc:
-                raise ValueError(f"Parent document {document_id} not found")
+    async def _aembed_query(self, query: str) -> np.ndarray:
+        """Async version of _embed_query."""
+        return await self._query_cache.aget_or_compute(
+            settings.embedding.model_name, query, self.embeddings.aembed_query
+        )
+
+    def _embed_documents(
+        self, texts: List[str], embedding: Optional[Embeddings] = None
+    ) -> Tuple[List[Any], CacheLookup]:
+        """
+        Embed chunk texts through the persistent embedding cache.
+
+        The cache is keyed by settings.embedding.model_name, so it is
+        bypassed for any other embedding function.
+        """
+        embedding = embedding or self.embeddings
+        if not settings.embedding.document_cache or embedding is not self.embeddings:
+            return embedding.embed_documents(texts), CacheLookup(0, len(texts))
+        return self._embedding_cache.embed(
+            settings.embedding.model_name, texts, embedding.embed_documents
+        )
+
+    async def _aembed_documents(self, texts: List[str]) -> Tuple[List[Any], CacheLookup]:
+        """Async version of _embed_documents."""
+        if not settings.embedding.document_cache:
+            return await self.embeddings.aembed_documents(texts), CacheLookup(0, len(texts))
+        return await self._embedding_cache.aembed(
+            settings.embedding.model_name, texts, self.embeddings.aembed_documents
+        )
+
+    @staticmethod
+    def _log_cache_lookup(document_id: str, lookup: CacheLookup):
+        logger.info(
+            f"Embedding cache for document {document_id}: {lookup.hits} hits, "
+            f"{lookup.misses} embedded ({lookup.hit_rate:.0%} hit rate)"
+        )
+
+    def _write_chunks(
+        self, session, rows: List[tuple], language: str, use_copy: Optional[bool] = None
+    ):
+        """
+        Stage chunk rows (id, document_id, user_id, course_id, data, embedding)
+        in the session's transaction.
 
-            # Get user_id from the document
-            user_id = str(existing_doc.user_id)
-            # Generate embeddings for all documents
+        Unless use_copy says otherwise, batches of at least
+        vector_store.copy_threshold rows are streamed with COPY and smaller
+        ones are inserted row-wise. Both resolve chunk ids already stored
+        the same way (see bulk_copy.ON_CONFLICT_SQL).
+        """
+        if use_copy is None:
+            use_copy = len(rows) >= settings.vector_store.copy_threshold
+        cur = session.connection().connection.cursor()
+        if use_copy:
+            self._copy_writer.write(cur, rows, language)
+        else:
+            self._copy_writer.insert(cur, rows, language)
+
+    def add_documents(
+        self,
+        documents: List[Document],
+        document_id: str,
+        language: Optional[str] = None,
+        course_id: Optional[int] = None,
+    ) -> bool:
+        """Add documents to the store, optionally within a course."""
+        language = language or settings.vector_store.text_search_language
+        course_id = UNASSIGNED_COURSE_ID if course_id is None else int(course_id)
+        session = None
+        try:
+            user_id = self._document_owner(document_id)
+            # Generate embeddings for all documents, before a connection is taken
             texts = [doc.page_content for doc in documents]
-            embeddings = self.embeddings.embed_documents(texts)
-            # Create ChunkEmbedding objects and explicitly set their IDs
-            chunk_objects = []
-            for doc, embedding in zip(documents, embeddings):
-                chunk = ChunkEmbedding(
-                    id=doc.id,  # Use the LangChain document's ID directly
-                    document_id=document_id,
-                    user_id=user_id,
-                    data={"page_content": doc.page_content,
-                          "metadata": doc.metadata},
-                    embedding=embedding,
+            embeddings, lookup = self._embed_documents(texts)
+            self._log_cache_lookup(document_id, lookup)
+            rows = [
+                (
+                    doc.id,  # Use the LangChain document's ID directly
+                    document_id,
+                    user_id,
+                    course_id,
+                    {"page_content": doc.page_content, "metadata": doc.metadata},
+                    embedding,
                 )
-                chunk_objects.append(chunk)
-            # Add all chunks to session
-            session.add_all(chunk_objects)
+                for doc, embedding in zip(documents, embeddings)
+            ]
+            session = self._Session()
+            self._write_chunks(session, rows, language)
             session.commit()
 
+            self._bm25_add(
+                user_id,
+                [doc.id for doc in documents],
+                [document_id] * len(documents),
+                texts,
+                course_id=course_id,
+            )
+
             logger.info(
                 f"Successfully added {len(documents)} chunks for document {document_id}"
             )
@@ -132,12 +803,196 @@ class PGVectorStore(VectorStore):
             if session:
                 session.close()
 
-    def get_all_documents(self, user_id: str) -> List[Document]:
+    def add_documents_streaming(
+        self,
+        documents: Iterable[Document],
+        document_id: str,
+        language: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        resume: bool = False,
+        course_id: Optional[int] = None,
+    ) -> int:
+        """
+        Embed and insert chunks from an iterable in micro-batches.
+
+        The calling thread embeds one batch while a writer thread COPYs the
+        previous ones, so at most vector_store.ingest_queue_size + 2 batches
+        are held in memory whatever the size of the document. Each batch is
+        committed together with a checkpoint in the parent document
+        (metadata.chunk_number = chunks stored so far).
+
+        Args:
+            documents: Chunks, typically a generator such as
+                Splitter.iter_split_document
+            document_id: Parent document ID
+            language: Text search configuration for the chunks
+            batch_size: Chunks per batch (default: vector_store.ingest_batch_size)
+            resume: Skip the chunks covered by the document's checkpoint, to
+                restart an interrupted ingestion over the same chunk sequence
+            course_id: Course the chunks belong to
+
+        Returns:
+            Number of chunks written by this call
+        """
+        language = language or settings.vector_store.text_search_language
+        batch_size = batch_size or settings.vector_store.ingest_batch_size
+        course_id = UNASSIGNED_COURSE_ID if course_id is None else int(course_id)
+        user_id, checkpoint = self._ingestion_checkpoint(document_id)
+
+        chunks = iter(documents)
+        if resume and checkpoint:
+            logger.info(
+                f"Resuming ingestion of document {document_id} after {checkpoint} chunks")
+            chunks = itertools.islice(chunks, checkpoint, None)
+        else:
+            checkpoint = 0
+
+        batches: "queue.Queue[Optional[List[Tuple[Document, List[float]]]]]" = queue.Queue(
+            maxsize=settings.vector_store.ingest_queue_size
+        )
+        written = 0
+        lookup = CacheLookup(0, 0)
+        errors: List[Exception] = []
+
+        def writer():
+            nonlocal written
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    return
+                if errors:
+                    # Keep draining so the producer never blocks on a dead writer
+                    continue
+                try:
+                    self._write_batch(
+                        batch, document_id, user_id, course_id, language,
+                        checkpoint + written + len(batch),
+                    )
+                    written += len(batch)
+                except Exception as e:
+                    logger.error(f"Failed to write batch for document {document_id}: {e}")
+                    errors.append(e)
+
+        thread = threading.Thread(
+            target=writer, name=f"ingest-{document_id}", daemon=True)
+        thread.start()
+        start = time.perf_counter()
+        try:
+            while not errors:
+                batch = list(itertools.islice(chunks, batch_size))
+                if not batch:
+                    break
+                embeddings, batch_lookup = self._embed_documents(
+                    [doc.page_content for doc in batch])
+                lookup += batch_lookup
+                batches.put(list(zip(batch, embeddings)))
+        finally:
+            batches.put(None)
+            thread.join()
+        if errors:
+            raise errors[0]
+
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"Streamed {written} chunks for document {document_id} in {elapsed:.1f}s "
+            f"({written / elapsed if elapsed else 0:.0f} chunks/s)"
+        )
+        self._log_cache_lookup(document_id, lookup)
+        return written
+
+    def _document_owner(self, document_id: str) -> str:
+        """Return the owner of a document, in a session of its own."""
+        session = None
+        try:
+            session = self._Session()
+            doc = (
+                session.query(SQLDocument).filter(
+                    SQLDocument.id == document_id).first()
+            )
+            if not doc:
+                raise ValueError(f"Parent document {document_id} not found")
+            return str(doc.user_id)
+        finally:
+            if session:
+                session.close()
+
+    def _ingestion_checkpoint(self, document_id: str) -> Tuple[str, int]:
+        """Return the owner of a document and its stored chunk count."""
+        session = None
+        try:
+            session = self._Session()
+            doc = (
+                session.query(SQLDocument).filter(
+                    SQLDocument.id == document_id).first()
+            )
+            if not doc:
+                raise ValueError(f"Parent document {document_id} not found")
+            metadata = (doc.data or {}).get("metadata") or {}
+            return str(doc.user_id), int(metadata.get("chunk_number") or 0)
+        finally:
+            if session:
+                session.close()
+
+    def _write_batch(
+        self,
+        batch: List[Tuple[Document, List[float]]],
+        document_id: str,
+        user_id: str,
+        course_id: int,
+        language: str,
+        checkpoint: int,
+    ):
+        """Write one embedded batch and advance the checkpoint atomically."""
+        rows = [
+            (
+                doc.id or str(uuid.uuid4()),
+                document_id,
+                user_id,
+                course_id,
+                {"page_content": doc.page_content, "metadata": doc.metadata},
+                embedding,
+            )
+            for doc, embedding in batch
+        ]
+        session = None
+        try:
+            session = self._Session()
+            self._write_chunks(session, rows, language, use_copy=True)
+            session.execute(
+                text(
+                    "UPDATE documents SET data = jsonb_set("
+                    "data, '{metadata,chunk_number}', to_jsonb(CAST(:n AS integer))) "
+                    "WHERE id = :id"
+                ),
+                {"n": checkpoint, "id": document_id},
+            )
+            session.commit()
+        except Exception:
+            if session:
+                session.rollback()
+            raise
+        finally:
+            if session:
+                session.close()
+
+        self._bm25_add(
+            user_id,
+            [row[0] for row in rows],
+            [document_id] * len(rows),
+            [row[4]["page_content"] for row in rows],
+            course_id=course_id,
+        )
+
+    def get_all_documents(self, user_id: Optional[str] = None) -> List[Document]:
         """Get all documents from the store, optionally filtered by user_id."""
         session = None
         try:
             session = self._Session()
-            query = session.query(ChunkEmbedding)
+            query = session.query(
+                ChunkEmbedding.id, ChunkEmbedding.document_id, ChunkEmbedding.data
+            )
+            if user_id:
+                query = query.filter(ChunkEmbedding.user_id == str(user_id))
             chunks = query.all()
             # Modify this to ensure document_id is in metadata
             return [
@@ -145,6 +1000,7 @@ class PGVectorStore(VectorStore):
                     page_content=chunk.data["page_content"],
                     metadata={
                         **chunk.data.get("metadata", {}),
+                        "id": chunk.id,
                         "document_id": chunk.document_id,  # Explicitly add document_id
                     },
                 )
@@ -154,7 +1010,9 @@ class PGVectorStore(VectorStore):
             if session:
                 session.close()
 
-    def _retrieve_with_bm25(self, query: str, user_id: str, k: int = 30) -> List[str]:
+    def _retrieve_with_bm25(
+        self, query: str, user_id: str, k: int = 30, course_id: Optional[int] = None
+    ) -> List[str]:
         """
         Perform first-pass BM25 retrieval to get candidate document IDs.
 
@@ -162,21 +1020,20 @@ class PGVectorStore(VectorStore):
             query: Search query
             user_id: User ID for filtering
             k: Number of documents to retrieve
+            course_id: Search the course's chunks instead of the user's
 
         Returns:
             List of document IDs from BM25 retrieval
         """
-        # Get BM25 retriever (will be cached after first use)
-        bm25_retriever = self._get_bm25_retriever(user_id, k)
+        # Get BM25 index (will be cached after first use)
+        bm25_index = self._get_bm25_index(user_id, course_id)
 
-        # Get top documents using BM25
-        first_pass_docs = bm25_retriever.get_relevant_documents(query)
-        logger.debug(f"BM25 returned {len(first_pass_docs)} documents")
+        # Get top chunks using BM25
+        hits = bm25_index.search(query, k=k)
+        logger.debug(f"BM25 returned {len(hits)} documents")
 
         # Extract document IDs from first pass results
-        first_pass_doc_ids = list(
-            {doc.metadata["document_id"] for doc in first_pass_docs}
-        )
+        first_pass_doc_ids = list({hit.document_id for hit in hits})
 
         return first_pass_doc_ids
 
@@ -185,21 +1042,30 @@ class PGVectorStore(VectorStore):
         query: str,
         top_k: int,
         document_ids: Optional[List[str]] = None,
-        language: str = "french",
+        language: Optional[str] = None,
+        ids_only: bool = False,
+        user_id: Optional[str] = None,
+        course_id: Optional[int] = None,
     ) -> List[Document]:
         """
         Perform text-based search using PostgreSQL's full-text search.
 
+        Rows are filtered with content_tsv @@ tsquery (served by the GIN index)
+        before ranking, so only matching chunks are scored.
+
         Args:
             query: Search query
-            user_id: User ID for filtering
             top_k: Number of results to retrieve
             document_ids: Optional list of document IDs to filter by
-            language: Language for text search
+            language: Text search configuration (defaults to the store's)
+            ids_only: Fetch only chunk ids, leaving page_content empty
+            user_id: Restrict to the user's chunks
+            course_id: Restrict to the course's chunks (takes precedence)
 
         Returns:
             List of Document objects with results
         """
+        language = language or settings.vector_store.text_search_language
         session = None
         try:
             # Get a session and its engine
@@ -207,51 +1073,123 @@ class PGVectorStore(VectorStore):
             conn = session.connection()
             cur = conn.connection.cursor(cursor_factory=RealDictCursor)
 
-            # Prepare the SQL query for text search
-            sql = """
-                SELECT * FROM chunks_embeddings 
-                WHERE  
+            # Chunks are only tokenized with their own ts_config, so the query
+            # must use the same configuration to match stems
+            sql = f"""
+                SELECT {ID_COLUMNS if ids_only else RESULT_COLUMNS},
+                    ts_rank(c.content_tsv, query) AS ts_rank
+                FROM chunks_embeddings c,
+                    plainto_tsquery(%s::regconfig, %s) AS query
+                WHERE c.content_tsv @@ query
+                  AND c.ts_config = %s::regconfig
             """
-
-            params = []
+            params = [language, query, language]
 
             if document_ids:
-                sql += " document_id = ANY(%s) "
+                sql += " AND c.document_id = ANY(%s) "
                 params.append(document_ids)
 
-            sql += f"""
-                ORDER BY ts_rank(to_tsvector(%s, data->>'page_content'), 
-                               plainto_tsquery(%s, %s)) DESC
+            tenant, tenant_args = self._tenant_condition(user_id, course_id, "%s")
+            sql += f" AND {tenant} "
+            params.extend(tenant_args)
+
+            sql += """
+                ORDER BY ts_rank(c.content_tsv, query) DESC
                 LIMIT %s
             """
-            params.extend([language, language, query, top_k])
+            params.append(top_k)
 
             # Execute query
             cur.execute(sql, params)
             rows = cur.fetchall()
 
             # Convert rows to Document objects
-            results = []
-            for row in rows:
-                # Create a document with the data from the row
-                doc = Document(
-                    page_content=row["data"].get("page_content", ""),
-                    metadata={
-                        **row["data"].get("metadata", {}),
-                        "id": row["id"],
-                        "document_id": row["document_id"],
-                    },
-                )
-                results.append(doc)
+            return [self._row_to_document(row) for row in rows]
+
+        finally:
+            if session:
+                session.close()
 
-            return results
+    @staticmethod
+    def _row_to_document(row) -> Document:
+        """
+        Create a document from a row projected with RESULT_COLUMNS.
 
+        Rows projected with ID_COLUMNS give a placeholder document carrying
+        only its id, document_id and course_id, to be filled in by
+        _hydrate_documents. Scores the row carries (SCORE_FIELDS and
+        <leg>_rank columns) are copied into the metadata.
+        """
+        metadata = {
+            **(row.get("metadata") or {}),
+            "id": row["id"],
+            "document_id": row["document_id"],
+        }
+        if row.get("course_id") is not None:
+            metadata["course_id"] = row["course_id"]
+        for field in SCORE_FIELDS:
+            if row.get(field) is not None:
+                metadata[field] = float(row[field])
+        ranks = {
+            leg: int(row[f"{leg}_rank"])
+            for leg in SEARCH_LEGS
+            if row.get(f"{leg}_rank") is not None
+        }
+        if ranks:
+            metadata["ranks"] = ranks
+        return Document(page_content=row.get("page_content") or "", metadata=metadata)
+
+    @staticmethod
+    def _with_scores(document: Document, placeholder: Document) -> Document:
+        """Copy the retrieval scores of a placeholder onto its hydrated document."""
+        for key in (*SCORE_FIELDS, "ranks"):
+            if key in placeholder.metadata:
+                document.metadata[key] = placeholder.metadata[key]
+        return document
+
+    @staticmethod
+    def _course_ids(documents: List[Document]) -> List[int]:
+        return sorted({
+            doc.metadata.get("course_id", UNASSIGNED_COURSE_ID) for doc in documents
+        })
+
+    def _hydrate_documents(self, documents: List[Document]) -> List[Document]:
+        """
+        Load the content of placeholder documents returned by ids_only legs.
+
+        Order is preserved; chunks deleted since the legs ran are dropped.
+        """
+        if not documents:
+            return []
+        ids = [doc.metadata["id"] for doc in documents]
+        # The course_id filter lets a partitioned table prune partitions
+        course_ids = self._course_ids(documents)
+        session = None
+        try:
+            session = self._Session()
+            conn = session.connection()
+            cur = conn.connection.cursor(cursor_factory=RealDictCursor)
+            cur.execute(
+                f"SELECT {RESULT_COLUMNS} FROM chunks_embeddings c "
+                "WHERE c.course_id = ANY(%s) AND c.id = ANY(%s)",
+                [course_ids, ids],
+            )
+            rows = {row["id"]: row for row in cur.fetchall()}
+            return [
+                self._with_scores(self._row_to_document(rows[doc.metadata["id"]]), doc)
+                for doc in documents
+                if doc.metadata["id"] in rows
+            ]
         finally:
             if session:
                 session.close()
 
     def _fuse_results_rrf(
-        self, *ranked_lists: List[Document], k: int = 60, top_k: int = 100
+        self,
+        *ranked_lists: List[Document],
+        k: int = 60,
+        top_k: int = 100,
+        names: Optional[List[str]] = None,
     ) -> List[Document]:
         """
         Fuse multiple result lists using Reciprocal Rank Fusion.
@@ -260,26 +1198,39 @@ class PGVectorStore(VectorStore):
             ranked_lists: Multiple lists of Documents in rank order
             k: RRF constant (default=60)
             top_k: Number of results to return after fusion
+            names: Name of each list, used as keys of metadata["ranks"]
+                (default: list0, list1, ...)
 
         Returns:
-            List of fused Document objects
+            List of fused Document objects, each with its fused score in
+            metadata["score"], its rank in every list that returned it in
+            metadata["ranks"], and the distance / ts_rank its legs reported
         """
+        names = names or [f"list{i}" for i in range(len(ranked_lists))]
         # Create a mapping from document ID to document object
         doc_map = {}
 
         # Calculate RRF scores
         scores = defaultdict(float)
-        for lst in ranked_lists:
+        ranks = defaultdict(dict)
+        for name, lst in zip(names, ranked_lists):
             for rank, doc in enumerate(lst, start=1):
                 doc_id = doc.metadata.get("id")
                 if doc_id is None:
                     continue
 
-                # Store document for later retrieval
-                doc_map[doc_id] = doc
+                # Store document for later retrieval, keeping the scores
+                # reported by every leg
+                if doc_id in doc_map:
+                    for field in SCORE_FIELDS:
+                        if field in doc.metadata:
+                            doc_map[doc_id].metadata[field] = doc.metadata[field]
+                else:
+                    doc_map[doc_id] = doc
 
                 # Add RRF score
                 scores[doc_id] += 1 / (k + rank)
+                ranks[doc_id].setdefault(name, rank)
 
         # Sort by score and get top_k document IDs
         top_ids = [
@@ -287,155 +1238,780 @@ class PGVectorStore(VectorStore):
         ][:top_k]
 
         # Return documents in the new fused order
-        return [doc_map[doc_id] for doc_id in top_ids if doc_id in doc_map]
+        fused = []
+        for doc_id in top_ids:
+            doc = doc_map[doc_id]
+            doc.metadata["score"] = scores[doc_id]
+            doc.metadata["ranks"] = ranks[doc_id]
+            fused.append(doc)
+        return fused
 
     def _retrieve_with_dense_vector(
         self,
         query: str,
         top_k: int,
         document_ids: Optional[List[str]] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        ids_only: bool = False,
+        user_id: Optional[str] = None,
+        course_id: Optional[int] = None,
     ) -> List[Document]:
         """
         Perform pure vector similarity search.
 
+        With a tenant filter, the planner can use the course's partial ANN
+        index when one exists (see create_tenant_index); otherwise the
+        shared index is filtered, with vector_store.index.iterative_scan
+        keeping it scanning until enough of the tenant's rows are found.
+        Courses mirrored in process memory are searched without SQL.
+
         Args:
             query: Search query
-            user_id: User ID for filtering
             top_k: Number of results to retrieve
             document_ids: Optional list of document IDs to filter by (from BM25)
+            ef_search: HNSW ef_search override for this query
+            probes: IVFFlat probes override for this query
+            ids_only: Fetch only chunk ids, leaving page_content empty
+            user_id: Restrict to the user's chunks
+            course_id: Restrict to the course's chunks (takes precedence)
 
         Returns:
             List of Document objects with results
         """
+        # Generate query embedding before holding a connection
+        query_embedding = self._embed_query(query)
+
+        if document_ids is None:
+            mirrored = self._hot_search(query_embedding, top_k, ids_only, course_id)
+            if mirrored is not None:
+                return mirrored
+
         session = None
         try:
             # Get a session and its engine
             session = self._Session()
             conn = session.connection()
             cur = conn.connection.cursor(cursor_factory=RealDictCursor)
+            self._apply_search_params(cur, top_k, ef_search, probes)
 
-            # Generate query embedding
-            query_embedding = self.embeddings.embed_query(query)
-            query_embedding_array = np.array(query_embedding)
-            # Convert numpy array to list for psycopg2
-            query_embedding_list = query_embedding_array.tolist()
-            # Prepare the SQL query
-            sql = """
-                SELECT * FROM chunks_embeddings 
-            """
-
-            params = []
+            # Prepare the SQL query; the embedding is bound as an ndarray
+            # through the pgvector adapter
+            params = {"embedding": query_embedding, "top_k": top_k}
+            conditions = []
             if document_ids:
-                sql += "WHERE document_id = ANY(%s) "
-                params.append(document_ids)
-
-            sql += """
-                ORDER BY embedding <=> %s::vector
-                LIMIT %s
-            """
-            params.extend([query_embedding_list, top_k])
+                conditions.append("c.document_id = ANY(%(document_ids)s)")
+                params["document_ids"] = document_ids
+            tenant, tenant_args = self._tenant_condition(
+                user_id, course_id, "%(tenant)s")
+            conditions.append(tenant)
+            params["tenant"] = tenant_args[0]
+
+            sql = self._dense_sql(
+                select=f"{ID_COLUMNS if ids_only else RESULT_COLUMNS}, "
+                "c.embedding <=> %(embedding)s::vector AS distance",
+                where=f"WHERE {' AND '.join(conditions)}" if conditions else "",
+                vector="%(embedding)s",
+                limit="%(top_k)s",
+                top_k=top_k,
+            )
 
             # Execute query
             cur.execute(sql, params)
             rows = cur.fetchall()
 
             # Convert rows to Document objects
-            results = []
-            for row in rows:
-                # Create a document with the data from the row
-                doc = Document(
-                    page_content=row["data"].get("page_content", ""),
-                    metadata={
-                        **row["data"].get("metadata", {}),
-                        "id": row["id"],
-                        "document_id": row["document_id"],
-                    },
+            return [self._row_to_document(row) for row in rows]
+
+        finally:
+            if session:
+                session.close()
+
+    def _hot_search(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int,
+        ids_only: bool,
+        course_id: Optional[int],
+    ) -> Optional[List[Document]]:
+        """
+        Dense search of a course from its in-process mirror.
+
+        Returns None when the course is not mirrored (or its mirror went
+        stale), in which case the caller runs the SQL search. Misses count
+        towards loading the course's mirror in the background.
+        """
+        config = settings.vector_store.hot_cache
+        if not config.enabled or course_id is None:
+            return None
+        course_id = int(course_id)
+
+        mirror = self._hot_cache.get(course_id)
+        if mirror is not None and (
+            self._hot_cache.now() - mirror.checked_at >= config.revalidate_interval
+        ):
+            # Catches writes made by other processes
+            if self._bm25_fingerprint(None, course_id) != mirror.fingerprint:
+                logger.info(f"Mirror of course {course_id} is stale, reloading")
+                self._hot_cache.invalidate(course_id)
+                mirror = None
+            else:
+                mirror.checked_at = self._hot_cache.now()
+        if mirror is None:
+            version = self._hot_cache.claim_load(course_id)
+            if version is not None:
+                self._hot_loader.submit(self._load_hot_course, course_id, version)
+            return None
+
+        return [
+            self._row_to_document({
+                "id": mirror.ids[row],
+                "document_id": mirror.document_ids[row],
+                "course_id": course_id,
+                "page_content": None if ids_only else mirror.contents[row],
+                "metadata": None if ids_only else mirror.metadatas[row],
+                "distance": distance,
+            })
+            for row, distance in mirror.search(query_embedding, top_k)
+        ]
+
+    def _load_hot_course(self, course_id: int, version: int):
+        """Load a course's chunks into a CourseMirror and cache it."""
+        mirror = None
+        session = None
+        try:
+            # Taken first so writes made during the load make it stale
+            fingerprint = self._bm25_fingerprint(None, course_id)
+            session = self._Session()
+            rows = self._tenant_filter(
+                session.query(ChunkEmbedding.id), None, course_id
+            ).count()
+            if rows > settings.vector_store.hot_cache.max_rows:
+                logger.info(
+                    f"Course {course_id} has {rows} chunks, too many to mirror")
+                return
+            rows = self._tenant_filter(
+                session.query(
+                    ChunkEmbedding.id,
+                    ChunkEmbedding.document_id,
+                    ChunkEmbedding.data,
+                    ChunkEmbedding.embedding,
+                ),
+                None,
+                course_id,
+            ).all()
+            mirror = CourseMirror(
+                ids=[row.id for row in rows],
+                document_ids=[row.document_id for row in rows],
+                contents=[(row.data or {}).get("page_content") or "" for row in rows],
+                metadatas=[(row.data or {}).get("metadata") or {} for row in rows],
+                embeddings=(
+                    np.vstack([row.embedding for row in rows])
+                    if rows else np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+                ),
+                fingerprint=fingerprint,
+                checked_at=self._hot_cache.now(),
+            )
+            logger.info(
+                f"Mirrored {len(mirror)} chunks of course {course_id} "
+                f"({mirror.nbytes / 1e6:.1f} MB)"
+            )
+        except Exception as e:
+            logger.error(f"Failed to mirror course {course_id}: {e}")
+        finally:
+            if session:
+                session.close()
+            self._hot_cache.put(course_id, mirror, version)
+
+    def _exact_dense_ids(self, query: str, top_k: int) -> List[str]:
+        """Ids of the top_k chunks by exact cosine distance, bypassing ANN indexes."""
+        query_embedding = self._embed_query(query)
+        session = None
+        try:
+            session = self._Session()
+            cur = session.connection().connection.cursor()
+            # Without index scans the planner falls back to an exact sort
+            cur.execute("SET LOCAL enable_indexscan = off")
+            cur.execute(
+                "SELECT id FROM chunks_embeddings "
+                "ORDER BY embedding <=> %s::vector LIMIT %s",
+                [query_embedding, top_k],
+            )
+            return [row[0] for row in cur.fetchall()]
+        finally:
+            if session:
+                session.close()
+
+    def measure_recall(
+        self,
+        queries: List[str],
+        top_k: int = 10,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> float:
+        """
+        Mean recall@top_k of the dense leg against an exact scan.
+
+        Run on a sample of real queries after changing the index type,
+        quantization or search parameters, to check recall stays within
+        tolerance.
+        """
+        recalls = []
+        for query in queries:
+            exact = set(self._exact_dense_ids(query, top_k))
+            if not exact:
+                continue
+            approx = {
+                doc.metadata["id"]
+                for doc in self._retrieve_with_dense_vector(
+                    query, top_k, ef_search=ef_search, probes=probes, ids_only=True
                 )
-                results.append(doc)
+            }
+            recalls.append(len(approx & exact) / len(exact))
 
-            return results
+        recall = float(np.mean(recalls)) if recalls else 1.0
+        logger.info(
+            f"Dense recall@{top_k} over {len(recalls)} queries: {recall:.3f} "
+            f"({self.index_config.type}, quantization={self.index_config.quantization})"
+        )
+        return recall
+
+    def benchmark_dense(
+        self,
+        queries: List[str],
+        top_k: int = 10,
+        quantizations: Optional[List[str]] = None,
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        Compare dense search latency and recall across quantization modes.
+
+        Each mode runs the same queries (embeddings are cached, so only the
+        database round trip is timed); 'none' is the plain <=> scan. Modes
+        whose index has not been built are skipped, since they would fall
+        back to a sequential scan.
+
+        Returns:
+            Per mode: mean and p95 latency in milliseconds and recall@top_k
+        """
+        if self.index_config.type == "none":
+            raise ValueError("benchmark_dense needs an ANN index type")
+        results = {}
+        for quantization in quantizations or list(QUANTIZATIONS):
+            config = self.index_config.model_copy(update={"quantization": quantization})
+            with self._autocommit_cursor() as cur:
+                valid = self._index_is_valid(cur, self._vector_index_name(config))
+            if not valid:
+                logger.warning(
+                    f"Skipping {quantization}: index {self._vector_index_name(config)} not built")
+                continue
+
+            # Shallow copy sharing connections and caches, with its own index config
+            store = copy.copy(self)
+            store.index_config = config
+            timings = []
+            for query in queries:
+                store._embed_query(query)
+                start = time.perf_counter()
+                store._retrieve_with_dense_vector(query, top_k, ids_only=True)
+                timings.append((time.perf_counter() - start) * 1000)
+
+            results[quantization] = {
+                "mean_ms": float(np.mean(timings)) if timings else 0.0,
+                "p95_ms": float(np.percentile(timings, 95)) if timings else 0.0,
+                "recall": store.measure_recall(queries, top_k),
+            }
+            logger.info(f"Dense benchmark {quantization}: {results[quantization]}")
+        return results
+
+    @staticmethod
+    def _check_tenant(user_id: Optional[str], course_id: Optional[int]):
+        """
+        Fail closed: a search or index scoped to nobody must not fall back to
+        every tenant's chunks.
+        """
+        if course_id is None and not user_id:
+            raise ValueError("A user_id or a course_id is required to scope chunks")
+
+    @classmethod
+    def _tenant_key(cls, user_id: Optional[str], course_id: Optional[int] = None) -> str:
+        """Key of the chunks searched for a tenant: a course if given, else a user."""
+        cls._check_tenant(user_id, course_id)
+        if course_id is not None:
+            return f"course:{int(course_id)}"
+        return f"user:{user_id}"
+
+    @classmethod
+    def _tenant_filter(cls, query, user_id: Optional[str], course_id: Optional[int] = None):
+        """Restrict an ORM query on ChunkEmbedding to a tenant's chunks."""
+        cls._check_tenant(user_id, course_id)
+        if course_id is not None:
+            return query.filter(ChunkEmbedding.course_id == int(course_id))
+        return query.filter(ChunkEmbedding.user_id == str(user_id))
+
+    @classmethod
+    def _tenant_condition(
+        cls, user_id: Optional[str], course_id: Optional[int], placeholder: str
+    ) -> Tuple[str, list]:
+        """
+        SQL condition restricting chunks (aliased c) to a tenant, and the
+        argument bound to placeholder.
+
+        Raises:
+            ValueError: if neither user_id nor course_id is given
+        """
+        cls._check_tenant(user_id, course_id)
+        if course_id is not None:
+            return f"c.course_id = {placeholder}", [int(course_id)]
+        return f"c.user_id = {placeholder}::uuid", [str(user_id)]
+
+    def _bm25_fingerprint(self, user_id: str, course_id: Optional[int] = None) -> str:
+        """
+        Cheap summary of a tenant's chunks, used to tell whether a persisted
+        BM25 index is still current. Any insert bumps max(updated_at) and any
+        delete changes the count.
+        """
+        session = None
+        try:
+            session = self._Session()
+            count, last_update = self._tenant_filter(
+                session.query(
+                    func.count(ChunkEmbedding.id), func.max(
+                        ChunkEmbedding.updated_at)
+                ),
+                user_id,
+                course_id,
+            ).one()
+            return f"{count}:{last_update.isoformat() if last_update else ''}"
+        finally:
+            if session:
+                session.close()
+
+    def _bm25_index_path(self, tenant_key: str) -> Optional[str]:
+        index_dir = settings.vector_store.bm25.index_dir
+        if not index_dir:
+            return None
+        key = hashlib.sha1(tenant_key.encode("utf-8")).hexdigest()
+        return os.path.join(index_dir, f"{key}.bm25")
 
+    def _fetch_bm25_rows(self, user_id: str, course_id: Optional[int] = None):
+        """Fetch only (id, document_id, page_content) of a tenant's chunks."""
+        session = None
+        try:
+            session = self._Session()
+            return self._tenant_filter(
+                session.query(
+                    ChunkEmbedding.id,
+                    ChunkEmbedding.document_id,
+                    ChunkEmbedding.data["page_content"].astext,
+                ),
+                user_id,
+                course_id,
+            ).all()
         finally:
             if session:
                 session.close()
 
-    def _get_bm25_retriever(self, user_id: str, k: int = 10) -> BM25Retriever:
+    def _build_bm25_index(
+        self, user_id: str, course_id: Optional[int] = None
+    ) -> BM25Index:
+        """
+        Load the tenant's BM25 index from disk if it is current, otherwise
+        build it from the database and persist it for other workers.
+
+        A tenant without chunks gets an empty index, so it is cached like
+        any other instead of hitting the database on every query.
         """
-        Get or create BM25 retriever for a user.
-        Caches the retriever and documents to avoid rebuilding for each query.
+        config = settings.vector_store.bm25
+        tenant_key = self._tenant_key(user_id, course_id)
+        path = self._bm25_index_path(tenant_key)
+        fingerprint = self._bm25_fingerprint(user_id, course_id) if path else None
+
+        if path and os.path.exists(path):
+            try:
+                index, metadata = BM25Index.load(path, k1=config.k1, b=config.b)
+                if metadata.get("fingerprint") == fingerprint:
+                    logger.debug(
+                        f"Loaded BM25 index for {tenant_key} from {path}")
+                    return index
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable BM25 index {path}: {e}")
+
+        rows = self._fetch_bm25_rows(user_id, course_id)
+        logger.debug(
+            f"Initialized BM25 for {tenant_key} with {len(rows)} documents")
+        chunk_ids, document_ids, texts = zip(*rows) if rows else ((), (), ())
+        index = BM25Index.from_texts(
+            chunk_ids, document_ids, texts, k1=config.k1, b=config.b
+        )
+        if path:
+            try:
+                index.save(
+                    path, {"fingerprint": fingerprint, "tenant": tenant_key})
+            except OSError as e:
+                logger.warning(f"Failed to persist BM25 index {path}: {e}")
+        return index
+
+    def _bm25_add(
+        self,
+        user_id: str,
+        chunk_ids: List[str],
+        document_ids: List[str],
+        texts: List[str],
+        course_id: int = UNASSIGNED_COURSE_ID,
+    ):
+        """
+        Append freshly committed chunks to the cached BM25 indexes of their
+        owner and of their course, and drop the course's in-process mirror.
+        """
+        self._hot_cache.invalidate(course_id)
+        for key in self._written_tenant_keys(user_id, [course_id]):
+            self._bm25_cache.update(
+                key,
+                lambda index: self._bm25_after_write(
+                    index, index.add, chunk_ids, document_ids, texts),
+            )
+
+    def _bm25_delete(
+        self, user_id: str, document_ids: List[str], course_ids: Iterable[int] = ()
+    ):
+        """
+        Tombstone the chunks of deleted documents in the cached BM25 indexes
+        of their owner and of the courses they belonged to, and drop those
+        courses' in-process mirrors.
+        """
+        course_ids = set(course_ids)
+        for course_id in course_ids:
+            self._hot_cache.invalidate(course_id)
+        for key in self._written_tenant_keys(user_id, course_ids):
+            self._bm25_cache.update(
+                key,
+                lambda index: self._bm25_after_write(
+                    index, index.delete, document_ids=document_ids),
+            )
+
+    def _written_tenant_keys(self, user_id: str, course_ids: Iterable[int]) -> List[str]:
+        keys = [self._tenant_key(user_id)]
+        keys.extend(
+            self._tenant_key(None, course_id)
+            for course_id in set(course_ids)
+            if course_id != UNASSIGNED_COURSE_ID
+        )
+        return keys
+
+    def _bm25_after_write(self, index: Optional[BM25Index], write, *args, **kwargs):
+        if index is None:
+            return
+        write(*args, **kwargs)
+        config = settings.vector_store.bm25
+        if index.needs_compaction(config.max_segments, config.max_deleted_ratio):
+            self._bm25_compactor.submit(self._compact_bm25, index)
+
+    @staticmethod
+    def _compact_bm25(index: BM25Index):
+        try:
+            index.compact()
+        except Exception as e:
+            logger.error(f"BM25 compaction failed: {e}")
+
+    def _retrieve_sparse(
+        self,
+        query: str,
+        user_id: str,
+        top_k: int,
+        language: Optional[str] = None,
+        ids_only: bool = False,
+        course_id: Optional[int] = None,
+    ) -> List[Document]:
+        """
+        BM25 first pass over the tenant's chunks (the course's if given,
+        else the user's), ranked by full-text search.
+        """
+        # Get document IDs from BM25
+        bm25_doc_ids = self._retrieve_with_bm25(query, user_id, top_k, course_id)
+        # No BM25 hits means nothing of this tenant's can match
+        if not bm25_doc_ids:
+            return []
+        # Get actual documents from database with text search ranking
+        return self._retrieve_with_text_search(
+            query=query,
+            top_k=top_k,
+            document_ids=bm25_doc_ids,
+            language=language,
+            ids_only=ids_only,
+            user_id=user_id,
+            course_id=course_id,
+        )
+
+    def _run_legs_concurrently(
+        self,
+        legs: Dict[str, Callable[[], List[Document]]],
+        timeout: Optional[float] = None,
+    ) -> Dict[str, List[Document]]:
+        """
+        Run independent retrieval legs on the search thread pool.
+
+        Waits up to timeout seconds for all legs. Legs still running after
+        that are abandoned (their result is treated as empty) as long as at
+        least one leg finished; if none did, the first to finish is used. A
+        leg that raises counts as empty as long as another leg succeeded;
+        when none did (every leg failed or timed out), the first error is
+        raised rather than returning an empty result.
+        """
+        futures = {name: self._search_executor.submit(leg)
+                   for name, leg in legs.items()}
+        done, _ = wait(futures.values(), timeout=timeout)
+        if not done:
+            done, _ = wait(futures.values(), return_when=FIRST_COMPLETED)
+
+        results, errors, timed_out = {}, [], []
+        for name, future in futures.items():
+            if future not in done:
+                future.cancel()
+                timed_out.append(name)
+                results[name] = []
+                continue
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error(f"{name} retrieval leg failed: {e}")
+                errors.append(e)
+                results[name] = []
+
+        # Degrade to the legs that succeeded; with none left, timed out legs
+        # included, fail instead of returning an empty result
+        if errors and len(errors) + len(timed_out) == len(futures):
+            raise errors[0]
+        for name in timed_out:
+            logger.warning(
+                f"{name} retrieval leg exceeded {timeout}s, fusing without it")
+        return results
+
+    def _hybrid_search_sql(
+        self,
+        query: str,
+        user_id: str,
+        top_k: int,
+        sparse_k: int,
+        dense_k: int,
+        language: Optional[str] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        course_id: Optional[int] = None,
+    ) -> List[Document]:
         """
-        if self._bm25_retriever is None or self._bm25_docs is None:
-            # Get all documents for this user
-            self._bm25_docs = self.get_all_documents(user_id=user_id)
-            logger.debug(
-                f"Initialized BM25 with {len(self._bm25_docs)} documents")
+        Hybrid search in a single round trip.
 
-            # Initialize BM25 retriever
-            self._bm25_retriever = BM25Retriever.from_documents(
-                self._bm25_docs,
-                k=k,
-                bm25_params={
-                    "k1": 1.2,
-                    "b": 0.75,
-                },
+        The full-text and dense legs run as CTEs, reciprocal rank fusion is
+        computed server-side and only the fused top_k rows are returned.
+        The full-text leg plays the role of the BM25 first pass. Both legs
+        are restricted to the tenant (the course if given, else the user).
+        """
+        language = language or settings.vector_store.text_search_language
+        query_embedding = self._embed_query(query)
+        session = None
+        try:
+            session = self._Session()
+            conn = session.connection()
+            cur = conn.connection.cursor(cursor_factory=RealDictCursor)
+            self._apply_search_params(cur, dense_k, ef_search, probes)
+
+            params = {
+                "embedding": query_embedding,
+                "query": query,
+                "language": language,
+                "dense_k": dense_k,
+                "sparse_k": sparse_k,
+                "rrf_k": settings.vector_store.rrf_k,
+                "top_k": top_k,
+            }
+
+            tenant, tenant_args = self._tenant_condition(
+                user_id, course_id, "%(tenant)s")
+            params["tenant"] = tenant_args[0]
+
+            dense_cte = self._dense_sql(
+                select="c.id, row_number() OVER "
+                "(ORDER BY c.embedding <=> %(embedding)s::vector) AS rank",
+                where=f"WHERE {tenant}",
+                vector="%(embedding)s",
+                limit="%(dense_k)s",
+                top_k=dense_k,
             )
+            if sparse_k:
+                sparse_cte = f"""
+                    SELECT c.id,
+                        row_number() OVER (ORDER BY ts_rank(c.content_tsv, q) DESC) AS rank
+                    FROM chunks_embeddings c,
+                        plainto_tsquery(%(language)s::regconfig, %(query)s) AS q
+                    WHERE c.content_tsv @@ q
+                      AND c.ts_config = %(language)s::regconfig
+                      AND {tenant}
+                    ORDER BY ts_rank(c.content_tsv, q) DESC
+                    LIMIT %(sparse_k)s
+                """
+            else:
+                sparse_cte = "SELECT NULL::text AS id, NULL::bigint AS rank WHERE false"
+
+            # Repeating the tenant filter lets a partitioned table prune the join
+            sql = f"""
+                WITH dense AS ({dense_cte}),
+                sparse AS ({sparse_cte}),
+                fused AS (
+                    SELECT id, sum(1.0 / (%(rrf_k)s + rank)) AS score,
+                        min(rank) FILTER (WHERE leg = 'dense') AS dense_rank,
+                        min(rank) FILTER (WHERE leg = 'sparse') AS sparse_rank
+                    FROM (
+                        SELECT id, rank, 'dense' AS leg FROM dense
+                        UNION ALL
+                        SELECT id, rank, 'sparse' AS leg FROM sparse
+                    ) legs
+                    GROUP BY id
+                    ORDER BY score DESC
+                    LIMIT %(top_k)s
+                )
+                SELECT {RESULT_COLUMNS}, fused.score, fused.dense_rank, fused.sparse_rank
+                FROM fused JOIN chunks_embeddings c ON c.id = fused.id AND {tenant}
+                ORDER BY fused.score DESC
+            """
+            cur.execute(sql, params)
+            rows = cur.fetchall()
 
-        return self._bm25_retriever
+            return [self._row_to_document(row) for row in rows]
+
+        finally:
+            if session:
+                session.close()
+
+    def _get_bm25_index(
+        self, user_id: str, course_id: Optional[int] = None
+    ) -> BM25Index:
+        """
+        Get or create the BM25 index of a user, or of a course if given.
+        Indexes are cached per tenant (LRU bounded), kept fresh
+        incrementally as that tenant's chunks are added or deleted, and
+        revalidated against the database for writes by other processes.
+
+        Returns:
+            The tenant's BM25 index, empty if the tenant has no chunks
+        """
+        return self._bm25_cache.get_or_build(
+            self._tenant_key(user_id, course_id),
+            lambda: self._build_bm25_index(user_id, course_id),
+            fingerprint=lambda: self._bm25_fingerprint(user_id, course_id),
+        )
 
     def similarity_search(
         self,
         query: str,
-        user_id: str = "1",
+        user_id: Optional[str],
         top_k: int = 200,
         bm25_k: int = 100,
         dense_k: int = 100,
         use_bm25_first_pass: bool = True,
-        language: str = "french",
+        language: Optional[str] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        mode: Optional[str] = None,
+        lazy_hydration: Optional[bool] = None,
+        course_id: Optional[int] = None,
     ) -> List[Document]:
         """
-        Search for documents similar to a query, filtered by user_id.
+        Search for documents similar to a query, filtered by user_id, or by
+        course_id when given (DefaultRetriever only passes a course the user
+        is enrolled in).
         Uses a fusion of BM25 and dense retrieval results.
 
         Args:
             query: The search query
-            user_id: The user ID to filter results by
+            user_id: The user whose chunks are searched; may be None when
+                course_id is given
             top_k: The number of top results to return after fusion (default: 200)
             bm25_k: Number of results to retrieve from BM25 (default: 100)
             dense_k: Number of results to retrieve from dense vectors (default: 100)
             use_bm25_first_pass: Whether to use BM25 retrieval
-            language: The language to use for text search (default: 'french')
+            language: Text search configuration (default: vector_store.text_search_language)
+            ef_search: HNSW ef_search override for the dense leg
+            probes: IVFFlat probes override for the dense leg
+            mode: HybridSearchMode value (default: vector_store.search_mode)
+            lazy_hydration: Have the legs fetch only chunk ids and load the
+                content of the fused top_k afterwards (default:
+                vector_store.lazy_hydration). The SQL mode always does this.
+            course_id: Search the course's chunks instead of the user's
 
         Returns:
-            A list of documents similar to the query
+            A list of documents similar to the query, with their fused score,
+            per-leg ranks, distance and ts_rank in metadata
+
+        Raises:
+            ValueError: if neither user_id nor course_id is given; there is
+                no unscoped search
         """
-        # Step 1: Sparse BM25 retrieval
-        sparse_results = []
-        if use_bm25_first_pass:
-            # Get document IDs from BM25
-            bm25_doc_ids = self._retrieve_with_bm25(query, user_id, bm25_k)
-            # Get actual documents from database with text search ranking
-            sparse_results = self._retrieve_with_text_search(
+        self._check_tenant(user_id, course_id)
+        mode = HybridSearchMode(mode or settings.vector_store.search_mode)
+        if mode == HybridSearchMode.SQL:
+            return self._hybrid_search_sql(
                 query=query,
-                top_k=bm25_k,
-                document_ids=bm25_doc_ids,
+                user_id=user_id,
+                top_k=top_k,
+                sparse_k=bm25_k if use_bm25_first_pass else 0,
+                dense_k=dense_k,
                 language=language,
+                ef_search=ef_search,
+                probes=probes,
+                course_id=course_id,
             )
 
-        # Step 2: Dense vector retrieval
-        dense_results = self._retrieve_with_dense_vector(
-            query=query,
-            top_k=dense_k,
-            document_ids=None,  # Don't filter by BM25 results for pure dense retrieval
-        )
+        if lazy_hydration is None:
+            lazy_hydration = settings.vector_store.lazy_hydration
+
+        def sparse_leg() -> List[Document]:
+            return self._retrieve_sparse(
+                query, user_id, bm25_k, language,
+                ids_only=lazy_hydration, course_id=course_id)
+
+        def dense_leg() -> List[Document]:
+            return self._retrieve_with_dense_vector(
+                query=query,
+                top_k=dense_k,
+                document_ids=None,  # Don't filter by BM25 results for pure dense retrieval
+                ef_search=ef_search,
+                probes=probes,
+                ids_only=lazy_hydration,
+                user_id=user_id,
+                course_id=course_id,
+            )
+
+        legs = {"dense": dense_leg}
+        if use_bm25_first_pass:
+            legs["sparse"] = sparse_leg
 
-        # Step 3: Fuse results using RRF
-        if use_bm25_first_pass and sparse_results:
-            fused_results = self._fuse_results_rrf(
-                sparse_results, dense_results, k=60, top_k=top_k
+        if mode == HybridSearchMode.CONCURRENT:
+            # Steps 1 and 2 are independent: run them side by side
+            results = self._run_legs_concurrently(
+                legs, timeout=settings.vector_store.leg_timeout
             )
         else:
-            # If no BM25, just use dense results
-            fused_results = dense_results[:top_k]
+            # Step 1: Sparse BM25 retrieval, Step 2: Dense vector retrieval
+            results = {name: leg() for name, leg in legs.items()}
+        sparse_results = results.get("sparse", [])
+        dense_results = results["dense"]
+
+        # Step 3: Fuse results using RRF; a single leg keeps its order
+        legs_results = {
+            name: docs
+            for name, docs in (("sparse", sparse_results), ("dense", dense_results))
+            if docs
+        }
+        fused_results = self._fuse_results_rrf(
+            *legs_results.values(),
+            k=settings.vector_store.rrf_k,
+            top_k=top_k,
+            names=list(legs_results),
+        )
+
+        # Step 4: Load content for the chunks that survived fusion
+        if lazy_hydration:
+            fused_results = self._hydrate_documents(fused_results)
 
         # Return fused results
         return fused_results
@@ -455,36 +2031,28 @@ class PGVectorStore(VectorStore):
             embedding: Optional embedding function (will use self.embeddings if not provided)
             metadatas: Optional list of metadatas associated with the texts
             ids: Optional list of IDs to associate with the texts
-            **kwargs: Additional arguments (must include document_id)
+            **kwargs: Additional arguments (must include document_id,
+                may include language and course_id)
 
         Returns:
             List of IDs of the added texts
         """
         session = None
         try:
-            session = self._Session()
-
             # Get document_id from kwargs
             document_id = kwargs.get("document_id")
             if not document_id:
                 raise ValueError("document_id is required in kwargs")
 
-            # Check if document exists
-            existing_doc = (
-                session.query(SQLDocument).filter(
-                    SQLDocument.id == document_id).first()
+            user_id = self._document_owner(document_id)
+            language = (
+                kwargs.get("language") or settings.vector_store.text_search_language
             )
-            if not existing_doc:
-                raise ValueError(f"Parent document {document_id} not found")
+            course_id = int(kwargs.get("course_id") or UNASSIGNED_COURSE_ID)
 
-            # Get user_id from the document
-            user_id = existing_doc.user_id
-
-            # Use provided embeddings or default to self.embeddings
-            embeddings_func = embedding or self.embeddings
-
-            # Generate embeddings
-            embeddings = embeddings_func.embed_documents(texts)
+            # Generate embeddings, with provided embeddings or self.embeddings
+            embeddings, lookup = self._embed_documents(texts, embedding)
+            self._log_cache_lookup(document_id, lookup)
 
             # Handle metadata
             if not metadatas:
@@ -494,24 +2062,26 @@ class PGVectorStore(VectorStore):
             if not ids:
                 ids = [str(uuid.uuid4()) for _ in texts]
 
-            # Create chunk objects
-            chunk_objects = []
-            for text, metadata, embedding_vector, chunk_id in zip(
-                texts, metadatas, embeddings, ids
-            ):
-                chunk = ChunkEmbedding(
-                    id=chunk_id,
-                    document_id=document_id,
-                    user_id=user_id,
-                    data={"page_content": text, "metadata": metadata},
-                    embedding=embedding_vector,
+            rows = [
+                (
+                    chunk_id,
+                    document_id,
+                    user_id,
+                    course_id,
+                    {"page_content": text, "metadata": metadata},
+                    embedding_vector,
                 )
-                chunk_objects.append(chunk)
-
-            # Add all chunks to session
-            session.add_all(chunk_objects)
+                for text, metadata, embedding_vector, chunk_id in zip(
+                    texts, metadatas, embeddings, ids
+                )
+            ]
+            session = self._Session()
+            self._write_chunks(session, rows, language)
             session.commit()
 
+            self._bm25_add(
+                user_id, ids, [document_id] * len(ids), texts, course_id=course_id)
+
             logger.info(
                 f"Successfully added {len(texts)} texts for document {document_id}"
             )
@@ -529,6 +2099,7 @@ class PGVectorStore(VectorStore):
     def delete_documents(self, doc_id: str) -> bool:
         session = None
         try:
+            session = self._Session()
             user_id = supabase.auth.get_user().user.id
             doc = (
                 session.query(SQLDocument)
@@ -539,11 +2110,18 @@ class PGVectorStore(VectorStore):
                 raise ValueError(
                     f"User {user_id} does not have access to document {doc_id}"
                 )
+            course_ids = [
+                course_id
+                for (course_id,) in session.query(ChunkEmbedding.course_id)
+                .filter(ChunkEmbedding.document_id == doc_id)
+                .distinct()
+            ]
             query = session.query(ChunkEmbedding).filter(
                 ChunkEmbedding.document_id == doc_id
             )
             deleted_count = query.delete(synchronize_session=False)
             session.commit()
+            self._bm25_delete(user_id, [doc_id], course_ids)
 
             logger.info(f"Successfully deleted {deleted_count} chunks")
             return True
@@ -555,3 +2133,432 @@ class PGVectorStore(VectorStore):
         finally:
             if session:
                 session.close()
+
+    # ------------------------------------------------------------------
+    # Async API
+    #
+    # Native asyncio counterparts of the methods above, running on the
+    # shared asyncpg pool so retrieval does not block the event loop of the
+    # streaming chat route. CPU-bound work (BM25, local embedding models)
+    # is pushed to threads. Vectors travel in pgvector's binary format.
+    # ------------------------------------------------------------------
+
+    async def _afetch(
+        self, sql: str, *args, search_params: Optional[List[str]] = None
+    ) -> list:
+        pool = await self.db.get_async_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                for statement in search_params or []:
+                    await conn.execute(statement)
+                return await conn.fetch(sql, *args)
+
+    async def _aretrieve_with_text_search(
+        self,
+        query: str,
+        top_k: int,
+        document_ids: Optional[List[str]] = None,
+        language: Optional[str] = None,
+        ids_only: bool = False,
+        user_id: Optional[str] = None,
+        course_id: Optional[int] = None,
+    ) -> List[Document]:
+        """Async version of _retrieve_with_text_search."""
+        language = language or settings.vector_store.text_search_language
+        sql = f"""
+            SELECT {ID_COLUMNS if ids_only else RESULT_COLUMNS},
+                ts_rank(c.content_tsv, query) AS ts_rank
+            FROM chunks_embeddings c,
+                plainto_tsquery($1::regconfig, $2) AS query
+            WHERE c.content_tsv @@ query
+              AND c.ts_config = $1::regconfig
+        """
+        args = [language, query]
+        if document_ids:
+            sql += f" AND c.document_id = ANY(${len(args) + 1}::text[]) "
+            args.append(document_ids)
+        tenant, tenant_args = self._tenant_condition(
+            user_id, course_id, f"${len(args) + 1}")
+        sql += f" AND {tenant} "
+        args.extend(tenant_args)
+        sql += f"""
+            ORDER BY ts_rank(c.content_tsv, query) DESC
+            LIMIT ${len(args) + 1}
+        """
+        args.append(top_k)
+        rows = await self._afetch(sql, *args)
+        return [self._row_to_document(row) for row in rows]
+
+    async def _aretrieve_with_dense_vector(
+        self,
+        query: str,
+        top_k: int,
+        document_ids: Optional[List[str]] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        ids_only: bool = False,
+        user_id: Optional[str] = None,
+        course_id: Optional[int] = None,
+    ) -> List[Document]:
+        """Async version of _retrieve_with_dense_vector."""
+        query_embedding = await self._aembed_query(query)
+        if document_ids is None:
+            mirrored = await asyncio.to_thread(
+                self._hot_search, query_embedding, top_k, ids_only, course_id)
+            if mirrored is not None:
+                return mirrored
+        args = [query_embedding]
+        conditions = []
+        if document_ids:
+            conditions.append(f"c.document_id = ANY(${len(args) + 1}::text[])")
+            args.append(document_ids)
+        tenant, tenant_args = self._tenant_condition(
+            user_id, course_id, f"${len(args) + 1}")
+        conditions.append(tenant)
+        args.extend(tenant_args)
+        sql = self._dense_sql(
+            select=f"{ID_COLUMNS if ids_only else RESULT_COLUMNS}, "
+            "c.embedding <=> $1::vector AS distance",
+            where=f"WHERE {' AND '.join(conditions)}" if conditions else "",
+            vector="$1",
+            limit=f"${len(args) + 1}",
+            top_k=top_k,
+        )
+        args.append(top_k)
+        rows = await self._afetch(
+            sql,
+            *args,
+            search_params=self._search_param_statements(
+                top_k, ef_search, probes),
+        )
+        return [self._row_to_document(row) for row in rows]
+
+    async def _aretrieve_sparse(
+        self,
+        query: str,
+        user_id: str,
+        top_k: int,
+        language: Optional[str] = None,
+        ids_only: bool = False,
+        course_id: Optional[int] = None,
+    ) -> List[Document]:
+        """Async version of _retrieve_sparse."""
+        bm25_doc_ids = await asyncio.to_thread(
+            self._retrieve_with_bm25, query, user_id, top_k, course_id
+        )
+        if not bm25_doc_ids:
+            return []
+        return await self._aretrieve_with_text_search(
+            query=query,
+            top_k=top_k,
+            document_ids=bm25_doc_ids,
+            language=language,
+            ids_only=ids_only,
+            user_id=user_id,
+            course_id=course_id,
+        )
+
+    async def _ahybrid_search_sql(
+        self,
+        query: str,
+        user_id: str,
+        top_k: int,
+        sparse_k: int,
+        dense_k: int,
+        language: Optional[str] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        course_id: Optional[int] = None,
+    ) -> List[Document]:
+        """Async version of _hybrid_search_sql."""
+        language = language or settings.vector_store.text_search_language
+        query_embedding = await self._aembed_query(query)
+
+        args = [query_embedding, dense_k]
+        tenant, tenant_args = self._tenant_condition(user_id, course_id, "$3")
+        args.extend(tenant_args)
+        dense_cte = self._dense_sql(
+            select="c.id, row_number() OVER (ORDER BY c.embedding <=> $1::vector) AS rank",
+            where=f"WHERE {tenant}",
+            vector="$1",
+            limit="$2",
+            top_k=dense_k,
+        )
+        if sparse_k:
+            n = len(args)
+            sparse_cte = f"""
+                SELECT c.id,
+                    row_number() OVER (ORDER BY ts_rank(c.content_tsv, q) DESC) AS rank
+                FROM chunks_embeddings c,
+                    plainto_tsquery(${n + 1}::regconfig, ${n + 2}) AS q
+                WHERE c.content_tsv @@ q
+                  AND c.ts_config = ${n + 1}::regconfig
+                  AND {tenant}
+                ORDER BY ts_rank(c.content_tsv, q) DESC
+                LIMIT ${n + 3}
+            """
+            args.extend([language, query, sparse_k])
+        else:
+            sparse_cte = "SELECT NULL::text AS id, NULL::bigint AS rank WHERE false"
+
+        rrf_arg = len(args) + 1
+        # Repeating the tenant filter lets a partitioned table prune the join
+        args.extend([settings.vector_store.rrf_k, top_k])
+        sql = f"""
+            WITH dense AS ({dense_cte}),
+            sparse AS ({sparse_cte}),
+            fused AS (
+                SELECT id, sum(1.0 / (${rrf_arg}::int + rank)) AS score,
+                    min(rank) FILTER (WHERE leg = 'dense') AS dense_rank,
+                    min(rank) FILTER (WHERE leg = 'sparse') AS sparse_rank
+                FROM (
+                    SELECT id, rank, 'dense' AS leg FROM dense
+                    UNION ALL
+                    SELECT id, rank, 'sparse' AS leg FROM sparse
+                ) legs
+                GROUP BY id
+                ORDER BY score DESC
+                LIMIT ${rrf_arg + 1}
+            )
+            SELECT {RESULT_COLUMNS}, fused.score, fused.dense_rank, fused.sparse_rank
+            FROM fused JOIN chunks_embeddings c ON c.id = fused.id AND {tenant}
+            ORDER BY fused.score DESC
+        """
+        rows = await self._afetch(
+            sql,
+            *args,
+            search_params=self._search_param_statements(
+                dense_k, ef_search, probes),
+        )
+        return [self._row_to_document(row) for row in rows]
+
+    async def asimilarity_search(
+        self,
+        query: str,
+        user_id: Optional[str],
+        top_k: int = 200,
+        bm25_k: int = 100,
+        dense_k: int = 100,
+        use_bm25_first_pass: bool = True,
+        language: Optional[str] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        mode: Optional[str] = None,
+        lazy_hydration: Optional[bool] = None,
+        course_id: Optional[int] = None,
+    ) -> List[Document]:
+        """
+        Async version of similarity_search.
+
+        In 'sequential' mode the legs are awaited one after the other; in
+        'concurrent' mode they run as asyncio tasks bounded by
+        vector_store.leg_timeout, like the thread pool of the sync API.
+        """
+        self._check_tenant(user_id, course_id)
+        mode = HybridSearchMode(mode or settings.vector_store.search_mode)
+        if mode == HybridSearchMode.SQL:
+            return await self._ahybrid_search_sql(
+                query=query,
+                user_id=user_id,
+                top_k=top_k,
+                sparse_k=bm25_k if use_bm25_first_pass else 0,
+                dense_k=dense_k,
+                language=language,
+                ef_search=ef_search,
+                probes=probes,
+                course_id=course_id,
+            )
+
+        if lazy_hydration is None:
+            lazy_hydration = settings.vector_store.lazy_hydration
+
+        legs = {
+            "dense": lambda: self._aretrieve_with_dense_vector(
+                query=query,
+                top_k=dense_k,
+                ef_search=ef_search,
+                probes=probes,
+                ids_only=lazy_hydration,
+                user_id=user_id,
+                course_id=course_id,
+            )
+        }
+        if use_bm25_first_pass:
+            legs["sparse"] = lambda: self._aretrieve_sparse(
+                query, user_id, bm25_k, language,
+                ids_only=lazy_hydration, course_id=course_id)
+
+        if mode == HybridSearchMode.CONCURRENT:
+            results = await self._arun_legs_concurrently(
+                legs, timeout=settings.vector_store.leg_timeout
+            )
+        else:
+            results = {name: await leg() for name, leg in legs.items()}
+        sparse_results = results.get("sparse", [])
+        dense_results = results["dense"]
+
+        legs_results = {
+            name: docs
+            for name, docs in (("sparse", sparse_results), ("dense", dense_results))
+            if docs
+        }
+        fused_results = self._fuse_results_rrf(
+            *legs_results.values(),
+            k=settings.vector_store.rrf_k,
+            top_k=top_k,
+            names=list(legs_results),
+        )
+
+        if lazy_hydration:
+            fused_results = await self._ahydrate_documents(fused_results)
+        return fused_results
+
+    async def _arun_legs_concurrently(
+        self, legs: Dict[str, Callable], timeout: Optional[float] = None
+    ) -> Dict[str, List[Document]]:
+        """asyncio counterpart of _run_legs_concurrently."""
+        tasks = {name: asyncio.create_task(leg()) for name, leg in legs.items()}
+        done, _ = await asyncio.wait(tasks.values(), timeout=timeout)
+        if not done:
+            done, _ = await asyncio.wait(
+                tasks.values(), return_when=asyncio.FIRST_COMPLETED
+            )
+
+        results, errors, timed_out = {}, [], []
+        for name, task in tasks.items():
+            if task not in done:
+                task.cancel()
+                timed_out.append(name)
+                results[name] = []
+                continue
+            try:
+                results[name] = task.result()
+            except Exception as e:
+                logger.error(f"{name} retrieval leg failed: {e}")
+                errors.append(e)
+                results[name] = []
+
+        # Degrade to the legs that succeeded; with none left, timed out legs
+        # included, fail instead of returning an empty result
+        if errors and len(errors) + len(timed_out) == len(tasks):
+            raise errors[0]
+        for name in timed_out:
+            logger.warning(
+                f"{name} retrieval leg exceeded {timeout}s, fusing without it")
+        return results
+
+    async def _ahydrate_documents(self, documents: List[Document]) -> List[Document]:
+        """Async version of _hydrate_documents."""
+        if not documents:
+            return []
+        ids = [doc.metadata["id"] for doc in documents]
+        rows = await self._afetch(
+            f"SELECT {RESULT_COLUMNS} FROM chunks_embeddings c "
+            "WHERE c.course_id = ANY($1::int[]) AND c.id = ANY($2::text[])",
+            self._course_ids(documents),
+            ids,
+        )
+        by_id = {row["id"]: row for row in rows}
+        return [
+            self._with_scores(self._row_to_document(by_id[doc.metadata["id"]]), doc)
+            for doc in documents
+            if doc.metadata["id"] in by_id
+        ]
+
+    async def aget_all_documents(self, user_id: Optional[str] = None) -> List[Document]:
+        """Async version of get_all_documents."""
+        sql = f"SELECT {RESULT_COLUMNS} FROM chunks_embeddings c"
+        args = []
+        if user_id:
+            sql += " WHERE c.user_id = $1::uuid"
+            args.append(str(user_id))
+        rows = await self._afetch(sql, *args)
+        return [self._row_to_document(row) for row in rows]
+
+    async def aadd_documents(
+        self,
+        documents: List[Document],
+        document_id: str,
+        language: Optional[str] = None,
+        course_id: Optional[int] = None,
+    ) -> bool:
+        """Async version of add_documents."""
+        language = language or settings.vector_store.text_search_language
+        course_id = UNASSIGNED_COURSE_ID if course_id is None else int(course_id)
+        pool = await self.db.get_async_pool()
+        try:
+            user_id = await pool.fetchval(
+                "SELECT user_id::text FROM documents WHERE id = $1", document_id
+            )
+            if user_id is None:
+                raise ValueError(f"Parent document {document_id} not found")
+
+            texts = [doc.page_content for doc in documents]
+            embeddings, lookup = await self._aembed_documents(texts)
+            self._log_cache_lookup(document_id, lookup)
+
+            rows = [
+                (
+                    doc.id,
+                    document_id,
+                    user_id,
+                    course_id,
+                    {"page_content": doc.page_content, "metadata": doc.metadata},
+                    np.asarray(embedding, dtype=np.float32),
+                )
+                for doc, embedding in zip(documents, embeddings)
+            ]
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    if len(rows) >= settings.vector_store.copy_threshold:
+                        await self._copy_writer.awrite(conn, rows, language)
+                    else:
+                        await self._copy_writer.ainsert(conn, rows, language)
+
+            await asyncio.to_thread(
+                self._bm25_add,
+                user_id,
+                [doc.id for doc in documents],
+                [document_id] * len(documents),
+                texts,
+                course_id=course_id,
+            )
+            logger.info(
+                f"Successfully added {len(documents)} chunks for document {document_id}"
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Failed to add documents: {e}")
+            raise
+
+    async def adelete_documents(self, doc_id: str, user_id: Optional[str] = None) -> bool:
+        """Async version of delete_documents."""
+        try:
+            if user_id is None:
+                user = await asyncio.to_thread(supabase.auth.get_user)
+                user_id = user.user.id
+            pool = await self.db.get_async_pool()
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    owned = await conn.fetchval(
+                        "SELECT 1 FROM documents WHERE id = $1 AND user_id = $2::uuid",
+                        doc_id,
+                        str(user_id),
+                    )
+                    if not owned:
+                        raise ValueError(
+                            f"User {user_id} does not have access to document {doc_id}"
+                        )
+                    deleted = await conn.fetch(
+                        "DELETE FROM chunks_embeddings WHERE document_id = $1 "
+                        "RETURNING course_id",
+                        doc_id,
+                    )
+            self._bm25_delete(
+                user_id, [doc_id], {row["course_id"] for row in deleted})
+
+            logger.info(f"Successfully deleted {len(deleted)} chunks")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to delete documents: {e}")
+            return False
@@ -1,12 +1,4 @@
 import logging
-import os
-from typing import List, Optional
-
-import faiss
-from langchain.docstore.document import Document
-from langchain_community.vectorstores import FAISS
-
-from core.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -22,4 +14,5 @@ class VectorStoreService:
         return self.store.as_retriever()
     
     def save(self):
-        os.makedirs(settings.paths)
\ No newline at end of file
+        """Persist the underlying store, for stores kept on local disk."""
+        self.store.save()
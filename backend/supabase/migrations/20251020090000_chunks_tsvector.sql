@@ -0,0 +1,18 @@
+-- Persisted full-text search column for chunks_embeddings.
+-- ts_config records the text search configuration (language) of each chunk
+-- and content_tsv is generated from it, so queries no longer call
+-- to_tsvector() on every row.
+ALTER TABLE chunks_embeddings
+    ADD COLUMN IF NOT EXISTS ts_config regconfig NOT NULL DEFAULT 'french'::regconfig;
+
+ALTER TABLE chunks_embeddings
+    ADD COLUMN IF NOT EXISTS content_tsv tsvector
+    GENERATED ALWAYS AS (to_tsvector(ts_config, coalesce(data->>'page_content', ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_chunks_content_tsv
+    ON chunks_embeddings USING GIN (content_tsv);
+
+DO $$
+BEGIN
+    RAISE NOTICE 'chunks_embeddings.content_tsv and GIN index created successfully';
+END $$;
@@ -0,0 +1,19 @@
+-- Content-addressed cache of chunk embeddings.
+-- Keyed by embedding model and the SHA-256 of the normalized chunk text, so
+-- boilerplate and re-uploaded material is embedded once per model. The
+-- vector has no fixed dimension since each model has its own.
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    model TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    embedding vector NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (model, content_hash)
+);
+
+-- Shared across users and only read or written by the backend
+ALTER TABLE embedding_cache ENABLE ROW LEVEL SECURITY;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'embedding_cache table created successfully';
+END $$;
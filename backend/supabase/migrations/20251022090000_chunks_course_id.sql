@@ -0,0 +1,15 @@
+-- Tenant key for course-scoped retrieval.
+-- Chunks that do not belong to a course keep course_id = 0. There is no
+-- foreign key to course so the column can later serve as a partition key.
+ALTER TABLE chunks_embeddings
+    ADD COLUMN IF NOT EXISTS course_id INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_chunks_course_id ON chunks_embeddings(course_id);
+
+-- Per-course HNSW indexes are partial indexes (WHERE course_id = <id>)
+-- created on demand by PGVectorStore.create_tenant_index.
+
+DO $$
+BEGIN
+    RAISE NOTICE 'chunks_embeddings.course_id added successfully';
+END $$;
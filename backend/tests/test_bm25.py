@@ -0,0 +1,144 @@
+import numpy as np
+import pytest
+
+from services.vector_store.bm25 import BM25Index, BM25Segment, tokenize
+
+TEXTS = {
+    "c1": "postgres stores the chunk embeddings",
+    "c2": "bm25 scores chunks by term frequency",
+    "c3": "the hnsw index serves dense search",
+    "c4": "bm25 and dense search are fused with rrf",
+}
+
+
+def build(texts=TEXTS, document_id=lambda chunk_id: f"doc-{chunk_id}"):
+    chunk_ids = list(texts)
+    return BM25Index.from_texts(
+        chunk_ids, [document_id(chunk_id) for chunk_id in chunk_ids], list(texts.values()))
+
+
+def scores(index, query, k=10):
+    return {hit.chunk_id: hit.score for hit in index.search(query, k=k)}
+
+
+def test_tokenize_lowercases_and_drops_long_tokens():
+    assert tokenize("Dense SEARCH, " + "x" * 60) == ["dense", "search"]
+
+
+def test_segment_csr_layout():
+    segment = BM25Segment.build(["a", "b"], ["d", "d"], ["x y x", "y"])
+    assert segment.n_docs == 2
+    assert [bytes(term) for term in segment.terms] == [b"x", b"y"]
+    x, y = segment.lookup(["x", "y"])
+    assert segment.postings[segment.indptr[x]:segment.indptr[x + 1]].tolist() == [0]
+    assert segment.tfs[segment.indptr[x]:segment.indptr[x + 1]].tolist() == [2.0]
+    assert segment.postings[segment.indptr[y]:segment.indptr[y + 1]].tolist() == [0, 1]
+    assert segment.lookup(["missing"]).size == 0
+
+
+def test_search_ranks_matching_chunks_only():
+    hits = build().search("bm25 rrf", k=10)
+    assert [hit.chunk_id for hit in hits] == ["c4", "c2"]
+    assert hits[0].document_id == "doc-c4"
+    assert all(hit.score > 0 for hit in hits)
+    assert build().search("nothing matches", k=10) == []
+
+
+def test_search_honours_k():
+    assert len(build().search("the bm25 dense search", k=2)) == 2
+    assert build().search("bm25", k=0) == []
+
+
+def test_empty_index():
+    index = BM25Index.from_texts([], [], [])
+    assert len(index) == 0
+    assert index.search("anything") == []
+    index.add(["c1"], ["d1"], ["hello world"])
+    assert [hit.chunk_id for hit in index.search("hello")] == ["c1"]
+
+
+def test_add_appends_a_segment_and_replaces_chunks():
+    index = build()
+    index.add(["c5", "c2"], ["doc-c5", "doc-c2"], ["rrf fusion", "rewritten chunk"])
+    assert index.n_segments == 2
+    assert len(index) == 5
+    assert index.n_deleted == 1
+    assert set(scores(index, "rrf")) == {"c4", "c5"}
+    # The old text of c2 is tombstoned
+    assert "c2" not in scores(index, "bm25")
+    assert "c2" in scores(index, "rewritten")
+
+
+def test_delete_by_chunk_and_by_document():
+    index = build(document_id=lambda chunk_id: "shared" if chunk_id in ("c3", "c4") else chunk_id)
+    index.delete(chunk_ids=["c2"])
+    assert "c2" not in scores(index, "bm25")
+    index.delete(document_ids=["shared"])
+    assert scores(index, "dense search") == {}
+    assert len(index) == 1
+    assert index.n_deleted == 3
+
+
+def test_deletes_do_not_skew_idf():
+    texts = {f"c{i}": "common term" for i in range(10)}
+    texts["rare"] = "common rare"
+    index = build(texts)
+    index.delete(chunk_ids=[f"c{i}" for i in range(9)])
+
+    # Only live documents count towards document frequencies, so a matching
+    # term never lowers a score and scores match a fresh build of the
+    # surviving chunks
+    live = {"c9": "common term", "rare": "common rare"}
+    assert scores(index, "common") == pytest.approx(scores(build(live), "common"))
+    assert all(score > 0 for score in scores(index, "common").values())
+
+
+def test_compaction_merges_segments_and_drops_tombstones():
+    index = build()
+    index.add(["c5"], ["doc-c5"], ["dense retrieval with rrf"])
+    index.add(["c6"], ["doc-c6"], ["sparse retrieval with bm25"])
+    index.delete(chunk_ids=["c1", "c5"])
+    before = scores(index, "bm25 dense rrf retrieval")
+
+    index.compact()
+    assert index.n_segments == 1
+    assert index.n_deleted == 0
+    assert len(index) == 4
+    assert scores(index, "bm25 dense rrf retrieval") == pytest.approx(before)
+    assert scores(index, "postgres") == {}
+
+
+def test_compaction_keeps_writes_made_after_the_snapshot():
+    index = build()
+    index.add(["c5"], ["doc-c5"], ["late rrf chunk"])
+    index.compact()
+    index.add(["c6"], ["doc-c6"], ["later rrf chunk"])
+    index.delete(chunk_ids=["c4"])
+    assert set(scores(index, "rrf")) == {"c5", "c6"}
+
+
+def test_needs_compaction():
+    index = build()
+    assert not index.needs_compaction(max_segments=2, max_deleted_ratio=0.5)
+    index.add(["c5"], ["doc-c5"], ["one"])
+    index.add(["c6"], ["doc-c6"], ["two"])
+    assert index.needs_compaction(max_segments=2, max_deleted_ratio=0.5)
+    index.compact()
+    index.delete(chunk_ids=["c1", "c2", "c3", "c4"])
+    assert index.needs_compaction(max_segments=2, max_deleted_ratio=0.5)
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_and_load_round_trip(tmp_path, mmap):
+    index = build()
+    index.add(["c5"], ["doc-c5"], ["rrf fusion"])
+    index.delete(chunk_ids=["c1"])
+    path = str(tmp_path / "tenant.bm25")
+    index.save(path, {"fingerprint": "4:x"})
+
+    loaded, metadata = BM25Index.load(path, mmap=mmap)
+    assert metadata == {"fingerprint": "4:x"}
+    assert loaded.n_segments == 1
+    assert scores(loaded, "rrf bm25") == pytest.approx(scores(index, "rrf bm25"))
+    if mmap:
+        assert isinstance(loaded._state[0][0].postings, np.memmap)
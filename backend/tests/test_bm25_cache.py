@@ -0,0 +1,137 @@
+import threading
+
+import pytest
+
+from services.vector_store.bm25_cache import BM25IndexCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Builder:
+    """Counts builds; each build returns a fresh list as the index."""
+
+    def __init__(self):
+        self.builds = 0
+
+    def __call__(self):
+        self.builds += 1
+        return [self.builds]
+
+
+def bookkeeping(cache):
+    return set(cache._generations) | set(cache._build_locks) | set(cache._builders)
+
+
+def test_builds_once_and_caches():
+    cache, build = BM25IndexCache(), Builder()
+    assert cache.get_or_build("a", build) == [1]
+    assert cache.get_or_build("a", build) == [1]
+    assert build.builds == 1
+
+
+def test_lru_eviction_drops_bookkeeping():
+    cache, build = BM25IndexCache(max_size=2), Builder()
+    cache.get_or_build("a", build)
+    cache.get_or_build("b", build)
+    cache.get("a")
+    cache.get_or_build("c", build)
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert bookkeeping(cache) <= {"a", "c"}
+
+
+def test_writes_to_uncached_tenants_leave_no_trace():
+    cache = BM25IndexCache()
+    for i in range(100):
+        cache.invalidate(f"user:{i}")
+        cache.update(f"course:{i}", lambda index: None)
+    assert bookkeeping(cache) == set()
+
+
+def test_update_patches_the_cached_index():
+    cache, build = BM25IndexCache(), Builder()
+    cache.get_or_build("a", build)
+    assert cache.update("a", lambda index: index.append("new"))
+    assert cache.get("a") == [1, "new"]
+    assert not cache.update("b", lambda index: None)
+
+
+def test_invalidation_during_build_is_not_cached():
+    cache = BM25IndexCache()
+
+    def builder():
+        cache.invalidate("a")
+        return ["stale"]
+
+    assert cache.get_or_build("a", builder) == ["stale"]
+    assert "a" not in cache
+    assert bookkeeping(cache) == set()
+
+
+def test_concurrent_misses_build_once():
+    cache, build = BM25IndexCache(), Builder()
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_build():
+        started.set()
+        release.wait(5)
+        return build()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_build("a", slow_build)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    started.wait(5)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert build.builds == 1
+    assert results == [[1]] * 4
+    assert bookkeeping(cache) <= {"a"}
+
+
+def test_revalidation_rebuilds_on_foreign_writes():
+    clock, build = FakeClock(), Builder()
+    cache = BM25IndexCache(revalidate_interval=30, clock=clock)
+    fingerprint = {"value": "1:t0"}
+
+    def current():
+        return fingerprint["value"]
+
+    assert cache.get_or_build("a", build, current) == [1]
+    # Another process writes; not checked before the interval
+    fingerprint["value"] = "2:t1"
+    clock.now = 10
+    assert cache.get_or_build("a", build, current) == [1]
+    clock.now = 31
+    assert cache.get_or_build("a", build, current) == [2]
+    clock.now = 70
+    assert cache.get_or_build("a", build, current) == [2]
+    assert build.builds == 2
+
+
+def test_index_patched_in_place_adopts_the_next_fingerprint():
+    clock, build = FakeClock(), Builder()
+    cache = BM25IndexCache(revalidate_interval=30, clock=clock)
+    fingerprint = {"value": "1:t0"}
+    cache.get_or_build("a", build, lambda: fingerprint["value"])
+    # Our own write: patched in place, the database moved on accordingly
+    cache.update("a", lambda index: index.append("new"))
+    fingerprint["value"] = "2:t1"
+    clock.now = 31
+    assert cache.get_or_build("a", build, lambda: fingerprint["value"]) == [1, "new"]
+    assert build.builds == 1
+
+
+def test_max_size_validation():
+    with pytest.raises(ValueError):
+        BM25IndexCache(max_size=0)
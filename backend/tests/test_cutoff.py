@@ -0,0 +1,111 @@
+import pytest
+from langchain.schema import Document
+
+from services.retrieval.cutoff import adaptive_cutoff, relevance_scores
+
+
+def docs(scores, key="rerank_score"):
+    return [
+        Document(page_content=f"chunk {i}", metadata={"id": f"c{i}", key: score})
+        for i, score in enumerate(scores)
+    ]
+
+
+def kept(documents):
+    return [doc.metadata["id"] for doc in documents]
+
+
+def rrf(ranks, k=60):
+    return sum(1.0 / (k + rank) for rank in ranks)
+
+
+def fused(distances):
+    """RRF-ordered documents, as similarity_search returns them."""
+    documents = []
+    for i, distance in enumerate(distances):
+        metadata = {"id": f"c{i}", "score": rrf([i + 1])}
+        if distance is not None:
+            metadata["distance"] = distance
+        documents.append(Document(page_content=f"chunk {i}", metadata=metadata))
+    return documents
+
+
+def test_relevance_scores():
+    documents = fused([0.6, None, 0.2])
+    # Dense similarities, best first, whatever the fused order
+    assert relevance_scores(documents) == pytest.approx([0.8, 0.4])
+
+    documents[0].metadata["rerank_score"] = 0.4
+    documents[1].metadata["rerank_score"] = 0.9
+    documents[2].metadata["rerank_score"] = 0.1
+    assert relevance_scores(documents) == [0.4, 0.9, 0.1]
+    # Fused scores alone only reflect ranks
+    assert relevance_scores(fused([None, None])) is None
+
+
+def test_fused_list_is_cut_by_its_dense_similarities():
+    # Same RRF curve for both queries; only the dense distances differ
+    easy = fused([0.1, 0.15, 0.7, 0.72, 0.75, 0.78, 0.8, 0.8])
+    hard = fused([0.3, 0.3, 0.31, 0.31, 0.32, 0.32, 0.33, 0.33])
+    assert [doc.metadata["score"] for doc in easy] == [doc.metadata["score"] for doc in hard]
+    assert kept(adaptive_cutoff(easy, min_k=1)) == ["c0", "c1"]
+    assert len(adaptive_cutoff(hard, min_k=1)) == 8
+
+
+def test_fused_list_without_distances_is_not_cut():
+    documents = fused([None] * 8)
+    assert len(adaptive_cutoff(documents, min_k=1, max_k=6)) == 6
+
+
+def test_relative_cut():
+    documents = docs([1.0, 0.9, 0.8, 0.3, 0.2])
+    assert kept(adaptive_cutoff(documents, min_k=1, methods=["relative"])) == ["c0", "c1", "c2"]
+
+
+def test_relative_keeps_a_strong_tail():
+    documents = docs([0.9, 0.85, 0.8, 0.78, 0.75])
+    assert len(adaptive_cutoff(documents, min_k=1, methods=["relative"])) == 5
+
+
+def test_gap_cut():
+    documents = docs([0.9, 0.88, 0.86, 0.4, 0.38])
+    assert kept(adaptive_cutoff(documents, min_k=1, methods=["gap"])) == ["c0", "c1", "c2"]
+
+
+def test_gap_cut_ignores_gaps_before_min_k():
+    documents = docs([0.9, 0.3, 0.29, 0.28])
+    assert len(adaptive_cutoff(documents, min_k=2, methods=["gap"])) == 4
+
+
+def test_elbow_cut():
+    documents = docs([1.0, 0.95, 0.9, 0.3, 0.25, 0.2, 0.15])
+    assert len(adaptive_cutoff(documents, min_k=1, methods=["elbow"])) == 4
+
+
+def test_elbow_without_knee_keeps_everything():
+    documents = docs([1.0, 0.8, 0.6, 0.4, 0.2])
+    assert len(adaptive_cutoff(documents, min_k=1, methods=["elbow"])) == 5
+
+
+def test_tiny_spread_is_not_cut():
+    # Every chunk is about as relevant
+    documents = docs([0.910, 0.905, 0.902, 0.900])
+    assert len(adaptive_cutoff(documents, min_k=1)) == 4
+
+
+def test_negative_scores_are_rescaled_from_the_worst():
+    documents = docs([3.0, 2.5, -1.0, -2.0], key="rerank_score")
+    assert kept(adaptive_cutoff(documents, min_k=1, methods=["relative"])) == ["c0", "c1"]
+
+
+def test_bounds():
+    documents = docs([1.0, 0.1, 0.05, 0.01])
+    assert len(adaptive_cutoff(documents, min_k=2)) == 2
+    assert len(adaptive_cutoff(docs([1.0] * 20), max_k=10)) == 10
+    unscored = [Document(page_content=str(i)) for i in range(5)]
+    assert len(adaptive_cutoff(unscored, min_k=1, max_k=3)) == 3
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        adaptive_cutoff(docs([1.0, 0.5, 0.1]), methods=["median"])
@@ -0,0 +1,159 @@
+import json
+import os
+
+import pytest
+from langchain.schema import Document
+from langchain.schema.embeddings import Embeddings
+
+from core.config import FaissConfig
+from services.vector_store import faiss_store
+from services.vector_store.faiss_store import FAISSVectorStore
+
+VOCABULARY = ("cat", "dog", "fish", "bird")
+
+
+class WordEmbeddings(Embeddings):
+    """One dimension per vocabulary word, counting its occurrences."""
+
+    def embed_query(self, text):
+        words = text.split()
+        return [float(words.count(word)) for word in VOCABULARY]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+def open_store(index_dir):
+    return FAISSVectorStore(
+        embeddings=WordEmbeddings(), config=FaissConfig(index_dir=str(index_dir)))
+
+
+def chunks(*texts, user_id="u1"):
+    return [
+        Document(page_content=text, metadata={"id": f"c-{text}", "user_id": user_id})
+        for text in texts
+    ]
+
+
+def ids(documents):
+    return sorted(doc.metadata["id"] for doc in documents)
+
+
+def docstore(index_dir, key):
+    with open(os.path.join(index_dir, f"{key}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_round_trip(tmp_path):
+    store = open_store(tmp_path)
+    store.add_documents(chunks("cat", "dog"), document_id="d1", course_id=1)
+
+    reopened = open_store(tmp_path)
+    results = reopened.similarity_search("cat", user_id=None, course_id=1, top_k=1)
+    assert ids(results) == ["c-cat"]
+    assert results[0].metadata["document_id"] == "d1"
+    assert results[0].metadata["course_id"] == 1
+    assert results[0].metadata["score"] == pytest.approx(1.0)
+    assert ids(reopened.get_all_documents()) == ["c-cat", "c-dog"]
+
+
+def test_writes_are_appended_to_the_log_and_replayed(tmp_path):
+    store = open_store(tmp_path)
+    store.add_documents(chunks("cat", "dog"), document_id="d1", course_id=1)
+    first = docstore(tmp_path, "course_1")
+    store.add_documents(chunks("fish"), document_id="d2", course_id=1)
+    # Re-adding a chunk id replaces it
+    store.add_documents(chunks("dog"), document_id="d3", course_id=1)
+    store.delete_documents("d2")
+
+    second = docstore(tmp_path, "course_1")
+    assert second["log_file"] == first["log_file"]
+    assert second["log_length"] > first["log_length"]
+    # Only the current generation's index is left
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith(".faiss")) == [
+        second["index_file"]]
+
+    reopened = open_store(tmp_path)
+    documents = reopened.get_all_documents()
+    assert ids(documents) == ["c-cat", "c-dog"]
+    assert {doc.metadata["id"]: doc.metadata["document_id"] for doc in documents} == {
+        "c-cat": "d1", "c-dog": "d3"}
+    assert ids(reopened.similarity_search("fish", user_id=None, course_id=1)) == [
+        "c-cat", "c-dog"]
+
+
+def test_log_past_the_docstore_length_is_ignored(tmp_path):
+    store = open_store(tmp_path)
+    store.add_documents(chunks("cat"), document_id="d1", course_id=1)
+    log_file = docstore(tmp_path, "course_1")["log_file"]
+    # What a writer that crashed before its docstore swap leaves behind
+    with open(os.path.join(tmp_path, log_file), "ab") as f:
+        f.write(b'{"add": 7, "chunk": {"id": "half')
+
+    assert ids(open_store(tmp_path).get_all_documents()) == ["c-cat"]
+    store.add_documents(chunks("dog"), document_id="d2", course_id=1)
+    assert ids(open_store(tmp_path).get_all_documents()) == ["c-cat", "c-dog"]
+
+
+def test_mostly_dead_log_is_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(faiss_store, "LOG_COMPACTION_MIN", 0)
+    store = open_store(tmp_path)
+    store.add_documents(chunks("cat"), document_id="d1", course_id=1)
+    old_log = docstore(tmp_path, "course_1")["log_file"]
+    for i in range(3):
+        store.add_documents(chunks("dog"), document_id=f"d{i + 2}", course_id=1)
+
+    new_log = docstore(tmp_path, "course_1")["log_file"]
+    assert new_log != old_log
+    assert not os.path.exists(os.path.join(tmp_path, old_log))
+    with open(os.path.join(tmp_path, new_log), "rb") as f:
+        assert len(f.read().splitlines()) == 2
+    assert ids(open_store(tmp_path).get_all_documents()) == ["c-cat", "c-dog"]
+
+
+def test_other_instances_see_new_generations(tmp_path):
+    writer, reader = open_store(tmp_path), open_store(tmp_path)
+    writer.add_documents(chunks("cat"), document_id="d1", course_id=1)
+    assert ids(reader.get_all_documents()) == ["c-cat"]
+    writer.add_documents(chunks("dog"), document_id="d2", course_id=1)
+    assert ids(reader.get_all_documents()) == ["c-cat", "c-dog"]
+
+
+def test_user_search_spans_shards_and_fails_closed(tmp_path):
+    store = open_store(tmp_path)
+    store.add_documents(chunks("cat"), document_id="d1", course_id=1)
+    store.add_documents(chunks("dog"), document_id="d2")
+    store.add_documents(chunks("fish", user_id="u2"), document_id="d3", course_id=1)
+
+    assert ids(store.similarity_search("cat", user_id="u1")) == ["c-cat", "c-dog"]
+    assert ids(store.similarity_search("cat", user_id="u2")) == ["c-fish"]
+    with pytest.raises(ValueError):
+        store.similarity_search("cat", user_id=None)
+
+
+def test_drop_course_removes_every_file_of_its_shard(tmp_path):
+    store = open_store(tmp_path)
+    store.add_documents(chunks("cat", "dog"), document_id="d1", course_id=1)
+    store.add_documents(chunks("fish"), document_id="d2", course_id=1)
+    store.add_documents(chunks("bird"), document_id="d3", course_id=2)
+
+    assert store.drop_course(1) == 3
+    assert not [name for name in os.listdir(tmp_path) if name.startswith("course_1.")]
+    assert store.similarity_search("cat", user_id=None, course_id=1) == []
+    assert ids(open_store(tmp_path).get_all_documents()) == ["c-bird"]
+    assert store.drop_course(1) == 0
+    assert not [name for name in os.listdir(tmp_path) if name.startswith("course_1.")]
+
+    # The course can be written again afterwards
+    store.add_documents(chunks("cat"), document_id="d4", course_id=1)
+    assert ids(open_store(tmp_path).similarity_search("cat", None, course_id=1)) == ["c-cat"]
+
+
+def test_clear_store(tmp_path):
+    store = open_store(tmp_path)
+    store.add_documents(chunks("cat"), document_id="d1", course_id=1)
+    store.add_documents(chunks("dog"), document_id="d2")
+
+    assert store.clear_store()
+    assert os.listdir(tmp_path) == []
+    assert store.get_all_documents() == []
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from services.vector_store.hot_cache import CourseMirror, HotTenantCache
+
+
+def mirror(embeddings, fingerprint="f"):
+    n = len(embeddings)
+    return CourseMirror(
+        ids=[f"c{i}" for i in range(n)],
+        document_ids=["d"] * n,
+        contents=[f"chunk {i}" for i in range(n)],
+        metadatas=[{} for _ in range(n)],
+        embeddings=np.array(embeddings, dtype=np.float32),
+        fingerprint=fingerprint,
+        checked_at=0.0,
+    )
+
+
+def load(cache, course_id):
+    """Claim and store a mirror for a course the way PGVectorStore does."""
+    version = cache.claim_load(course_id)
+    assert version is not None
+    return cache.put(course_id, mirror([[1.0, 0.0]]), version)
+
+
+def test_mirror_search_orders_by_cosine_distance():
+    m = mirror([[1.0, 0.0], [0.0, 3.0], [1.0, 1.0]])
+    results = m.search(np.array([2.0, 0.0]), top_k=2)
+    assert [row for row, _ in results] == [0, 2]
+    assert results[0][1] == pytest.approx(0.0, abs=1e-6)
+    assert results[1][1] == pytest.approx(1 - np.sqrt(0.5), abs=1e-6)
+    assert [row for row, _ in m.search(np.array([0.0, 1.0]), top_k=10)] == [1, 2, 0]
+    assert m.search(np.array([1.0, 0.0]), top_k=0) == []
+
+
+def test_load_needs_min_queries_misses():
+    cache = HotTenantCache(max_courses=2, min_queries=3)
+    assert cache.claim_load(1) is None
+    assert cache.claim_load(1) is None
+    version = cache.claim_load(1)
+    assert version == 0
+    # Already loading
+    assert cache.claim_load(1) is None
+    assert cache.put(1, mirror([[1.0, 0.0]]), version)
+    assert cache.get(1) is not None
+
+
+def test_lru_eviction():
+    cache = HotTenantCache(max_courses=2, min_queries=1)
+    load(cache, 1)
+    load(cache, 2)
+    # Course 1 is now the most recently used
+    assert cache.get(1) is not None
+    load(cache, 3)
+    assert 1 in cache and 3 in cache
+    assert 2 not in cache
+    assert len(cache) == 2
+
+
+def test_write_during_load_is_not_cached():
+    cache = HotTenantCache(max_courses=2, min_queries=1)
+    version = cache.claim_load(1)
+    cache.invalidate(1)
+    assert not cache.put(1, mirror([[1.0, 0.0]]), version)
+    assert 1 not in cache
+    assert load(cache, 1)
+
+
+def test_bookkeeping_is_bounded():
+    cache = HotTenantCache(max_courses=1, min_queries=2, max_tracked=3)
+    for course_id in range(10):
+        cache.claim_load(course_id)
+        cache.invalidate(course_id)
+    assert list(cache._misses) == [7, 8, 9]
+    assert cache._versions == {}
+    # The most recently missed courses keep their count
+    assert cache.claim_load(9) == 0
+    assert cache.claim_load(0) is None
+
+    assert cache._versions == {9: 0}
+    assert cache.put(9, mirror([[1.0, 0.0]]), 0)
+    cache.claim_load(1)
+    assert load(cache, 1)
+    assert 9 not in cache and len(cache) == 1
+    assert cache._versions == {}
+    assert list(cache._misses) == [8, 0]
+
+
+def test_stats():
+    cache = HotTenantCache(max_courses=2, min_queries=1)
+    load(cache, 1)
+    cache.get(1)
+    cache.get(2)
+    stats = cache.stats()
+    assert stats["courses"] == 1 and stats["rows"] == 1
+    assert stats["hit_rate"] == 0.5
@@ -0,0 +1,69 @@
+from langchain.schema import Document
+
+from services.context.merging import drop_duplicates, merge_adjacent
+
+
+def chunk(chunk_id, text, document_id="d1", **metadata):
+    return Document(
+        page_content=text, metadata={"id": chunk_id, "document_id": document_id, **metadata})
+
+
+def test_positioned_chunks_merge_into_one_span():
+    documents = [
+        chunk("b", "world, hello", start_index=6, score=0.9),
+        chunk("other", "unrelated", document_id="d2", score=0.8),
+        chunk("a", "hello world", start_index=0, score=0.5),
+    ]
+    merged = merge_adjacent(documents)
+    assert [doc.page_content for doc in merged] == ["hello world, hello", "unrelated"]
+    span = merged[0]
+    # Takes the place and metadata of its best ranked chunk
+    assert span.metadata["id"] == "b"
+    assert span.metadata["merged_ids"] == ["b", "a"]
+    assert span.metadata["start_index"] == 0
+    assert span.metadata["score"] == 0.9
+
+
+def test_positioned_chunks_within_max_gap_are_joined():
+    documents = [chunk("a", "abc", start_index=0), chunk("b", "def", start_index=4)]
+    assert [doc.page_content for doc in merge_adjacent(documents, max_gap=1)] == ["abc def"]
+    assert len(merge_adjacent(documents, max_gap=0)) == 2
+
+
+def test_unpositioned_chunks_merge_on_repeated_text():
+    shared = "x" * 10
+    documents = [chunk("b", shared + " tail"), chunk("a", "head " + shared)]
+    merged = merge_adjacent(documents, min_overlap=10)
+    assert [doc.page_content for doc in merged] == ["head " + shared + " tail"]
+    assert merged[0].metadata["merged_ids"] == ["b", "a"]
+    assert len(merge_adjacent(documents, min_overlap=11)) == 2
+
+
+def test_chunks_of_different_documents_are_not_merged():
+    documents = [
+        chunk("a", "hello world", start_index=0),
+        chunk("b", "world, hello", start_index=6, document_id="d2"),
+    ]
+    assert merge_adjacent(documents) == documents
+
+
+def test_exact_duplicates_keep_the_best_ranked():
+    documents = [chunk("a", "Same  TEXT"), chunk("b", "same text"), chunk("c", "other text")]
+    assert [doc.metadata["id"] for doc in drop_duplicates(documents)] == ["a", "c"]
+
+
+def test_near_duplicates_by_shingles():
+    words = [f"w{i}" for i in range(40)]
+    base = " ".join(words)
+    near = " ".join(words[:-1] + ["changed"])
+    distinct = " ".join(reversed(words))
+    documents = [chunk("a", base), chunk("b", near), chunk("c", distinct)]
+    kept = drop_duplicates(documents, threshold=0.9, shingle_size=5)
+    assert [doc.metadata["id"] for doc in kept] == ["a", "c"]
+    assert len(drop_duplicates(documents, threshold=0.99, shingle_size=5)) == 3
+
+
+def test_passage_contained_in_a_kept_one_is_dropped():
+    words = [f"w{i}" for i in range(40)]
+    documents = [chunk("a", " ".join(words)), chunk("b", " ".join(words[5:25]))]
+    assert [doc.metadata["id"] for doc in drop_duplicates(documents)] == ["a"]
@@ -0,0 +1,85 @@
+import pytest
+from langchain.schema import Document
+
+from services.context.packer import ContextPacker
+
+
+def words(text: str) -> int:
+    return len(text.split())
+
+
+def chunk(chunk_id, n_words, score=None):
+    metadata = {"id": chunk_id, "document_id": f"doc-{chunk_id}"}
+    if score is not None:
+        metadata["score"] = score
+    text = " ".join(f"{chunk_id}{i}" for i in range(n_words))
+    return Document(page_content=text, metadata=metadata)
+
+
+def packer(max_tokens, **kwargs):
+    return ContextPacker(max_tokens, count_tokens=words, separator="\n\n", **kwargs)
+
+
+def ids(documents):
+    return [doc.metadata["id"] for doc in documents]
+
+
+def test_empty_input():
+    context = packer(10).pack([])
+    assert context.text == ""
+    assert context.documents == [] and context.dropped == []
+    assert context.tokens == 0
+
+
+def test_single_chunk_over_budget_is_dropped():
+    context = packer(5).pack([chunk("a", 6)])
+    assert context.documents == []
+    assert ids(context.dropped) == ["a"]
+    assert context.tokens == 0
+    assert context.dropped_tokens == 6
+
+
+def test_best_scored_first_and_retrieval_order_kept():
+    documents = [chunk("a", 4, score=0.1), chunk("b", 4, score=0.9), chunk("c", 4, score=0.5)]
+    context = packer(8).pack(documents)
+    # The separator counts 0 words here
+    assert ids(context.documents) == ["b", "c"]
+    assert ids(context.dropped) == ["a"]
+    assert context.text == documents[1].page_content + "\n\n" + documents[2].page_content
+
+
+def test_smaller_chunks_fill_the_budget_after_a_large_one():
+    documents = [chunk("a", 3), chunk("b", 10), chunk("c", 2)]
+    context = packer(6).pack(documents)
+    assert ids(context.documents) == ["a", "c"]
+    assert context.tokens == 5
+
+
+def test_max_tokens_override():
+    documents = [chunk("a", 3), chunk("b", 3)]
+    assert ids(packer(10).pack(documents, max_tokens=3).documents) == ["a"]
+
+
+def test_duplicates_do_not_use_the_budget_twice():
+    documents = [chunk("a", 4), chunk("a", 4), chunk("b", 4)]
+    context = packer(8).pack(documents)
+    assert ids(context.documents) == ["a", "b"]
+
+
+def test_merged_input_is_not_merged_again():
+    documents = [chunk("a", 4), chunk("a", 4), chunk("b", 4)]
+    context = packer(12).pack(documents, merged=True)
+    assert ids(context.documents) == ["a", "a", "b"]
+
+
+def test_input_documents_are_not_annotated():
+    documents = [chunk("a", 3), chunk("b", 10)]
+    context = packer(5).pack(documents)
+    assert context.documents[0].metadata["context_tokens"] == 3
+    assert context.dropped_tokens == 10
+    assert all("context_tokens" not in doc.metadata for doc in documents)
+
+
+def test_budget_must_be_positive():
+    with pytest.raises(ValueError):
+        packer(0)
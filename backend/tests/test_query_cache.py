@@ -0,0 +1,106 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from services.embedding.query_cache import QueryEmbeddingCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_normalize():
+    assert QueryEmbeddingCache.normalize("  What IS\tRRF?\n") == "what is rrf?"
+    assert QueryEmbeddingCache.normalize("ｆｕｌｌ width") == "full width"
+
+
+def test_spellings_share_an_entry():
+    cache = QueryEmbeddingCache()
+    cache.put("model", "What is RRF?", [1.0, 0.0])
+    assert cache.get("model", "  what is   rrf?") is not None
+    assert cache.get("other-model", "What is RRF?") is None
+
+
+def test_get_or_compute_embeds_the_original_text():
+    cache = QueryEmbeddingCache()
+    seen = []
+
+    def compute(text):
+        seen.append(text)
+        return [float(len(seen)), 0.0]
+
+    first = cache.get_or_compute("model", "What is RRF?", compute)
+    again = cache.get_or_compute("model", "what is rrf?", compute)
+    assert seen == ["What is RRF?"]
+    assert again is first
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_aget_or_compute_embeds_the_original_text():
+    cache = QueryEmbeddingCache()
+    seen = []
+
+    async def compute(text):
+        seen.append(text)
+        return [1.0, 2.0]
+
+    async def run():
+        await cache.aget_or_compute("model", "Dense Search", compute)
+        return await cache.aget_or_compute("model", "dense search", compute)
+
+    vector = asyncio.run(run())
+    assert seen == ["Dense Search"]
+    assert vector.tolist() == [1.0, 2.0]
+
+
+def test_vectors_are_read_only_float32():
+    vector = QueryEmbeddingCache().put("model", "q", [1, 2, 3])
+    assert vector.dtype == np.float32
+    with pytest.raises(ValueError):
+        vector[0] = 0
+
+
+def test_lru_eviction():
+    cache = QueryEmbeddingCache(max_size=2)
+    cache.put("model", "a", [1.0])
+    cache.put("model", "b", [2.0])
+    # Touching a makes b the least recently used
+    assert cache.get("model", "a") is not None
+    cache.put("model", "c", [3.0])
+    assert cache.get("model", "b") is None
+    assert cache.get("model", "a") is not None
+    assert cache.get("model", "c") is not None
+    assert cache.stats()["size"] == 2
+
+
+def test_ttl_expiry():
+    clock = FakeClock()
+    cache = QueryEmbeddingCache(ttl=10, clock=clock)
+    cache.put("model", "q", [1.0])
+    clock.now = 9.9
+    assert cache.get("model", "q") is not None
+    clock.now = 10.0
+    assert cache.get("model", "q") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        QueryEmbeddingCache(max_size=0)
+
+
+def test_clear_and_stats():
+    cache = QueryEmbeddingCache()
+    assert cache.stats()["hit_rate"] == 0.0
+    cache.put("model", "q", [1.0])
+    cache.get("model", "q")
+    cache.get("model", "missing")
+    assert cache.stats()["hit_rate"] == 0.5
+    cache.clear()
+    assert cache.get("model", "q") is None